@@ -0,0 +1,82 @@
+"""
+Benchmark the verification of signed sensor data.
+
+Reports verifications per second, in total and per core, for one process
+with and without the public key cache, and for the process pool at
+increasing sizes.
+
+Usage:
+    python -m benchmarks.bench_signatures [--records 2000] [--sensors 20]
+"""
+
+import argparse
+import time
+
+from models.sensor_data import TceSensorData
+from utils.data_utils import create_crypto_keys, sign_data
+from utils.signatures import SignatureVerifier, load_public_key, signed_message
+from utils.supervisor import default_process_count
+
+
+def create_records(count, sensors):
+    """Create records signed by a number of sensors."""
+    keys = [create_crypto_keys() for _ in range(sensors)]
+    records = []
+    for i in range(count):
+        private_key, public_key_pem = keys[i % sensors]
+        sensor_data = {"distance": {"actual": float(i)}}
+        records.append(TceSensorData(
+            tceId=f"tce-{i}",
+            camundaProcessInstanceKey="1",
+            camundaActivityId="transport",
+            sensorkey=public_key_pem,
+            signedSensorData=sign_data(private_key, signed_message(sensor_data).decode('utf-8')),
+            sensorData=sensor_data,
+        ))
+    return records
+
+
+def measure(verifier, records, clear_cache=False):
+    """Return the seconds one batch verification takes."""
+    if clear_cache:
+        load_public_key.cache_clear()
+    started = time.perf_counter()
+    results = verifier.verify(records)
+    elapsed = time.perf_counter() - started
+    assert not any(results), "benchmark records must verify"
+    return elapsed
+
+
+def report(label, count, elapsed, cores):
+    rate = count / elapsed
+    print(f"{label:<28}{cores:>6}{rate:>14,.0f}{rate / cores:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--sensors", type=int, default=20)
+    args = parser.parse_args()
+
+    records = create_records(args.records, args.sensors)
+    print(f"{args.records} records from {args.sensors} sensors, RSA-2048 PSS/SHA-256\n")
+    print(f"{'mode':<28}{'cores':>6}{'verify/s':>14}{'per core':>14}")
+
+    serial = SignatureVerifier(processes=1)
+    report("serial, keys parsed", args.records, measure(serial, records, clear_cache=True), 1)
+    report("serial, keys cached", args.records, measure(serial, records), 1)
+
+    processes = 2
+    while processes <= default_process_count():
+        verifier = SignatureVerifier(processes=processes, parallel_threshold=0)
+        try:
+            # The first batch starts the processes and fills their key caches
+            measure(verifier, records)
+            report("process pool", args.records, measure(verifier, records), processes)
+        finally:
+            verifier.close()
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark the streaming of receipts to the verifier.
+
+Streams a receipt to a stand-in verifier server, running in its own process
+and only counting the received bytes, and reports the throughput per chunk
+size for receipts mapped from a file and passed as proofReceipt payload.
+
+Usage:
+    python -m benchmarks.bench_verifier_stream [--receipt-mb 8] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from grpc import aio
+
+import services.pb.receipt_verifier_pb2 as receipt_verifier_pb2
+import services.pb.receipt_verifier_pb2_grpc as receipt_verifier_pb2_grpc
+from services.verifier_service import ReceiptVerifierService
+
+CHUNK_SIZES = [1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 3 * 1024 * 1024]
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+class CountingVerifier(receipt_verifier_pb2_grpc.ReceiptVerifierServiceServicer):
+    """Stand-in verifier accepting every receipt."""
+
+    async def VerifyReceiptStream(self, request_iterator, context):
+        size = 0
+        async for chunk in request_iterator:
+            size += len(chunk.data)
+        return receipt_verifier_pb2.GrpcVerifyResponse(valid=True, message=str(size))
+
+
+async def serve(ports):
+    server = aio.server(options=[("grpc.max_receive_message_length", MAX_MESSAGE_BYTES)])
+    receipt_verifier_pb2_grpc.add_ReceiptVerifierServiceServicer_to_server(CountingVerifier(), server)
+    ports.put(server.add_insecure_port("127.0.0.1:0"))
+    await server.start()
+    await server.wait_for_termination()
+
+
+def run_server(ports):
+    asyncio.run(serve(ports))
+
+
+async def measure(service, receipt, file_path, repeat):
+    """Return the fastest of repeated verifications in seconds."""
+    # The first call opens the channel
+    await service.VerifyReceiptStream(receipt, file_path=file_path)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = await service.VerifyReceiptStream(receipt, file_path=file_path)
+        best = min(best, time.perf_counter() - started)
+    expected = len(receipt) if receipt is not None else os.path.getsize(file_path)
+    assert int(size) == expected, "stand-in verifier must receive the whole receipt"
+    return best
+
+
+async def run(address, file_path, payload, repeat):
+    size_mb = len(payload) / (1024 * 1024)
+    print(f"{'chunk size':>12}{'messages':>10}{'file MB/s':>12}{'payload MB/s':>14}")
+    for chunk_size in CHUNK_SIZES:
+        service = ReceiptVerifierService(address, chunk_size=chunk_size,
+                                         max_message_bytes=MAX_MESSAGE_BYTES)
+        try:
+            from_file = await measure(service, None, file_path, repeat)
+            from_payload = await measure(service, payload, file_path, repeat)
+        finally:
+            await service.close()
+        messages = -(-len(payload) // chunk_size)
+        print(f"{chunk_size:>12,}{messages:>10,}{size_mb / from_file:>12,.0f}"
+              f"{size_mb / from_payload:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--receipt-mb", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    size = int(args.receipt_mb * 1024 * 1024)
+    payload = os.urandom(size // 2 + 1).hex()[:size]
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=run_server, args=(ports,), daemon=True)
+    server.start()
+    try:
+        address = f"127.0.0.1:{ports.get(timeout=30)}"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "receipt_output.json")
+            with open(file_path, "w") as f:
+                f.write(payload)
+            print(f"{args.receipt_mb:g} MB receipt, best of {args.repeat}\n")
+            asyncio.run(run(address, file_path, payload, args.repeat))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the proofing document wire formats.
+
+Reports bytes on the wire and encode/decode time per document for every
+codec/compression combination over data/proof_documents_examples/*.json.
+
+Usage:
+    python -m benchmarks.bench_wire_codec [--iterations 200]
+"""
+
+import argparse
+import glob
+import json
+import os
+import timeit
+
+from models.proofing_document import ProofingDocument
+from utils.codec import CODECS, COMPRESSORS, WireFormat, decode_payload
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        "data", "proof_documents_examples", "*.json")
+
+
+def load_documents():
+    """Load and validate all example proofing documents."""
+    documents = []
+    for path in sorted(glob.glob(EXAMPLES)):
+        with open(path, 'r', encoding='utf-8') as f:
+            documents.append(
+                (os.path.basename(path), ProofingDocument.model_validate(json.load(f))))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    documents = load_documents()
+    baseline = sum(len(WireFormat().encode(doc)) for _, doc in documents)
+
+    print(f"{len(documents)} documents, {baseline} bytes as uncompressed JSON\n")
+    print(f"{'codec':<10}{'compression':<13}{'bytes':>9}{'ratio':>8}"
+          f"{'encode us':>12}{'decode us':>12}")
+
+    for codec in CODECS:
+        for compression in COMPRESSORS:
+            try:
+                wire_format = WireFormat(codec, compression)
+            except ImportError as e:
+                print(f"{codec:<10}{compression:<13}  skipped: {e}")
+                continue
+
+            total_bytes = 0
+            encode_time = 0.0
+            decode_time = 0.0
+            for _, doc in documents:
+                encoded = wire_format.encode(doc)
+                headers = wire_format.headers
+                total_bytes += len(encoded)
+                encode_time += timeit.timeit(
+                    lambda: wire_format.encode(doc), number=args.iterations)
+                decode_time += timeit.timeit(
+                    lambda: ProofingDocument.model_validate(
+                        decode_payload(encoded, headers)),
+                    number=args.iterations)
+
+            runs = args.iterations * len(documents)
+            print(f"{codec:<10}{compression:<13}{total_bytes:>9}"
+                  f"{total_bytes / baseline:>8.2f}"
+                  f"{encode_time / runs * 1e6:>12.1f}{decode_time / runs * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,27 @@ import os
 
 
 class DatabaseConfig:
-    DB_PATH = os.path.join(
+    DB_PATH = os.getenv("HOC_TOC_DB_PATH", os.path.join(
         os.path.dirname(os.path.dirname(__file__)),
         "hoc_toc_data.db"
-    )
+    ))
 
     TIMEOUT = 30.0
     CHECK_SAME_THREAD = False
+
+    # Connection pool
+    POOL_SIZE = int(os.getenv("HOC_TOC_DB_POOL_SIZE", "8"))
+    # Prepared statements cached per connection
+    CACHED_STATEMENTS = int(os.getenv("HOC_TOC_DB_CACHED_STATEMENTS", "128"))
+    # Bytes of the database file accessed through memory-mapped I/O
+    MMAP_SIZE = int(os.getenv("HOC_TOC_DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+    # Replicas that never write open the database as immutable
+    READ_ONLY = os.getenv("HOC_TOC_DB_READ_ONLY",
+                          "false").lower() in ("1", "true", "yes")
+
+    # In-process cache of validated HOC/TOC records
+    CACHE_MAX_ENTRIES = int(os.getenv("HOC_TOC_CACHE_MAX_ENTRIES", "10000"))
+    CACHE_TTL_SECONDS = float(os.getenv("HOC_TOC_CACHE_TTL_SECONDS", "3600"))
+    # Seconds between PRAGMA data_version checks for changes by other connections
+    CACHE_VERSION_CHECK_INTERVAL = float(
+        os.getenv("HOC_TOC_CACHE_VERSION_CHECK_INTERVAL", "1.0"))
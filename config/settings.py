@@ -6,8 +6,57 @@ ZEEBE_ADDRESS = os.environ.get("ZEEBE_ADDRESS", "localhost:26500")
 # kafka connection
 KAFKA_BOOTSTRAP_SERVERS = os.getenv(
     'KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
+# Partitioning of the proofing topic: the message key is the shipment id,
+# the product footprint id or none, hashed by the librdkafka partitioner
+KAFKA_PARTITION_KEY = os.getenv('KAFKA_PARTITION_KEY', 'shipment_id')
+KAFKA_PARTITIONER = os.getenv('KAFKA_PARTITIONER', 'murmur2_random')
+# Shared producer batching (see librdkafka linger.ms / batch.size / compression.type)
+KAFKA_LINGER_MS = int(os.getenv('KAFKA_LINGER_MS', '5'))
+KAFKA_BATCH_SIZE = int(os.getenv('KAFKA_BATCH_SIZE', '1000000'))
+KAFKA_COMPRESSION_TYPE = os.getenv('KAFKA_COMPRESSION_TYPE', 'lz4')
+# Seconds to wait for a delivery report or for pending messages on shutdown
+KAFKA_DELIVERY_TIMEOUT = float(
+    os.getenv('KAFKA_DELIVERY_TIMEOUT', '10'))
+# Proofing request/reply topics
+KAFKA_PROOFING_TOPIC = os.getenv('KAFKA_PROOFING_TOPIC', 'shipments')
+KAFKA_PROOF_RESPONSE_TOPIC = os.getenv(
+    'KAFKA_PROOF_RESPONSE_TOPIC', 'pcf-results')
+# Wire format of proofing documents: json, msgpack or protobuf, combined
+# with none, gzip, zstd or lz4 compression (announced via message headers)
+PROOFING_WIRE_CODEC = os.getenv('PROOFING_WIRE_CODEC', 'json')
+PROOFING_WIRE_COMPRESSION = os.getenv('PROOFING_WIRE_COMPRESSION', 'none')
+# Every worker process joins its own group so it sees all replies
+KAFKA_REPLY_GROUP_PREFIX = os.getenv(
+    'KAFKA_REPLY_GROUP_PREFIX', 'camunda-service-replies')
+# In fire-and-forget mode all workers share this group, so each proof response
+# is handled by one worker and replies arriving during restarts are not lost
+KAFKA_PROOF_RESPONSE_GROUP = os.getenv(
+    'KAFKA_PROOF_RESPONSE_GROUP', 'camunda-service-proof-responses')
+# Seconds to wait for a proof response before failing the job
+PROOF_RESPONSE_TIMEOUT = float(os.getenv('PROOF_RESPONSE_TIMEOUT', '900'))
+# Fire-and-forget proofing: complete the job once the document is published
+# and resume the process with a Zeebe message when the proof arrives
+PROOFING_ASYNC_MODE = os.getenv(
+    'PROOFING_ASYNC_MODE', 'false').lower() in ('1', 'true', 'yes')
+PROOF_RESPONSE_MESSAGE_NAME = os.getenv(
+    'PROOF_RESPONSE_MESSAGE_NAME', 'proof_response_received')
+PROOF_RESPONSE_MESSAGE_TTL_MS = int(
+    os.getenv('PROOF_RESPONSE_MESSAGE_TTL_MS', '3600000'))
 VERIFIER_SERVICE_API_URL = os.getenv(
     'VERIFIER_SERVICE_API_URL', 'localhost:50051')
+# The verifier channel is opened once per worker process and shared by all
+# verify_receipt jobs. Keepalive pings detect dead connections during long
+# verifications; they are only sent while calls run, and the default interval
+# is the minimum gRPC servers accept by default (5 minutes). Shorter intervals
+# need the server's grpc.http2.min_ping_interval_without_data_ms lowered too.
+VERIFIER_KEEPALIVE_TIME_MS = int(os.getenv('VERIFIER_KEEPALIVE_TIME_MS', '300000'))
+VERIFIER_KEEPALIVE_TIMEOUT_MS = int(os.getenv('VERIFIER_KEEPALIVE_TIMEOUT_MS', '10000'))
+VERIFIER_DEADLINE_SECONDS = float(os.getenv('VERIFIER_DEADLINE_SECONDS', '300'))
+VERIFIER_MAX_MESSAGE_BYTES = int(os.getenv('VERIFIER_MAX_MESSAGE_BYTES', str(16 * 1024 * 1024)))
+VERIFIER_COMPRESSION = os.getenv('VERIFIER_COMPRESSION', 'none')
+# Receipts are streamed in chunks of this size; must stay below the server's
+# max receive message length (gRPC default 4 MiB)
+VERIFIER_CHUNK_SIZE_BYTES = int(os.getenv('VERIFIER_CHUNK_SIZE_BYTES', str(3 * 1024 * 1024)))
 
 # API endpoints
 # PROOFING_SERVICE_URL = "http://localhost:8000/api/proofing"
@@ -15,6 +64,55 @@ VERIFIER_SERVICE_API_URL = os.getenv(
 
 # Authentication
 
+# Task execution: blocking handlers run on a dedicated thread pool per task
+# type. TASK_EXECUTOR_CONFIG overrides the defaults per task type, e.g.
+# {"send_to_proofing_service": {"threads": 64, "max_jobs": 64}}
+TASK_DEFAULT_MAX_RUNNING_JOBS = int(
+    os.getenv("TASK_DEFAULT_MAX_RUNNING_JOBS", "32"))
+# Defaults to one thread per running job
+TASK_DEFAULT_THREADS = int(os.getenv("TASK_DEFAULT_THREADS", "0")) or None
+TASK_EXECUTOR_CONFIG = os.getenv("TASK_EXECUTOR_CONFIG", "")
+
+# Multi-process mode: number of worker processes forked by the supervisor
+# (1 runs a single worker in-process, 0 uses one process per available CPU)
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+WORKER_START_METHOD = os.getenv("WORKER_START_METHOD", "fork")
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_INTERVAL", "5"))
+WORKER_HEARTBEAT_TIMEOUT = float(os.getenv("WORKER_HEARTBEAT_TIMEOUT", "60"))
+WORKER_RESTART_BACKOFF = float(os.getenv("WORKER_RESTART_BACKOFF", "5"))
+WORKER_SHUTDOWN_GRACE = float(os.getenv("WORKER_SHUTDOWN_GRACE", "30"))
+
+# Key for HMAC digests of a footprint's TCE chain. If unset the digests are
+# plain SHA-256, which only catch accidental changes, not tampering.
+TCE_CHAIN_SECRET = os.getenv("TCE_CHAIN_SECRET", "")
+# prevTceIds of new TCEs: "full" lists all ancestors, "parent" only the direct
+# parent (linear variable size, expanded again for the proofing document)
+TCE_PREV_IDS_MODE = os.getenv("TCE_PREV_IDS_MODE", "full")
+
+# Claim-check: claim-checked variables whose JSON exceeds the threshold are
+# stored in a content-addressed blob store shared by all workers and passed
+# through Zeebe as references. 0 disables claim-check, handlers then get their
+# variables untouched, so keep it on until running instances hold no references.
+CLAIM_CHECK_THRESHOLD_BYTES = int(os.getenv("CLAIM_CHECK_THRESHOLD_BYTES", "0"))
+CLAIM_CHECK_VARIABLES = [name.strip() for name in os.getenv(
+    "CLAIM_CHECK_VARIABLES", "sensor_data,product_footprint,proofing_document").split(",") if name.strip()]
+CLAIM_CHECK_STORE = os.getenv("CLAIM_CHECK_STORE", "file")  # file or sqlite
+CLAIM_CHECK_PATH = os.getenv("CLAIM_CHECK_PATH", "claim_check")
+CLAIM_CHECK_COMPRESSION = os.getenv("CLAIM_CHECK_COMPRESSION", "gzip")
+CLAIM_CHECK_CACHE_ENTRIES = int(os.getenv("CLAIM_CHECK_CACHE_ENTRIES", "256"))
+
+# Prometheus metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "8000"))
+# Share of jobs of async handlers whose variable sizes are measured, which
+# serializes them on the event loop; blocking handlers measure every job on
+# their own thread
+METRICS_VARIABLE_SAMPLE_RATE = float(os.getenv("METRICS_VARIABLE_SAMPLE_RATE", "0.1"))
+
+# Tracing: span exporter (none, jsonl, http), JSONL file and collector endpoint
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_JSONL_PATH = os.getenv("TRACING_JSONL_PATH", "logs/traces.jsonl")
+TRACING_COLLECTOR_URL = os.getenv("TRACING_COLLECTOR_URL", "http://localhost:4318/spans")
+
 # Logging
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 
@@ -24,3 +122,55 @@ ACTIVITIES_OUTPUT_PATH = os.environ.get(
 
 # Service timeouts (seconds)
 REQUEST_TIMEOUT = int(os.environ.get("REQUEST_TIMEOUT", "30"))
+
+# Sensor data service HTTP client: keep-alive pool per worker process, connect
+# and read timeouts, and retries with jittered exponential backoff. Only
+# connection errors and the statuses below are retried; read errors only if
+# the service deduplicates requests by tceId.
+SENSOR_SERVICE_API_URL = os.getenv(
+    "SENSOR_SERVICE_API_URL", "http://localhost:8000")
+SENSOR_POOL_SIZE = int(os.getenv("SENSOR_POOL_SIZE", "32"))
+SENSOR_CONNECT_TIMEOUT = float(os.getenv("SENSOR_CONNECT_TIMEOUT", "3.05"))
+SENSOR_READ_TIMEOUT = float(os.getenv("SENSOR_READ_TIMEOUT", str(REQUEST_TIMEOUT)))
+SENSOR_RETRIES = int(os.getenv("SENSOR_RETRIES", "3"))
+SENSOR_RETRY_BACKOFF = float(os.getenv("SENSOR_RETRY_BACKOFF", "0.2"))
+SENSOR_RETRY_JITTER = float(os.getenv("SENSOR_RETRY_JITTER", "0.2"))
+SENSOR_RETRY_STATUSES = os.getenv("SENSOR_RETRY_STATUSES", "429,503")
+SENSOR_RETRY_READ_ERRORS = os.getenv(
+    "SENSOR_RETRY_READ_ERRORS", "false").lower() in ("1", "true", "yes")
+
+# Resilience of sensor data calls per worker process: the circuit opens when
+# at least SENSOR_CIRCUIT_FAILURE_RATE of the recent calls failed or took
+# longer than SENSOR_CIRCUIT_SLOW_CALL_SECONDS, and probes again after
+# SENSOR_CIRCUIT_OPEN_SECONDS. At most SENSOR_MAX_CONCURRENCY calls run at
+# once, others wait up to SENSOR_LIMIT_TIMEOUT. SENSOR_HEDGE starts a second
+# request after the p95 latency; it only applies with SENSOR_RETRY_READ_ERRORS,
+# which states that the service deduplicates by tceId.
+SENSOR_CIRCUIT_FAILURE_RATE = float(os.getenv("SENSOR_CIRCUIT_FAILURE_RATE", "0.5"))
+SENSOR_CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("SENSOR_CIRCUIT_SLOW_CALL_SECONDS", "5"))
+SENSOR_CIRCUIT_OPEN_SECONDS = float(os.getenv("SENSOR_CIRCUIT_OPEN_SECONDS", "30"))
+SENSOR_MAX_CONCURRENCY = int(os.getenv("SENSOR_MAX_CONCURRENCY", str(SENSOR_POOL_SIZE)))
+SENSOR_LIMIT_TIMEOUT = float(os.getenv("SENSOR_LIMIT_TIMEOUT", "10"))
+SENSOR_HEDGE = os.getenv("SENSOR_HEDGE", "false").lower() in ("1", "true", "yes")
+
+# Sensor data responses cached per process instance and activity, so
+# redelivered transport jobs reuse their tceId and data (empty path disables)
+SENSOR_CACHE_PATH = os.getenv("SENSOR_CACHE_PATH", "sensor_data_cache.db")
+SENSOR_CACHE_TTL_SECONDS = float(os.getenv("SENSOR_CACHE_TTL_SECONDS", "86400"))
+
+# Coalesce concurrent sensor data requests into calls of the batch endpoint:
+# requests wait up to SENSOR_BATCH_WINDOW_MS for others (0 disables batching)
+# and a batch is sent as soon as it holds SENSOR_BATCH_MAX_SIZE requests.
+SENSOR_BATCH_WINDOW_MS = float(os.getenv("SENSOR_BATCH_WINDOW_MS", "0"))
+SENSOR_BATCH_MAX_SIZE = int(os.getenv("SENSOR_BATCH_MAX_SIZE", "50"))
+
+# Signatures of sensor data records are checked before a proof is requested:
+# "reject" fails collect_hoc_toc_data on bad records, "warn" only logs them.
+# Only switch to "reject" once the sensor service's signatures verify.
+# Batches of at least SENSOR_SIGNATURE_PARALLEL_THRESHOLD records are verified
+# on SENSOR_SIGNATURE_PROCESSES processes per worker process (0 for the
+# available CPUs divided by the worker processes).
+SENSOR_SIGNATURE_CHECK = os.getenv("SENSOR_SIGNATURE_CHECK", "warn")
+SENSOR_SIGNATURE_PROCESSES = int(os.getenv("SENSOR_SIGNATURE_PROCESSES", "0"))
+SENSOR_SIGNATURE_PARALLEL_THRESHOLD = int(os.getenv("SENSOR_SIGNATURE_PARALLEL_THRESHOLD", "256"))
+SENSOR_KEY_CACHE_ENTRIES = int(os.getenv("SENSOR_KEY_CACHE_ENTRIES", "1024"))
@@ -1,32 +1,81 @@
 """
 Camunda Service - Main entry point
 This module initializes and starts the Zeebe worker service for processing Camunda tasks.
+
+Usage:
+    python main.py [--processes N]
+
+With more than one process a supervisor forks N worker processes, each with
+its own Zeebe channel and worker, and restarts them if they die or hang.
 """
 
+import argparse
 import asyncio
+import signal
+import sys
+from typing import Optional
 
 from pyzeebe import create_insecure_channel, ZeebeClient, ZeebeWorker
 
-from config.settings import ZEEBE_ADDRESS
+from config.settings import ZEEBE_ADDRESS, KAFKA_PROOF_RESPONSE_TOPIC, TCE_CHAIN_SECRET, WORKER_PROCESSES
 from tasks.worker_tasks import CamundaWorkerTasks
+from utils.kafka import (
+    get_producer_manager,
+    close_producer_managers,
+    get_reply_dispatcher,
+    close_reply_dispatchers,
+)
 from utils.logging_utils import setup_logging
+from utils.metrics import (
+    clear_multiprocess_dir,
+    mark_process_dead,
+    multiprocess_enabled,
+    start_metrics_server,
+)
+from utils.supervisor import WorkerSupervisor, default_process_count, send_heartbeats
+from utils.tracing import configure_tracing, shutdown_tracing
 
 
-async def main():
+async def main(heartbeat=None):
     """
     Main entry point for the Camunda Service.
     Sets up the Zeebe client and worker, registers tasks, and starts the worker.
+
+    Args:
+        heartbeat: Shared value to report liveness to the supervisor, None when unsupervised
     """
     # Setup logging
     logger = setup_logging()
     logger.info("Starting Camunda Service")
 
+    configure_tracing()
+    if not TCE_CHAIN_SECRET:
+        logger.warning("TCE_CHAIN_SECRET is not set, TCE chain digests are unkeyed "
+                       "and do not protect footprints against tampering")
+
     # Create Zeebe channel and client
     logger.info(f"Connecting to Zeebe at {ZEEBE_ADDRESS}")
     channel = create_insecure_channel(grpc_address=ZEEBE_ADDRESS)
     client = ZeebeClient(channel)
     worker = ZeebeWorker(channel)
 
+    # Stop polling and finish running jobs on SIGTERM (pod shutdown, supervisor)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(
+            signum, lambda: asyncio.ensure_future(worker.stop()))
+
+    heartbeat_task = None
+    if heartbeat is not None:
+        heartbeat_task = asyncio.create_task(send_heartbeats(heartbeat))
+    else:
+        # Supervised workers are served by the supervisor
+        start_metrics_server()
+
+    # Open the shared Kafka producer and reply consumer once for the lifetime of the worker
+    get_producer_manager().start()
+    get_reply_dispatcher(KAFKA_PROOF_RESPONSE_TOPIC).start()
+
     # Initialize worker tasks
     logger.info("Registering worker tasks")
     worker_tasks = CamundaWorkerTasks(worker, client)
@@ -39,9 +88,60 @@ async def main():
     except Exception as e:
         logger.error(f"Error in worker: {e}", exc_info=True)
     finally:
+        if heartbeat_task is not None:
+            heartbeat_task.cancel()
         logger.info("Closing Zeebe connections")
         await channel.close()
+        logger.info("Releasing service resources")
+        await worker_tasks.close()
+        logger.info("Closing Kafka producer and reply consumer")
+        close_reply_dispatchers()
+        close_producer_managers()
+        shutdown_tracing()
+
+
+def run_worker_process(index: int, heartbeat) -> None:
+    """
+    Entry point of a supervised worker process.
+
+    Args:
+        index: Worker slot number
+        heartbeat: Shared value to report liveness to the supervisor
+    """
+    asyncio.run(main(heartbeat))
+
+
+def run_supervisor(processes: int) -> int:
+    """
+    Fork and supervise worker processes.
+
+    Args:
+        processes: Number of worker processes
+
+    Returns:
+        Process exit code
+    """
+    logger = setup_logging()
+    logger.info(f"Starting supervisor with {processes} worker processes")
+    if multiprocess_enabled():
+        clear_multiprocess_dir()
+        start_metrics_server()
+    else:
+        logger.warning(
+            "PROMETHEUS_MULTIPROC_DIR is not set, metrics are disabled in multi-process mode")
+    return WorkerSupervisor(run_worker_process, processes, on_exit=mark_process_dead).run()
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Camunda Service Zeebe worker")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES,
+                        help="Worker processes, 0 for one per available CPU (default: WORKER_PROCESSES)")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    processes = args.processes or default_process_count()
+    if processes > 1:
+        sys.exit(run_supervisor(processes))
     asyncio.run(main())
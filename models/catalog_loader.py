@@ -0,0 +1,206 @@
+"""
+Streaming import of HOC/TOC emission-factor catalogs.
+
+Catalogs are CSV or JSONL files with one record per row/line in the
+HocData/TocData field layout; CSV columns holding lists (energyCarriers,
+certifications) contain JSON. Records are validated in batches, written to
+staging tables with executemany in chunked transactions, and swapped in for
+the live tables in one short transaction once the whole file is loaded, so
+live lookups keep reading the previous version until then.
+
+Usage:
+    python -m models.catalog_loader catalog.jsonl [--chunk-size 5000]
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from models.database import (
+    HOC_INSERT_SQL,
+    TOC_INSERT_SQL,
+    HocTocDatabase,
+    hoc_row,
+    toc_row,
+)
+from models.logistics_operations import HocData, TocData
+
+STAGING_SUFFIX = "_staging"
+JSON_COLUMNS = ("energyCarriers", "certifications")
+
+_KINDS = {
+    "toc": ("toc_data", TOC_INSERT_SQL, TypeAdapter(List[TocData]), toc_row),
+    "hoc": ("hoc_data", HOC_INSERT_SQL, TypeAdapter(List[HocData]), hoc_row),
+}
+
+
+def read_catalog(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the records of a CSV or JSONL catalog file.
+
+    Args:
+        path: Path to a .csv or .jsonl file
+
+    Yields:
+        One record dictionary per row or line
+    """
+    if path.endswith(".csv"):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                record: Dict[str, Any] = {
+                    key: (value if value != "" else None) for key, value in row.items()}
+                for column in JSON_COLUMNS:
+                    if record.get(column) is not None:
+                        record[column] = json.loads(record[column])
+                yield record
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _record_kind(record: Dict[str, Any]) -> str:
+    """Tell TOC from HOC records by their id field."""
+    if record.get("tocId") is not None:
+        return "toc"
+    if record.get("hocId") is not None:
+        return "hoc"
+    raise ValueError(f"Catalog record without tocId or hocId: {record}")
+
+
+class CatalogLoader:
+    """Loads large emission-factor catalogs into hoc_data/toc_data."""
+
+    def __init__(self, db: HocTocDatabase, chunk_size: int = 5000):
+        """
+        Initialize the CatalogLoader.
+
+        Args:
+            db: Database to import into
+            chunk_size: Records validated and committed per transaction
+        """
+        if db.read_only:
+            raise ValueError("Cannot import a catalog into a read-only database")
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def load_file(self, path: str) -> Dict[str, int]:
+        """
+        Import a CSV or JSONL catalog file, replacing the tables it contains records for.
+
+        Args:
+            path: Path to the catalog file
+
+        Returns:
+            Number of imported records per kind ("toc", "hoc")
+        """
+        return self.load(read_catalog(path))
+
+    def load(self, records: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Import catalog records, replacing the tables they contain records for.
+
+        Args:
+            records: Iterable of HOC and/or TOC record dictionaries
+
+        Returns:
+            Number of imported records per kind ("toc", "hoc")
+
+        Raises:
+            ValueError: If a record is invalid; the live tables are left unchanged
+        """
+        counts = {"toc": 0, "hoc": 0}
+
+        with self.db.pool.connection() as conn:
+            self._reset_staging(conn)
+            try:
+                iterator = iter(records)
+                while True:
+                    chunk = list(islice(iterator, self.chunk_size))
+                    if not chunk:
+                        break
+                    for kind, count in self._write_chunk(conn, chunk, counts).items():
+                        counts[kind] += count
+                    conn.commit()
+
+                self._swap(conn, [kind for kind, count in counts.items() if count])
+            except Exception:
+                conn.rollback()
+                self._drop_staging(conn)
+                raise
+
+        return counts
+
+    def _write_chunk(self, conn: sqlite3.Connection, chunk: List[Dict[str, Any]],
+                     counts: Dict[str, int]) -> Dict[str, int]:
+        """Validate one chunk per kind and insert it into the staging tables."""
+        by_kind: Dict[str, List[Dict[str, Any]]] = {"toc": [], "hoc": []}
+        for record in chunk:
+            by_kind[_record_kind(record)].append(record)
+
+        written = {}
+        for kind, kind_records in by_kind.items():
+            if not kind_records:
+                continue
+            table, insert_sql, adapter, to_row = _KINDS[kind]
+            try:
+                adapter.validate_python(kind_records)
+            except ValidationError as e:
+                raise ValueError(
+                    f"Invalid {kind} record after {counts[kind]} imported records: {e}") from e
+            # Validated records already have the stored layout, no need to dump the models
+            conn.executemany(
+                insert_sql.format(table=table + STAGING_SUFFIX),
+                (to_row(record) for record in kind_records))
+            written[kind] = len(kind_records)
+        return written
+
+    def _reset_staging(self, conn: sqlite3.Connection) -> None:
+        """Create empty staging tables."""
+        self._drop_staging(conn)
+        self.db._create_tables(conn, STAGING_SUFFIX)
+        conn.commit()
+
+    def _drop_staging(self, conn: sqlite3.Connection) -> None:
+        """Remove the staging tables."""
+        for table, _, _, _ in _KINDS.values():
+            conn.execute(f"DROP TABLE IF EXISTS {table}{STAGING_SUFFIX}")
+        conn.commit()
+
+    def _swap(self, conn: sqlite3.Connection, kinds: List[str]) -> None:
+        """Atomically replace the live tables of the given kinds with their staging tables."""
+        conn.execute("BEGIN IMMEDIATE")
+        for kind in kinds:
+            table = _KINDS[kind][0]
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(
+                f"ALTER TABLE {table}{STAGING_SUFFIX} RENAME TO {table}")
+        conn.commit()
+        self._drop_staging(conn)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Import a HOC/TOC emission-factor catalog (CSV or JSONL).")
+    parser.add_argument("path", help="Catalog file (.csv or .jsonl)")
+    parser.add_argument("--db", default=None,
+                        help="SQLite database, defaults to DatabaseConfig.DB_PATH")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    db = HocTocDatabase(args.db)
+    try:
+        counts = CatalogLoader(db, chunk_size=args.chunk_size).load_file(args.path)
+    finally:
+        db.close()
+    print(f"Imported {counts['toc']} TOC and {counts['hoc']} HOC records")
+
+
+if __name__ == "__main__":
+    main()
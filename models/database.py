@@ -1,22 +1,236 @@
 import sqlite3
 import json
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
 from config.database_config import DatabaseConfig
 
 
+class SQLiteConnectionPool:
+    """
+    Thread-safe pool of reusable SQLite connections.
+
+    Connections are opened lazily up to pool_size and handed out to one
+    thread at a time. Writable connections use WAL journaling so readers never
+    block on writers; read-only pools open the file with immutable=1, which
+    skips locking and change detection entirely.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 pool_size: int = DatabaseConfig.POOL_SIZE,
+                 timeout: float = DatabaseConfig.TIMEOUT,
+                 read_only: bool = DatabaseConfig.READ_ONLY,
+                 mmap_size: int = DatabaseConfig.MMAP_SIZE,
+                 cached_statements: int = DatabaseConfig.CACHED_STATEMENTS):
+        """
+        Initialize the SQLiteConnectionPool.
+
+        Args:
+            db_path: Path to the SQLite database file
+            pool_size: Maximum number of open connections
+            timeout: Seconds to wait for a database lock or a free connection
+            read_only: Open the database as immutable, for replicas that never write
+            mmap_size: Bytes of the database file accessed through memory-mapped I/O
+            cached_statements: Number of prepared statements cached per connection
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection."""
+        if self.read_only:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout,
+                                   check_same_thread=DatabaseConfig.CHECK_SAME_THREAD,
+                                   cached_statements=self.cached_statements)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout,
+                                   check_same_thread=DatabaseConfig.CHECK_SAME_THREAD,
+                                   cached_statements=self.cached_statements)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, open a new one or wait for one to be released."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.pool_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No SQLite connection available for {self.db_path} within {self.timeout}s")
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Never hand a broken connection to the next caller
+            with self._lock:
+                self._opened -= 1
+            conn.close()
+            return
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection for the duration of the with block.
+
+        Uncommitted changes are rolled back when the connection is returned.
+
+        Yields:
+            sqlite3.Connection owned by the caller until the block exits
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+HOC_INSERT_SQL = '''
+    INSERT OR REPLACE INTO {table}
+    (hoc_id, passhub_type, energy_carriers, co2e_intensity_wtw,
+     co2e_intensity_ttw, hub_activity_unit)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+TOC_INSERT_SQL = '''
+    INSERT OR REPLACE INTO {table}
+    (toc_id, certifications, description, mode, load_factor,
+     empty_distance_factor, temperature_control, truck_loading_sequence,
+     air_shipping_option, flight_length, energy_carriers,
+     co2e_intensity_wtw, co2e_intensity_ttw, transport_activity_unit)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def hoc_row(data: dict) -> tuple:
+    """Convert HOC data in the HocData field layout to a hoc_data row."""
+    return (
+        data["hocId"],
+        data["passhubType"],
+        json.dumps(data["energyCarriers"]),
+        data["co2eIntensityWTW"],
+        data["co2eIntensityTTW"],
+        data["hubActivityUnit"]
+    )
+
+
+def toc_row(data: dict) -> tuple:
+    """Convert TOC data in the TocData field layout to a toc_data row."""
+    return (
+        data["tocId"],
+        json.dumps(data.get("certifications", [])),
+        data["description"],
+        data["mode"],
+        data["loadFactor"],
+        data["emptyDistanceFactor"],
+        data.get("temperatureControl"),
+        data.get("truckLoadingSequence"),
+        data.get("airShippingOption"),
+        data.get("flightLength"),
+        json.dumps(data["energyCarriers"]),
+        data["co2eIntensityWTW"],
+        data["co2eIntensityTTW"],
+        data["transportActivityUnit"]
+    )
+
+
 class HocTocDatabase:
-    def __init__(self):
-        self.db_path = DatabaseConfig.DB_PATH
+    def __init__(self, db_path: Optional[str] = None, read_only: bool = DatabaseConfig.READ_ONLY):
+        self.db_path = db_path or DatabaseConfig.DB_PATH
         self.timeout = DatabaseConfig.TIMEOUT
-        self.init_database()
+        self.read_only = read_only
+        self.pool = SQLiteConnectionPool(
+            self.db_path, timeout=self.timeout, read_only=read_only)
+        if not read_only:
+            self.init_database()
+
+        # Dedicated connection that never writes, so it sees every commit
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_lock = threading.Lock()
+
+    def close(self):
+        """Close all pooled connections."""
+        self.pool.close()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+    def data_version(self) -> int:
+        """
+        Return SQLite's data_version, which changes whenever another connection commits.
+
+        Returns:
+            Current data version as seen by a dedicated read connection
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self.pool._connect()
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
 
     def init_database(self):
         """Initialize the database with required tables."""
-        conn = sqlite3.connect(self.db_path)
+        with self.pool.connection() as conn:
+            self._create_tables(conn)
+            conn.commit()
+
+    def _create_tables(self, conn: sqlite3.Connection, suffix: str = ""):
+        """
+        Create the HOC and TOC tables if they do not exist.
+
+        Args:
+            conn: Connection to create the tables on
+            suffix: Optional table name suffix, used for staging tables
+        """
         cursor = conn.cursor()
 
         # Create HOC (Hub of Consumption) table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hoc_data (
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS hoc_data{suffix} (
                 hoc_id TEXT PRIMARY KEY,
                 passhub_type TEXT,
                 energy_carriers TEXT,  -- JSON string
@@ -27,8 +241,8 @@ class HocTocDatabase:
         ''')
 
         # Create TOC (Transport Operation Category) table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS toc_data (
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS toc_data{suffix} (
                 toc_id TEXT PRIMARY KEY,
                 certifications TEXT,  -- JSON string
                 description TEXT,
@@ -46,12 +260,14 @@ class HocTocDatabase:
             )
         ''')
 
-        conn.commit()
-        conn.close()
-
     def populate_from_mock_data(self, mock_data_function):
         """Populate database from your existing mock data."""
-        conn = sqlite3.connect(self.db_path)
+        with self.pool.connection() as conn:
+            self._insert_mock_data(conn, mock_data_function)
+            conn.commit()
+
+    def _insert_mock_data(self, conn: sqlite3.Connection, mock_data_function):
+        """Insert the mock HOC and TOC records."""
         cursor = conn.cursor()
 
         all_ids = ["100", "101", "102", "103",
@@ -63,44 +279,9 @@ class HocTocDatabase:
                 continue
 
             if "hocId" in data:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO hoc_data 
-                    (hoc_id, passhub_type, energy_carriers, co2e_intensity_wtw, 
-                     co2e_intensity_ttw, hub_activity_unit)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    data["hocId"],
-                    data["passhubType"],
-                    json.dumps(data["energyCarriers"]),
-                    data["co2eIntensityWTW"],
-                    data["co2eIntensityTTW"],
-                    data["hubActivityUnit"]
-                ))
+                cursor.execute(HOC_INSERT_SQL.format(
+                    table="hoc_data"), hoc_row(data))
 
             elif "tocId" in data:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO toc_data 
-                    (toc_id, certifications, description, mode, load_factor, 
-                     empty_distance_factor, temperature_control, truck_loading_sequence,
-                     air_shipping_option, flight_length, energy_carriers, 
-                     co2e_intensity_wtw, co2e_intensity_ttw, transport_activity_unit)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    data["tocId"],
-                    json.dumps(data.get("certifications", [])),
-                    data["description"],
-                    data["mode"],
-                    data["loadFactor"],
-                    data["emptyDistanceFactor"],
-                    data.get("temperatureControl"),
-                    data.get("truckLoadingSequence"),
-                    data.get("airShippingOption"),
-                    data.get("flightLength"),
-                    json.dumps(data["energyCarriers"]),
-                    data["co2eIntensityWTW"],
-                    data["co2eIntensityTTW"],
-                    data["transportActivityUnit"]
-                ))
-
-        conn.commit()
-        conn.close()
+                cursor.execute(TOC_INSERT_SQL.format(
+                    table="toc_data"), toc_row(data))
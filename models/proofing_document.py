@@ -1,15 +1,20 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from models.product_footprint import ProductFootprint
 from models.logistics_operations import TocData, HocData
 from models.sensor_data import TceSensorData
 
 
+class SignedSensorData(TceSensorData):
+    # Only kept to verify signatures before proving, not sent to the proofing service
+    rawSensorData: Optional[str] = Field(default=None, exclude=True)
+
+
 class ProofingDocument(BaseModel):
     productFootprint: ProductFootprint
     tocData: list[TocData]
     hocData: list[HocData]
-    signedSensorData: Optional[list[TceSensorData]] = None
+    signedSensorData: Optional[list[SignedSensorData]] = None
 
 
 class ProofResponse(BaseModel):
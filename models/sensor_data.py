@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 from models.product_footprint import Distance
@@ -14,3 +16,6 @@ class TceSensorData(BaseModel):
     sensorkey: str
     signedSensorData: str
     sensorData: SensorData
+    # sensorData exactly as the sensor signed it, if the service sent it as JSON string;
+    # travels in the sensor_data variable until collect_hoc_toc_data verifies it
+    rawSensorData: Optional[str] = None
@@ -1,76 +1,236 @@
+import threading
+import time
+
+from config.database_config import DatabaseConfig
 from models.database import HocTocDatabase
-from models.proofing_document import ProofingDocument
+from models.proofing_document import ProofingDocument, SignedSensorData
 from models.product_footprint import ProductFootprint
-from typing import Optional, Dict, Any
-import sqlite3
+from typing import Optional, Dict, Any, Iterable, List
 import json
 
 from models.sensor_data import TceSensorData
 from utils.data_utils import get_mock_data
 from models.logistics_operations import HocData, TocData
+from utils.cache import LRUCache
+from utils.signatures import SignatureVerifier
+from utils.tce_chain import expand_prev_tce_ids, verify_chain
+from utils.tracing import traced
+
+
+# Stay well below SQLite's limit on host parameters per statement
+MAX_IDS_PER_QUERY = 500
+
+
+def _hoc_row_to_dict(row) -> Dict[str, Any]:
+    """Convert a hoc_data row to the HocData field layout."""
+    return {
+        "hocId": row[0],
+        "passhubType": row[1],
+        "energyCarriers": json.loads(row[2]),
+        "co2eIntensityWTW": row[3],
+        "co2eIntensityTTW": row[4],
+        "hubActivityUnit": row[5]
+    }
+
+
+def _toc_row_to_dict(row) -> Dict[str, Any]:
+    """Convert a toc_data row to the TocData field layout."""
+    return {
+        "tocId": row[0],
+        "certifications": json.loads(row[1]),
+        "description": row[2],
+        "mode": row[3],
+        "loadFactor": row[4],
+        "emptyDistanceFactor": row[5],
+        "temperatureControl": row[6],
+        "truckLoadingSequence": row[7],
+        "airShippingOption": row[8],
+        "flightLength": row[9],
+        "energyCarriers": json.loads(row[10]),
+        "co2eIntensityWTW": row[11],
+        "co2eIntensityTTW": row[12],
+        "transportActivityUnit": row[13]
+    }
 
 
 class HocTocService:
-    def __init__(self):
-        self.db = HocTocDatabase()
+    def __init__(self,
+                 db: Optional[HocTocDatabase] = None,
+                 cache_max_entries: int = DatabaseConfig.CACHE_MAX_ENTRIES,
+                 cache_ttl_seconds: Optional[float] = DatabaseConfig.CACHE_TTL_SECONDS,
+                 version_check_interval: float = DatabaseConfig.CACHE_VERSION_CHECK_INTERVAL,
+                 signature_verifier: Optional[SignatureVerifier] = None):
+        self.db = db or HocTocDatabase()
+        self.signature_verifier = signature_verifier or SignatureVerifier()
         # One-time setup: populate database if empty
         self._populate_database_if_needed()
 
+        # Validated TocData/HocData keyed by id, dropped when the database changes
+        self.toc_cache = LRUCache(cache_max_entries, cache_ttl_seconds)
+        self.hoc_cache = LRUCache(cache_max_entries, cache_ttl_seconds)
+        self.version_check_interval = version_check_interval
+        self._data_version = self.db.data_version()
+        self._next_version_check = time.monotonic() + version_check_interval
+        self._version_check_lock = threading.Lock()
+
     def _populate_database_if_needed(self):
         """Populate database from mock data if it's empty."""
+        # Read-only replicas serve whatever catalog they were shipped with
+        if self.db.read_only:
+            return
         # Check if database has data
         test_data = self.get_hoc_data("100")
         if test_data is None:
             self.db.populate_from_mock_data(get_mock_data)
 
+    def close(self):
+        """Release the pooled database connections and the signature verification processes."""
+        self.db.close()
+        self.signature_verifier.close()
+
+    def reload(self):
+        """Drop all cached emission factors, e.g. after a catalog import."""
+        self.toc_cache.clear()
+        self.hoc_cache.clear()
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return hit/miss statistics of the emission factor caches.
+
+        Returns:
+            Dictionary with the statistics of the toc and hoc caches
+        """
+        return {"toc": self.toc_cache.stats(), "hoc": self.hoc_cache.stats()}
+
+    def _check_data_version(self):
+        """Clear the caches if another connection committed since the last check."""
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+        with self._version_check_lock:
+            if now < self._next_version_check:
+                return
+            self._next_version_check = now + self.version_check_interval
+            data_version = self.db.data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self.reload()
+
+    @traced("hoc_toc.get_toc_models")
+    def get_toc_models(self, toc_ids: Iterable[str]) -> Dict[str, TocData]:
+        """
+        Get validated TOC data for many IDs, served from the cache where possible.
+
+        Args:
+            toc_ids: TOC IDs, duplicates are resolved once
+
+        Returns:
+            Dictionary mapping each found TOC ID to its TocData
+        """
+        return self._get_models(toc_ids, self.toc_cache, self.get_toc_data_bulk, TocData)
+
+    @traced("hoc_toc.get_hoc_models")
+    def get_hoc_models(self, hoc_ids: Iterable[str]) -> Dict[str, HocData]:
+        """
+        Get validated HOC data for many IDs, served from the cache where possible.
+
+        Args:
+            hoc_ids: HOC IDs, duplicates are resolved once
+
+        Returns:
+            Dictionary mapping each found HOC ID to its HocData
+        """
+        return self._get_models(hoc_ids, self.hoc_cache, self.get_hoc_data_bulk, HocData)
+
+    def _get_models(self, ids: Iterable[str], cache: LRUCache, fetch_bulk, model):
+        """Resolve ids from the cache and fetch and validate the misses in bulk."""
+        self._check_data_version()
+
+        models = {}
+        missing: List[str] = []
+        for id_val in dict.fromkeys(ids):
+            cached = cache.get(id_val)
+            if cached is None:
+                missing.append(id_val)
+            else:
+                models[id_val] = cached
+
+        if missing:
+            for id_val, raw_data in fetch_bulk(missing).items():
+                validated = model.model_validate(raw_data)
+                cache.put(id_val, validated)
+                models[id_val] = validated
+        return models
+
+    @traced("hoc_toc.get_hoc_data")
     def get_hoc_data(self, hoc_id: str) -> Optional[Dict[str, Any]]:
         """Get HOC data by ID."""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM hoc_data WHERE hoc_id = ?', (hoc_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT * FROM hoc_data WHERE hoc_id = ?', (hoc_id,)).fetchone()
 
         if row:
-            return {
-                "hocId": row[0],
-                "passhubType": row[1],
-                "energyCarriers": json.loads(row[2]),
-                "co2eIntensityWTW": row[3],
-                "co2eIntensityTTW": row[4],
-                "hubActivityUnit": row[5]
-            }
+            return _hoc_row_to_dict(row)
         return None
 
+    @traced("hoc_toc.get_toc_data")
     def get_toc_data(self, toc_id: str) -> Optional[Dict[str, Any]]:
         """Get TOC data by ID."""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT * FROM toc_data WHERE toc_id = ?', (toc_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.db.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT * FROM toc_data WHERE toc_id = ?', (toc_id,)).fetchone()
 
         if row:
-            return {
-                "tocId": row[0],
-                "certifications": json.loads(row[1]),
-                "description": row[2],
-                "mode": row[3],
-                "loadFactor": row[4],
-                "emptyDistanceFactor": row[5],
-                "temperatureControl": row[6],
-                "truckLoadingSequence": row[7],
-                "airShippingOption": row[8],
-                "flightLength": row[9],
-                "energyCarriers": json.loads(row[10]),
-                "co2eIntensityWTW": row[11],
-                "co2eIntensityTTW": row[12],
-                "transportActivityUnit": row[13]
-            }
+            return _toc_row_to_dict(row)
         return None
 
+    @traced("hoc_toc.get_hoc_data_bulk")
+    def get_hoc_data_bulk(self, hoc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get HOC data for many IDs with one query per chunk of unique IDs.
+
+        Args:
+            hoc_ids: HOC IDs, duplicates are fetched once
+
+        Returns:
+            Dictionary mapping each found HOC ID to its data
+        """
+        return {
+            row[0]: _hoc_row_to_dict(row)
+            for row in self._select_by_ids("hoc_data", "hoc_id", hoc_ids)
+        }
+
+    @traced("hoc_toc.get_toc_data_bulk")
+    def get_toc_data_bulk(self, toc_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get TOC data for many IDs with one query per chunk of unique IDs.
+
+        Args:
+            toc_ids: TOC IDs, duplicates are fetched once
+
+        Returns:
+            Dictionary mapping each found TOC ID to its data
+        """
+        return {
+            row[0]: _toc_row_to_dict(row)
+            for row in self._select_by_ids("toc_data", "toc_id", toc_ids)
+        }
+
+    def _select_by_ids(self, table: str, id_column: str, ids: Iterable[str]) -> list:
+        """Fetch the rows of table whose id_column is one of the unique ids."""
+        unique_ids = list(dict.fromkeys(ids))
+        rows = []
+        if not unique_ids:
+            return rows
+
+        with self.db.pool.connection() as conn:
+            for start in range(0, len(unique_ids), MAX_IDS_PER_QUERY):
+                chunk = unique_ids[start:start + MAX_IDS_PER_QUERY]
+                placeholders = ", ".join("?" * len(chunk))
+                rows.extend(conn.execute(
+                    f'SELECT * FROM {table} WHERE {id_column} IN ({placeholders})', chunk).fetchall())
+        return rows
+
     def get_transport_data(self, id: str) -> Optional[Dict[str, Any]]:
         """Get data from database by ID, checking HOC and TOC tables."""
 
@@ -84,32 +244,55 @@ class HocTocService:
 
         return None
 
-    def collect_hoc_toc_data(self, product_footprint: dict, sensor_data: Optional[list[dict]] = None) -> dict:
-        """Collect HOC and TOC data based on product footprint and return a proofing document."""
+    @traced("hoc_toc.check_signatures")
+    def check_signatures(self, sensor_data: List[TceSensorData]) -> None:
+        """Verify the signatures of a shipment's sensor data records, see SignatureVerifier.check."""
+        self.signature_verifier.check(sensor_data)
+
+    def collect_hoc_toc_data(self, product_footprint: dict, sensor_data: Optional[list[dict]] = None,
+                             tce_chain_digest: Optional[dict] = None) -> dict:
+        """
+        Collect HOC and TOC data based on product footprint and return a proofing document.
+
+        The footprint is validated in full here, including its whole TCE chain
+        against tce_chain_digest if the process carries one. TCEs storing only
+        their parent id get their full prevTceIds in the proofing document.
+        The signatures of all sensor data records are verified as one batch,
+        so bad records are rejected before a proof is spent on them.
+
+        Raises:
+            TceChainError: If the TCE chain does not match its digest
+            SensorSignatureError: If a sensor data signature does not verify
+        """
         product_footprint_verified = ProductFootprint.model_validate(
             product_footprint)
+        verify_chain(product_footprint_verified, tce_chain_digest)
+        footprint_data = product_footprint_verified.extensions[0].data
+        footprint_data.tces = expand_prev_tce_ids(footprint_data.tces)
+        signed_sensor_data = [] if sensor_data is None else [
+            SignedSensorData.model_validate(sd) for sd in sensor_data
+        ]
+        self.check_signatures(signed_sensor_data)
         proofingDocument = ProofingDocument(
             productFootprint=product_footprint_verified,
             tocData=[],
             hocData=[],
-            signedSensorData=[] if sensor_data is None else [
-                TceSensorData.model_validate(sd) for sd in sensor_data
-            ]
+            signedSensorData=signed_sensor_data
         )
 
-        for ids in product_footprint_verified.extensions[0].data.tces:
-            if ids.tocId is not None:
-                raw_data = self.get_transport_data(ids.tocId)
-                if raw_data:
-                    # Validate through Pydantic model first
-                    validated_toc_data = TocData.model_validate(raw_data)
-                    proofingDocument.tocData.append(validated_toc_data)
-            if ids.hocId is not None:
-                raw_data = self.get_transport_data(ids.hocId)
-                if raw_data:
-                    # Validate through Pydantic model first
-                    validated_hoc_data = HocData.model_validate(raw_data)
-                    proofingDocument.hocData.append(validated_hoc_data)
+        tces = product_footprint_verified.extensions[0].data.tces
+
+        # Resolve all unique ids of the footprint from the cache, or with one query per table
+        toc_data = self.get_toc_models(
+            tce.tocId for tce in tces if tce.tocId is not None)
+        hoc_data = self.get_hoc_models(
+            tce.hocId for tce in tces if tce.hocId is not None)
+
+        for ids in tces:
+            if ids.tocId is not None and ids.tocId in toc_data:
+                proofingDocument.tocData.append(toc_data[ids.tocId])
+            if ids.hocId is not None and ids.hocId in hoc_data:
+                proofingDocument.hocData.append(hoc_data[ids.hocId])
 
         result = {
             "proofing_document": proofingDocument.model_dump()
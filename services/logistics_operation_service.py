@@ -1,28 +1,65 @@
+import asyncio
+import logging
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pyzeebe import Job
 from models.product_footprint import ProductFootprint, TceData, Distance
-from services.sensor_data_service import SensorDataService
+from services.sensor_data_cache import SensorDataCache
+from services.sensor_data_service import AsyncSensorDataService, SensorDataService
+from models.sensor_data import TceSensorData
 from utils.logging_utils import log_service_call
+from config.settings import TCE_PREV_IDS_MODE
+from utils.tce_chain import (
+    PREV_IDS_MODES,
+    chain_digest,
+    check_chain_head,
+    expand_prev_tce_ids,
+    extend_digest,
+    next_prev_tce_ids,
+    verify_chain,
+)
+
+logger = logging.getLogger("camunda_service")
 
 
 class LogisticsOperationService:
     """Service for handling logistics operations including transport and hub procedures."""
 
-    def __init__(self, sensor_data_service: Optional[SensorDataService] = None):
+    def __init__(self, sensor_data_service: Optional[SensorDataService] = None,
+                 prev_ids_mode: str = TCE_PREV_IDS_MODE,
+                 async_sensor_data_service: Optional[AsyncSensorDataService] = None,
+                 sensor_data_cache: Optional[SensorDataCache] = None):
         """
         Initialize the LogisticsOperationService.
 
         Args:
             sensor_data_service: Optional SensorDataService instance. If not provided, a new one will be created.
+            prev_ids_mode: prevTceIds of new TCEs, "full" (all ancestors) or "parent" (direct parent only)
+            async_sensor_data_service: Optional AsyncSensorDataService instance used by
+                execute_transport_procedure_async, created on first use if not provided
+            sensor_data_cache: Optional cache making redelivered transport jobs reuse
+                their tceId and sensor data instead of calling the service again
         """
+        if prev_ids_mode not in PREV_IDS_MODES:
+            raise ValueError(f"Unknown TCE_PREV_IDS_MODE: {prev_ids_mode}")
         self.sensor_data_service = sensor_data_service or SensorDataService()
+        self._async_sensor_data_service = async_sensor_data_service
+        self.sensor_data_cache = sensor_data_cache
+        self.prev_ids_mode = prev_ids_mode
+
+    @property
+    def async_sensor_data_service(self) -> AsyncSensorDataService:
+        """The async sensor data client, created on first use inside the running event loop."""
+        if self._async_sensor_data_service is None:
+            self._async_sensor_data_service = AsyncSensorDataService()
+        return self._async_sensor_data_service
 
     def execute_transport_procedure(self,
                                     toc_id: int,
                                     product_footprint: Dict[str, Any],
                                     job: Job,
-                                    sensor_data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+                                    sensor_data: Optional[List[Dict[str, Any]]] = None,
+                                    tce_chain_digest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Execute transport procedure for a given transport operation category (TOC).
 
@@ -31,31 +68,116 @@ class LogisticsOperationService:
             product_footprint: Product footprint data dictionary
             job: Zeebe Job instance containing process instance and element ID
             sensor_data: Optional list of previous sensor data dictionaries to append to
+            tce_chain_digest: Optional digest of the footprint's TCE chain, see utils.tce_chain
 
         Returns:
-            Dictionary containing updated product footprint and sensor data
+            Dictionary containing updated product footprint, its TCE chain digest and sensor data
+
+        Raises:
+            TceChainError: If the footprint does not match its digest
         """
         log_service_call("LogisticsOperationService",
                          "execute_transport_procedure")
 
-        # Generate new TCE ID
-        new_tce_id = str(uuid.uuid4())
+        product_footprint, tce_chain_digest = self._open_tce_chain(
+            product_footprint, tce_chain_digest)
 
-        # Extract job information
-        process_id = job.process_instance_key
-        element_id = job.element_id
+        cached = self._get_cached_sensor_data(job)
+        if cached is not None:
+            new_tce_id, new_sensor_data = cached
+        else:
+            request = self._sensor_data_request(product_footprint, job)
+            # Get sensor data from external service
+            new_sensor_data = self.sensor_data_service.call_service_sensordata(request)
+            new_tce_id, new_sensor_data = self._put_cached_sensor_data(
+                job, request["tceId"], new_sensor_data)
+
+        return self._append_transport_tce(
+            toc_id, product_footprint, tce_chain_digest, new_tce_id,
+            new_sensor_data, sensor_data)
+
+    async def execute_transport_procedure_async(self,
+                                                toc_id: int,
+                                                product_footprint: Dict[str, Any],
+                                                job: Job,
+                                                sensor_data: Optional[List[Dict[str, Any]]] = None,
+                                                tce_chain_digest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute the transport procedure awaiting the sensor data service on the event loop.
 
-        # Validate and parse product footprint
-        product_footprint_verified = ProductFootprint.model_validate(
-            product_footprint)
+        Behaves like execute_transport_procedure, but concurrent calls overlap
+        their waits for the sensor service instead of each blocking a thread.
 
-        # Get sensor data from external service
-        new_sensor_data = self.sensor_data_service.call_service_sensordata({
-            "shipment_id": product_footprint_verified.extensions[0].data.shipmentId,
-            "tceId": new_tce_id,
-            "camundaProcessInstanceKey": str(process_id),
-            "camundaActivityId": element_id
-        })
+        Args:
+            toc_id: Unique identifier for the transport operation category
+            product_footprint: Product footprint data dictionary
+            job: Zeebe Job instance containing process instance and element ID
+            sensor_data: Optional list of previous sensor data dictionaries to append to
+            tce_chain_digest: Optional digest of the footprint's TCE chain, see utils.tce_chain
+
+        Returns:
+            Dictionary containing updated product footprint, its TCE chain digest and sensor data
+
+        Raises:
+            TceChainError: If the footprint does not match its digest
+        """
+        log_service_call("LogisticsOperationService",
+                         "execute_transport_procedure_async")
+
+        product_footprint, tce_chain_digest = self._open_tce_chain(
+            product_footprint, tce_chain_digest)
+
+        cached = await asyncio.to_thread(self._get_cached_sensor_data, job)
+        if cached is not None:
+            new_tce_id, new_sensor_data = cached
+        else:
+            request = self._sensor_data_request(product_footprint, job)
+            new_sensor_data = await self.async_sensor_data_service.call_service_sensordata(request)
+            new_tce_id, new_sensor_data = await asyncio.to_thread(
+                self._put_cached_sensor_data, job, request["tceId"], new_sensor_data)
+
+        return self._append_transport_tce(
+            toc_id, product_footprint, tce_chain_digest, new_tce_id,
+            new_sensor_data, sensor_data)
+
+    def _get_cached_sensor_data(self, job: Job) -> Optional[Tuple[str, TceSensorData]]:
+        """Return the tceId and sensor data of an earlier attempt of the job, if cached."""
+        if self.sensor_data_cache is None:
+            return None
+        cached = self.sensor_data_cache.get(
+            job.process_instance_key, job.element_id, job.element_instance_key)
+        if cached is not None:
+            logger.info(f"Reusing sensor data of TCE {cached[0]} for redelivered job {job.key}")
+        return cached
+
+    def _put_cached_sensor_data(self, job: Job, tce_id: str,
+                                sensor_data: TceSensorData) -> Tuple[str, TceSensorData]:
+        """Cache the sensor data of a job, returning the entry of a concurrent attempt if it won."""
+        if self.sensor_data_cache is None:
+            return tce_id, sensor_data
+        return self.sensor_data_cache.put(
+            job.process_instance_key, job.element_id, job.element_instance_key,
+            tce_id, sensor_data)
+
+    def _sensor_data_request(self, product_footprint: Dict[str, Any], job: Job) -> Dict[str, Any]:
+        """Build the sensor data request of a new transport TCE."""
+        return {
+            "shipment_id": product_footprint["extensions"][0]["data"]["shipmentId"],
+            # Generate new TCE ID
+            "tceId": str(uuid.uuid4()),
+            "camundaProcessInstanceKey": str(job.process_instance_key),
+            "camundaActivityId": job.element_id
+        }
+
+    def _append_transport_tce(self,
+                              toc_id: int,
+                              product_footprint: Dict[str, Any],
+                              tce_chain_digest: Dict[str, Any],
+                              new_tce_id: str,
+                              new_sensor_data: TceSensorData,
+                              sensor_data: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Append a transport TCE with the distance measured by the sensor service."""
+        footprint_data = product_footprint["extensions"][0]["data"]
 
         # Update sensor data list
         if sensor_data is not None:
@@ -66,89 +188,115 @@ class LogisticsOperationService:
         # Extract distance from sensor data
         distance_from_sensor = new_sensor_data.sensorData.distance.actual
 
-        # Build previous TCE IDs chain
-        prev_tce_ids = self._build_prev_tce_ids_chain(
-            product_footprint_verified)
-
         # Create new TCE data for transport
         new_tce = TceData(
             tceId=new_tce_id,
-            shipmentId=product_footprint_verified.extensions[0].data.shipmentId,
-            mass=product_footprint_verified.extensions[0].data.mass,
+            shipmentId=footprint_data["shipmentId"],
+            mass=footprint_data["mass"],
             distance=Distance(actual=distance_from_sensor),
             tocId=str(toc_id),  # Convert to string for consistency
-            prevTceIds=prev_tce_ids
+            prevTceIds=next_prev_tce_ids(footprint_data["tces"], self.prev_ids_mode)
         )
 
         # Add TCE to product footprint
-        product_footprint_verified.extensions[0].data.tces.append(new_tce)
+        footprint_data["tces"].append(new_tce.model_dump())
 
         return {
-            "product_footprint": product_footprint_verified.model_dump(),
+            "product_footprint": product_footprint,
+            "tce_chain_digest": extend_digest(tce_chain_digest, new_tce),
             "sensor_data": sensor_data
         }
 
     def execute_hub_procedure(self,
                               hoc_id: str,
-                              product_footprint: Dict[str, Any]) -> Dict[str, Any]:
+                              product_footprint: Dict[str, Any],
+                              tce_chain_digest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Execute hub procedure for a given hub operation category (HOC).
 
         Args:
             hoc_id: Unique identifier for the hub operation category
             product_footprint: Product footprint data dictionary
+            tce_chain_digest: Optional digest of the footprint's TCE chain, see utils.tce_chain
 
         Returns:
-            Dictionary containing updated product footprint
+            Dictionary containing updated product footprint and its TCE chain digest
+
+        Raises:
+            TceChainError: If the footprint does not match its digest
         """
         log_service_call("LogisticsOperationService", "execute_hub_procedure")
 
-        # Validate and parse product footprint
-        product_footprint_verified = ProductFootprint.model_validate(
-            product_footprint)
-
-        # Build previous TCE IDs chain
-        prev_tce_ids = self._build_prev_tce_ids_chain(
-            product_footprint_verified)
+        product_footprint, tce_chain_digest = self._open_tce_chain(
+            product_footprint, tce_chain_digest)
+        footprint_data = product_footprint["extensions"][0]["data"]
 
         # Create new TCE data for hub
         new_tce = TceData(
             tceId=str(uuid.uuid4()),
-            shipmentId=product_footprint_verified.extensions[0].data.shipmentId,
-            mass=product_footprint_verified.extensions[0].data.mass,
+            shipmentId=footprint_data["shipmentId"],
+            mass=footprint_data["mass"],
             hocId=hoc_id,
-            prevTceIds=prev_tce_ids
+            prevTceIds=next_prev_tce_ids(footprint_data["tces"], self.prev_ids_mode)
         )
 
         # Add TCE to product footprint
-        product_footprint_verified.extensions[0].data.tces.append(new_tce)
+        footprint_data["tces"].append(new_tce.model_dump())
 
         return {
-            "product_footprint": product_footprint_verified.model_dump()
+            "product_footprint": product_footprint,
+            "tce_chain_digest": extend_digest(tce_chain_digest, new_tce)
         }
 
-    def _build_prev_tce_ids_chain(self, product_footprint: ProductFootprint) -> List[str]:
+    def _open_tce_chain(self,
+                        product_footprint: Dict[str, Any],
+                        tce_chain_digest: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         """
-        Build the chain of previous TCE IDs from the product footprint.
+        Prepare a footprint for appending a TCE.
+
+        If the digest matches the footprint's head, the raw dictionary is used
+        as-is. Other footprints are validated in full once and get a new digest,
+        after their chain was verified against the old one, see verify_chain.
 
         Args:
-            product_footprint: Validated ProductFootprint instance
+            product_footprint: Product footprint data dictionary
+            tce_chain_digest: Optional digest of the footprint's TCE chain
 
         Returns:
-            List of previous TCE IDs
+            Tuple of the footprint dictionary to append to and its current digest
+
+        Raises:
+            TceChainError: If the footprint does not match its digest
+        """
+        if check_chain_head(product_footprint, tce_chain_digest):
+            return product_footprint, tce_chain_digest
+
+        product_footprint_verified = ProductFootprint.model_validate(
+            product_footprint)
+        verify_chain(product_footprint_verified, tce_chain_digest)
+        return product_footprint_verified.model_dump(), chain_digest(product_footprint_verified)
+
+    def expand_tce_chain(self, product_footprint: Dict[str, Any]) -> Dict[str, Any]:
         """
-        prev_tce_ids = []
+        Return the product footprint with the full prevTceIds of every TCE.
 
-        if len(product_footprint.extensions[0].data.tces) > 0:
-            # Get the previous TCE IDs from the last TCE
-            prev_tce_ids = product_footprint.extensions[0].data.tces[-1].prevTceIds.copy(
-            )
+        Footprints built with TCE_PREV_IDS_MODE=parent only store each TCE's
+        direct parent; this rebuilds the ancestor lists, e.g. for consumers
+        expecting the full chain.
 
-            # Add the last TCE ID to the chain
-            last_tce_id = product_footprint.extensions[0].data.tces[-1].tceId
-            prev_tce_ids.append(last_tce_id)
+        Args:
+            product_footprint: Product footprint data dictionary
 
-        return prev_tce_ids
+        Returns:
+            Product footprint dictionary with expanded prevTceIds
+        """
+        log_service_call("LogisticsOperationService", "expand_tce_chain")
+
+        product_footprint_verified = ProductFootprint.model_validate(
+            product_footprint)
+        data = product_footprint_verified.extensions[0].data
+        data.tces = expand_prev_tce_ids(data.tces)
+        return product_footprint_verified.model_dump()
 
     def get_tce_chain_summary(self, product_footprint: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -171,6 +319,7 @@ class LogisticsOperationService:
             "transport_operations": len([tce for tce in tces if tce.tocId is not None]),
             "hub_operations": len([tce for tce in tces if tce.hocId is not None]),
             "tce_ids": [tce.tceId for tce in tces],
+            "prev_tce_ids": {tce.tceId: tce.prevTceIds for tce in expand_prev_tce_ids(tces)},
             "shipment_id": product_footprint_verified.extensions[0].data.shipmentId,
             "total_mass": product_footprint_verified.extensions[0].data.mass
         }
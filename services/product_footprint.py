@@ -4,6 +4,7 @@ import random
 from typing import Dict, Any, Optional
 from models.product_footprint import ProductFootprint, Extension, ExtensionData
 from utils.logging_utils import log_service_call
+from utils.tce_chain import chain_digest
 
 
 class ProductFootprintService:
@@ -34,7 +35,7 @@ class ProductFootprintService:
                                  Expected keys: 'shipment_id', 'shipment_weight'
 
         Returns:
-            Dictionary containing the created product footprint
+            Dictionary containing the created product footprint and the digest of its (empty) TCE chain
         """
         log_service_call("ProductFootprintService",
                          "create_product_footprint_template")
@@ -71,7 +72,8 @@ class ProductFootprintService:
         )
 
         return {
-            "product_footprint": product_footprint.model_dump()
+            "product_footprint": product_footprint.model_dump(),
+            "tce_chain_digest": chain_digest(product_footprint)
         }
 
     def create_basic_template(self,
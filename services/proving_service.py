@@ -1,23 +1,89 @@
-from typing import Dict, Any
+from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, List, Optional
+import logging
+import threading
+import time
+from confluent_kafka import KafkaException
+from pydantic import ValidationError
+from config.settings import (
+    KAFKA_DELIVERY_TIMEOUT,
+    KAFKA_PROOFING_TOPIC,
+    KAFKA_PROOF_RESPONSE_TOPIC,
+    PROOF_RESPONSE_TIMEOUT,
+    PROOFING_WIRE_CODEC,
+    PROOFING_WIRE_COMPRESSION,
+    KAFKA_PARTITION_KEY,
+)
 from models.proofing_document import ProofingDocument, ProofResponse
-from utils.kafka import send_message_to_kafka, consume_messages_from_kafka
+from utils.codec import WireFormat
+from utils.error_handling import ProofingServiceError
+from utils.kafka import (
+    CORRELATION_ID_HEADER,
+    KafkaProducerManager,
+    KafkaReplyDispatcher,
+    KafkaReplyListener,
+    get_producer_manager,
+    get_reply_dispatcher,
+    reply_id,
+)
 from utils.logging_utils import log_service_call
+from utils.metrics import PROOFS_IN_FLIGHT
+from utils.tracing import traced
+
+logger = logging.getLogger("camunda_service")
+
+PARTITION_KEY_STRATEGIES = ("shipment_id", "product_footprint_id", "none")
 
 
 class ProofingService:
     """Service for handling proofing document operations via Kafka messaging."""
 
-    def __init__(self, topic_out: str = "shipments", topic_in: str = "pcf-results"):
+    def __init__(self,
+                 topic_out: str = KAFKA_PROOFING_TOPIC,
+                 topic_in: str = KAFKA_PROOF_RESPONSE_TOPIC,
+                 producer_manager: Optional[KafkaProducerManager] = None,
+                 reply_dispatcher: Optional[KafkaReplyDispatcher] = None,
+                 reply_listener: Optional[KafkaReplyListener] = None,
+                 response_timeout: float = PROOF_RESPONSE_TIMEOUT,
+                 wire_format: Optional[WireFormat] = None,
+                 partition_key: str = KAFKA_PARTITION_KEY):
         """
         Initialize the ProofingService.
 
         Args:
             topic_out: Kafka topic for sending proofing documents
             topic_in: Kafka topic for receiving proof responses
+            producer_manager: Optional shared producer. If not provided, the process-wide one is used.
+            reply_dispatcher: Optional reply dispatcher for topic_in. If not provided, the process-wide one is used.
+            reply_listener: Optional shared-group consumer of topic_in for set_response_listener.
+                If not provided, one is created when a response listener is set.
+            response_timeout: Seconds to wait for the proof response
+            wire_format: Optional codec/compression for outgoing documents. Defaults to the configured one.
+            partition_key: Message key strategy for topic_out: shipment_id, product_footprint_id or none
         """
+        if partition_key not in PARTITION_KEY_STRATEGIES:
+            raise ValueError(
+                f"Unknown partition key strategy {partition_key}, expected one of {PARTITION_KEY_STRATEGIES}")
+
         self.topic_out = topic_out
         self.topic_in = topic_in
+        self.producer_manager = producer_manager or get_producer_manager()
+        self.reply_dispatcher = reply_dispatcher or get_reply_dispatcher(
+            topic_in)
+        self.reply_listener = reply_listener
+        self.response_timeout = response_timeout
+        self.wire_format = wire_format or WireFormat(
+            PROOFING_WIRE_CODEC, PROOFING_WIRE_COMPRESSION)
+        self.partition_key = partition_key
+
+        # Proofs awaiting a response: [partition of topic_out or None before delivery,
+        # deadline]; insertion order is deadline order
+        self._in_flight: Dict[str, List[Any]] = {}
+        self._in_flight_counts: Counter = Counter()
+        self._in_flight_lock = threading.Lock()
 
+    @traced("proofing.send_proofing_document")
     def send_proofing_document(self, proofing_document: Dict[str, Any]) -> Dict[str, Any]:
         """
         Send a proofing document to the proofing service and receive the response.
@@ -30,7 +96,8 @@ class ProofingService:
 
         Raises:
             ValidationError: If the proofing document is invalid
-            Exception: If there's an error in Kafka communication
+            ProofingServiceError: If the proofing document could not be delivered
+                or no proof response arrived in time
         """
         log_service_call("ProofingService", "send_proofing_document")
 
@@ -38,18 +105,199 @@ class ProofingService:
         proofing_document_verified = ProofingDocument.model_validate(
             proofing_document)
 
-        # Convert to JSON and send to Kafka
-        message_to_send = proofing_document_verified.model_dump_json()
-        send_message_to_kafka(self.topic_out, message_to_send)
+        # Replies are matched on the product footprint id
+        correlation_id = proofing_document_verified.productFootprint.id
+        reply = self.reply_dispatcher.register(correlation_id)
 
-        # Consume response from Kafka
-        response_message = consume_messages_from_kafka(self.topic_in)
+        try:
+            self._publish(proofing_document_verified)
+        except ProofingServiceError:
+            self.reply_dispatcher.cancel(correlation_id, reply)
+            raise
+
+        # Wait for the response routed to this request
+        try:
+            response_message = self.reply_dispatcher.wait(
+                correlation_id, reply, self.response_timeout)
+        except FutureTimeoutError as e:
+            raise ProofingServiceError(
+                f"No proof response for product footprint {correlation_id} "
+                f"within {self.response_timeout}s") from e
+        finally:
+            self._release_in_flight(correlation_id)
 
         # Validate and parse the response
-        proof_response = ProofResponse.model_validate_json(response_message)
+        proof_response = ProofResponse.model_validate(response_message)
 
         return proof_response.model_dump()
 
+    @traced("proofing.publish_proofing_document")
+    def publish_proofing_document(self, proofing_document: Dict[str, Any]) -> str:
+        """
+        Send a proofing document without waiting for the proof response.
+
+        The response is handed to the listener set with set_response_listener.
+
+        Args:
+            proofing_document: Dictionary containing the proofing document data
+
+        Returns:
+            Correlation id of the expected proof response (the product footprint id)
+
+        Raises:
+            ValidationError: If the proofing document is invalid
+            ProofingServiceError: If the proofing document could not be delivered
+        """
+        log_service_call("ProofingService", "publish_proofing_document")
+
+        proofing_document_verified = ProofingDocument.model_validate(
+            proofing_document)
+        self._publish(proofing_document_verified)
+
+        return proofing_document_verified.productFootprint.id
+
+    def set_response_listener(self, listener: Optional[Callable[[Dict[str, Any], str], None]]) -> None:
+        """
+        Consume all proof responses and hand them to a callback.
+
+        Responses are read in a consumer group shared by all workers, so each
+        is handed to one worker's callback, and only committed once the
+        callback returned. A response whose callback raises is retried; one
+        that is delivered again after a crash carries the same reply id.
+
+        The callback runs on the reply consumer thread.
+
+        Args:
+            listener: Callable taking the parsed proof response and its reply id,
+                or None to stop consuming responses
+        """
+        if listener is None:
+            if self.reply_listener is not None:
+                self.reply_listener.close()
+            return
+
+        def _handle(payload: Dict[str, Any], msg) -> None:
+            try:
+                proof_response = ProofResponse.model_validate(payload)
+            except ValidationError as e:
+                logger.error(f"Skipping invalid proof response {reply_id(msg)}: {e}")
+                return
+            listener(proof_response.model_dump(), reply_id(msg))
+            self._release_in_flight(proof_response.productFootprintId)
+
+        if self.reply_listener is None:
+            self.reply_listener = KafkaReplyListener(self.topic_in)
+        self.reply_listener.start(_handle)
+
+    def close(self) -> None:
+        """Stop consuming proof responses for the response listener."""
+        if self.reply_listener is not None:
+            self.reply_listener.close()
+
+    def _publish(self, proofing_document: ProofingDocument) -> None:
+        """
+        Produce a validated proofing document and wait for its delivery report.
+
+        Args:
+            proofing_document: Validated ProofingDocument instance
+
+        Raises:
+            ProofingServiceError: If the proofing document could not be delivered
+        """
+        correlation_id = proofing_document.productFootprint.id
+
+        # Encode with the configured wire format and hand it to the shared producer
+        message_to_send = self.wire_format.encode(proofing_document)
+        headers = self.wire_format.headers + \
+            [(CORRELATION_ID_HEADER, correlation_id.encode('utf-8'))]
+        # Tracked before producing, as the response may arrive before the delivery report
+        self._track_in_flight(correlation_id)
+        try:
+            delivery = self.producer_manager.produce(
+                self.topic_out, message_to_send,
+                key=self._partition_key_for(proofing_document), headers=headers)
+            # Only this message's delivery report is awaited, not a full flush
+            delivered = delivery.result(timeout=KAFKA_DELIVERY_TIMEOUT)
+        except (KafkaException, BufferError, FutureTimeoutError) as e:
+            self._release_in_flight(correlation_id)
+            raise ProofingServiceError(
+                f"Failed to deliver proofing document to {self.topic_out}: {e}") from e
+
+        self._count_in_flight(correlation_id, delivered.partition())
+
+    def _partition_key_for(self, proofing_document: ProofingDocument) -> Optional[str]:
+        """
+        Derive the message key, which keeps all documents of a shipment on one partition.
+
+        Args:
+            proofing_document: Validated ProofingDocument instance
+
+        Returns:
+            Message key, or None to let the partitioner spread messages
+        """
+        product_footprint = proofing_document.productFootprint
+        if self.partition_key == "shipment_id" and product_footprint.extensions:
+            return product_footprint.extensions[0].data.shipmentId
+        if self.partition_key in ("shipment_id", "product_footprint_id"):
+            return product_footprint.id
+        return None
+
+    def _track_in_flight(self, correlation_id: str) -> None:
+        """Record a proofing document as awaiting its response until response_timeout."""
+        with self._in_flight_lock:
+            self._expire_in_flight()
+            if correlation_id not in self._in_flight:
+                self._in_flight[correlation_id] = [None, time.monotonic() + self.response_timeout]
+
+    def _count_in_flight(self, correlation_id: str, partition: int) -> None:
+        """Count a delivered proofing document on its partition, unless its response already arrived."""
+        with self._in_flight_lock:
+            entry = self._in_flight.get(correlation_id)
+            if entry is None or entry[0] is not None:
+                return
+            entry[0] = partition
+            self._in_flight_counts[partition] += 1
+            PROOFS_IN_FLIGHT.labels(self.topic_out, str(partition)).inc()
+
+    def _release_in_flight(self, correlation_id: str) -> None:
+        """Forget a proofing document once its response arrived or was given up."""
+        with self._in_flight_lock:
+            self._forget_in_flight(correlation_id)
+            self._expire_in_flight()
+
+    def _forget_in_flight(self, correlation_id: str) -> None:
+        entry = self._in_flight.pop(correlation_id, None)
+        if entry is None or entry[0] is None:
+            return
+        partition = entry[0]
+        self._in_flight_counts[partition] -= 1
+        if self._in_flight_counts[partition] <= 0:
+            del self._in_flight_counts[partition]
+        PROOFS_IN_FLIGHT.labels(self.topic_out, str(partition)).dec()
+
+    def _expire_in_flight(self) -> None:
+        """Give up proofing documents whose response did not arrive within response_timeout."""
+        now = time.monotonic()
+        while self._in_flight:
+            correlation_id, (_, deadline) = next(iter(self._in_flight.items()))
+            if deadline > now:
+                return
+            self._forget_in_flight(correlation_id)
+
+    def in_flight_by_partition(self) -> Dict[int, int]:
+        """
+        Number of proofing documents awaiting a response, per partition of topic_out.
+
+        Documents whose response did not arrive within response_timeout, e.g.
+        because it was lost, no longer count.
+
+        Returns:
+            Dictionary mapping partition to in-flight count
+        """
+        with self._in_flight_lock:
+            self._expire_in_flight()
+            return dict(self._in_flight_counts)
+
     def validate_proofing_document(self, proofing_document: Dict[str, Any]) -> ProofingDocument:
         """
         Validate a proofing document without sending it.
@@ -0,0 +1,145 @@
+"""
+Durable cache of sensor data responses for redelivered jobs.
+
+Zeebe redelivers a transport job after a job timeout or a worker crash.
+Without this cache the retry would generate a new tceId and request the
+sensor data again, loading the sensor service twice and giving the chain a
+different TCE than the sensor service recorded. Responses are stored per
+(process instance, activity) together with the tceId they were requested
+for, so a retry of the same job reuses both.
+
+Entries also remember the element instance they belong to: an activity
+visited again in a loop is a new element instance and requests fresh data.
+The cache is a SQLite file shared by the worker processes of a host;
+entries expire after a TTL well beyond any job timeout.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from config.settings import SENSOR_CACHE_PATH, SENSOR_CACHE_TTL_SECONDS
+from models.database import SQLiteConnectionPool
+from models.sensor_data import TceSensorData
+
+logger = logging.getLogger("camunda_service")
+
+# Seconds between sweeps of expired entries
+EVICTION_INTERVAL = 60.0
+
+
+class SensorDataCache:
+    """SQLite-backed TTL cache of sensor data responses keyed by process instance and activity."""
+
+    def __init__(self,
+                 db_path: str = SENSOR_CACHE_PATH,
+                 ttl_seconds: float = SENSOR_CACHE_TTL_SECONDS,
+                 pool_size: int = 4,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the SensorDataCache.
+
+        Args:
+            db_path: Path to the SQLite database file, created if missing
+            ttl_seconds: Lifetime of an entry in seconds
+            pool_size: Number of pooled connections
+            clock: Wall-clock time source shared by all processes, replaceable in tests
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self.pool = SQLiteConnectionPool(db_path, pool_size=pool_size, read_only=False)
+        with self.pool.connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sensor_data_cache (
+                    process_instance_key TEXT NOT NULL,
+                    activity_id TEXT NOT NULL,
+                    element_instance_key TEXT NOT NULL,
+                    tce_id TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (process_instance_key, activity_id)
+                )""")
+            conn.commit()
+        self._next_eviction = 0.0
+        self._eviction_lock = threading.Lock()
+
+    def get(self, process_instance_key, activity_id: str,
+            element_instance_key) -> Optional[Tuple[str, TceSensorData]]:
+        """
+        Look up the response of an earlier attempt of a job.
+
+        Args:
+            process_instance_key: Zeebe process instance key
+            activity_id: BPMN element id of the activity
+            element_instance_key: Zeebe element instance key of the job
+
+        Returns:
+            Tuple of the tceId and the sensor data, None if there is no live entry
+            for this element instance
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT element_instance_key, tce_id, response, expires_at FROM sensor_data_cache "
+                "WHERE process_instance_key = ? AND activity_id = ?",
+                (str(process_instance_key), activity_id)).fetchone()
+        if row is None or row[0] != str(element_instance_key) or row[3] <= self._clock():
+            return None
+        return row[1], TceSensorData.model_validate_json(row[2])
+
+    def put(self, process_instance_key, activity_id: str, element_instance_key,
+            tce_id: str, sensor_data: TceSensorData) -> Tuple[str, TceSensorData]:
+        """
+        Store the response of a job, unless a concurrent attempt stored one first.
+
+        Args:
+            process_instance_key: Zeebe process instance key
+            activity_id: BPMN element id of the activity
+            element_instance_key: Zeebe element instance key of the job
+            tce_id: tceId the sensor data was requested for
+            sensor_data: Sensor service response
+
+        Returns:
+            Tuple of the tceId and the sensor data stored for the job
+        """
+        now = self._clock()
+        key = (str(process_instance_key), activity_id)
+        with self.pool.connection() as conn:
+            # Keep a live entry of the same element instance, replace stale ones
+            conn.execute(
+                "INSERT INTO sensor_data_cache VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (process_instance_key, activity_id) DO UPDATE SET "
+                "element_instance_key = excluded.element_instance_key, tce_id = excluded.tce_id, "
+                "response = excluded.response, expires_at = excluded.expires_at "
+                "WHERE element_instance_key != excluded.element_instance_key OR expires_at <= ?",
+                (*key, str(element_instance_key), tce_id, sensor_data.model_dump_json(),
+                 now + self.ttl_seconds, now))
+            row = conn.execute(
+                "SELECT tce_id, response FROM sensor_data_cache "
+                "WHERE process_instance_key = ? AND activity_id = ?", key).fetchone()
+            conn.commit()
+        self._evict_expired(now)
+        if row[0] == tce_id:
+            return tce_id, sensor_data
+        return row[0], TceSensorData.model_validate_json(row[1])
+
+    def _evict_expired(self, now: float) -> None:
+        """Delete expired entries, at most once per EVICTION_INTERVAL."""
+        with self._eviction_lock:
+            if now < self._next_eviction:
+                return
+            self._next_eviction = now + EVICTION_INTERVAL
+        with self.pool.connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM sensor_data_cache WHERE expires_at <= ?", (now,)).rowcount
+            conn.commit()
+        if deleted:
+            logger.debug(f"Evicted {deleted} expired sensor data cache entries")
+
+    def close(self) -> None:
+        """Release the pooled database connections."""
+        self.pool.close()
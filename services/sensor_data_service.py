@@ -1,31 +1,106 @@
+import asyncio
 import json
+import logging
+from typing import List, Optional, Union
+
+import httpx
 import requests
-import os
 
+from config.settings import (
+    SENSOR_BATCH_MAX_SIZE,
+    SENSOR_BATCH_WINDOW_MS,
+    SENSOR_CIRCUIT_FAILURE_RATE,
+    SENSOR_CIRCUIT_OPEN_SECONDS,
+    SENSOR_CIRCUIT_SLOW_CALL_SECONDS,
+    SENSOR_CONNECT_TIMEOUT,
+    SENSOR_HEDGE,
+    SENSOR_LIMIT_TIMEOUT,
+    SENSOR_MAX_CONCURRENCY,
+    SENSOR_POOL_SIZE,
+    SENSOR_READ_TIMEOUT,
+    SENSOR_RETRIES,
+    SENSOR_RETRY_BACKOFF,
+    SENSOR_RETRY_JITTER,
+    SENSOR_RETRY_READ_ERRORS,
+    SENSOR_RETRY_STATUSES,
+    SENSOR_SERVICE_API_URL,
+)
 from models.sensor_data import TceSensorData
+from utils.batching import MicroBatcher
+from utils.error_handling import SensorDataServiceError
+from utils.http import (
+    create_async_client,
+    create_session,
+    parse_statuses,
+    request_with_retries,
+)
 from utils.logging_utils import log_service_call
+from utils.metrics import HTTP_REQUESTS
+from utils.resilience import CircuitBreaker, Dependency, get_dependency
+from utils.tracing import traced
+
+logger = logging.getLogger("camunda_service")
+
+# Responses telling that the sensor service has no batch endpoint
+BATCH_UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+def sensor_dependency() -> Dependency:
+    """Return the circuit breaker and concurrency limit shared by all sensor data clients of the process."""
+    return get_dependency("sensor_data", lambda: Dependency(
+        "sensor_data",
+        CircuitBreaker("sensor_data",
+                       failure_rate=SENSOR_CIRCUIT_FAILURE_RATE,
+                       slow_call_seconds=SENSOR_CIRCUIT_SLOW_CALL_SECONDS,
+                       open_seconds=SENSOR_CIRCUIT_OPEN_SECONDS),
+        max_concurrency=SENSOR_MAX_CONCURRENCY,
+        limit_timeout=SENSOR_LIMIT_TIMEOUT,
+        hedge=SENSOR_HEDGE))
+
+
+def _is_unhealthy(response) -> bool:
+    """Tell whether a response shows the sensor service failing or overloaded."""
+    return response.status_code >= 500 or response.status_code == 429
 
 
 class SensorDataService:
     """Service for retrieving and generating transport emission data."""
 
-    def __init__(self):
+    def __init__(self,
+                 base_url: str = SENSOR_SERVICE_API_URL,
+                 session: Optional[requests.Session] = None,
+                 connect_timeout: float = SENSOR_CONNECT_TIMEOUT,
+                 read_timeout: float = SENSOR_READ_TIMEOUT,
+                 dependency: Optional[Dependency] = None):
+        """
+        Initialize the SensorDataService.
+
+        Args:
+            base_url: Base URL of the sensor data service
+            session: Optional HTTP session, defaults to a pooled keep-alive session with retries
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for the response
+            dependency: Circuit breaker and concurrency limit, defaults to the process-wide one
+        """
         log_service_call("SensorDataService", "__init__")
-        self.base_url = os.getenv(
-            "SENSOR_SERVICE_API_URL", "http://localhost:8000")
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.dependency = dependency or sensor_dependency()
+        self.session = session or create_session(
+            pool_size=SENSOR_POOL_SIZE,
+            retries=SENSOR_RETRIES,
+            backoff_factor=SENSOR_RETRY_BACKOFF,
+            backoff_jitter=SENSOR_RETRY_JITTER,
+            retry_statuses=parse_statuses(SENSOR_RETRY_STATUSES),
+            retry_read_errors=SENSOR_RETRY_READ_ERRORS)
 
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+    @traced("sensor_data.call_service_sensordata")
     def call_service_sensordata(self, variables) -> TceSensorData:
-        shipment_id = variables.get("shipment_id", "unknown")
-        tce_id = variables.get("tceId")
-        process_instance_key = variables.get("camundaProcessInstanceKey")
-        activity_id = variables.get("camundaActivityId")
-
-        payload = {
-            "shipment_id": shipment_id,
-            "tceId": tce_id,
-            "camundaProcessInstanceKey": process_instance_key,
-            "camundaActivityId": activity_id
-        }
+        payload = _request_payload(variables)
 
         log_service_call(
             service_name="SensorDataService",
@@ -35,11 +110,14 @@ class SensorDataService:
         )
 
         try:
-            response = requests.post(
-                f"{self.base_url}/api/v1/sensor-data",
-                json=payload,
-                timeout=10
-            )
+            response = self.dependency.call(
+                lambda: self.session.post(
+                    f"{self.base_url}/api/v1/sensor-data",
+                    json=payload,
+                    timeout=self.timeout
+                ),
+                is_failure=_is_unhealthy)
+            HTTP_REQUESTS.labels("sensor_data", str(response.status_code)).inc()
             log_service_call(
                 service_name="SensorDataService",
                 method_name="call_service_sensordata",
@@ -48,22 +126,200 @@ class SensorDataService:
             )
 
             response.raise_for_status()
-            response_data = response.json()
+            return _parse_response(response.json())
 
-            print(f"Response data: {response_data}")
+        except requests.RequestException as e:
+            if e.response is None:
+                HTTP_REQUESTS.labels("sensor_data", "error").inc()
+            log_service_call(
+                service_name="SensorDataService",
+                method_name="call_service_sensordata",
+                message=f"HTTP request failed: {str(e)}",
+                payload=payload
+            )
+            raise
 
-            # Parse sensorData if it's a JSON string
-            if 'sensorData' in response_data and isinstance(response_data['sensorData'], str):
-                response_data['sensorData'] = json.loads(
-                    response_data['sensorData'])
 
-            return TceSensorData(**response_data)
+class AsyncSensorDataService:
+    """
+    Asyncio variant of SensorDataService.
 
-        except requests.RequestException as e:
+    Calls are awaited on the event loop instead of blocking an executor
+    thread, so concurrent transport jobs overlap their waits for the sensor
+    service; their number is bounded by the task's max_jobs and pool_size.
+
+    With a batch window, requests arriving within it are coalesced into one
+    call of the batch endpoint, which takes a JSON array of requests and
+    returns one entry per request in the same order, either sensor data or
+    {"error": "..."}. If the service does not offer the endpoint (404, 405,
+    501), batches fall back to single calls for the lifetime of the client.
+    """
+
+    def __init__(self,
+                 base_url: str = SENSOR_SERVICE_API_URL,
+                 client: Optional[httpx.AsyncClient] = None,
+                 pool_size: int = SENSOR_POOL_SIZE,
+                 connect_timeout: float = SENSOR_CONNECT_TIMEOUT,
+                 read_timeout: float = SENSOR_READ_TIMEOUT,
+                 retries: int = SENSOR_RETRIES,
+                 backoff_factor: float = SENSOR_RETRY_BACKOFF,
+                 backoff_jitter: float = SENSOR_RETRY_JITTER,
+                 batch_window: float = SENSOR_BATCH_WINDOW_MS / 1000,
+                 batch_max_size: int = SENSOR_BATCH_MAX_SIZE,
+                 dependency: Optional[Dependency] = None):
+        """
+        Initialize the AsyncSensorDataService.
+
+        Args:
+            base_url: Base URL of the sensor data service
+            client: Optional HTTP client, defaults to a pooled keep-alive client
+            pool_size: Keep-alive connections of the default client
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for the response
+            retries: Maximum retries per call
+            backoff_factor: Base of the exponential backoff in seconds
+            backoff_jitter: Maximum random seconds added to each backoff
+            batch_window: Seconds a request waits to be coalesced with others, 0 disables batching
+            batch_max_size: Requests after which a batch is sent without waiting for the window
+            dependency: Circuit breaker, concurrency limit and hedging, defaults to the process-wide one
+        """
+        log_service_call("AsyncSensorDataService", "__init__")
+        self.base_url = base_url
+        self.client = client or create_async_client(
+            pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)
+        self.dependency = dependency or sensor_dependency()
+        self.retry_options = {
+            "retries": retries,
+            "backoff_factor": backoff_factor,
+            "backoff_jitter": backoff_jitter,
+            "retry_statuses": parse_statuses(SENSOR_RETRY_STATUSES),
+            "retry_read_errors": SENSOR_RETRY_READ_ERRORS,
+        }
+        # The POST is not idempotent, so only hedge it if the service deduplicates by tceId
+        self.hedge = None if SENSOR_RETRY_READ_ERRORS else False
+        self.batcher = None
+        if batch_window > 0:
+            self.batcher = MicroBatcher(
+                self._call_batch, max_size=batch_max_size, window=batch_window)
+        self.batch_supported = True
+
+    async def close(self):
+        """Send pending batches and close the pooled connections."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.client.aclose()
+
+    @traced("sensor_data.call_service_sensordata")
+    async def call_service_sensordata(self, variables) -> TceSensorData:
+        payload = _request_payload(variables)
+        if self.batcher is not None:
+            return await self.batcher.submit(payload)
+        return await self._call_single(payload)
+
+    async def _call_single(self, payload: dict) -> TceSensorData:
+        log_service_call(
+            service_name="AsyncSensorDataService",
+            method_name="call_service_sensordata",
+            message="Sending sensor data request",
+            payload=payload
+        )
+
+        try:
+            response = await self.dependency.call_async(
+                lambda: request_with_retries(
+                    self.client, "POST", f"{self.base_url}/api/v1/sensor-data",
+                    json=payload, **self.retry_options),
+                is_failure=_is_unhealthy, hedge=self.hedge)
+            HTTP_REQUESTS.labels("sensor_data", str(response.status_code)).inc()
             log_service_call(
-                service_name="SensorDataService",
+                service_name="AsyncSensorDataService",
+                method_name="call_service_sensordata",
+                message=f"Received response {response.status_code}",
+                payload=response.json() if response.is_success else response.text
+            )
+
+            response.raise_for_status()
+            return _parse_response(response.json())
+
+        except httpx.HTTPError as e:
+            if not isinstance(e, httpx.HTTPStatusError):
+                HTTP_REQUESTS.labels("sensor_data", "error").inc()
+            log_service_call(
+                service_name="AsyncSensorDataService",
                 method_name="call_service_sensordata",
                 message=f"HTTP request failed: {str(e)}",
                 payload=payload
             )
             raise
+
+    async def _call_batch(self, payloads: List[dict]) -> List[Union[TceSensorData, Exception]]:
+        """
+        Request sensor data for several TCEs with one call of the batch endpoint.
+
+        Args:
+            payloads: Sensor data requests
+
+        Returns:
+            Sensor data or the error of each request, in order
+        """
+        if len(payloads) == 1 or not self.batch_supported:
+            return await asyncio.gather(
+                *(self._call_single(payload) for payload in payloads), return_exceptions=True)
+
+        log_service_call(
+            service_name="AsyncSensorDataService",
+            method_name="_call_batch",
+            message=f"Sending batch of {len(payloads)} sensor data requests"
+        )
+        try:
+            response = await self.dependency.call_async(
+                lambda: request_with_retries(
+                    self.client, "POST", f"{self.base_url}/api/v1/sensor-data/batch",
+                    json=payloads, **self.retry_options),
+                is_failure=_is_unhealthy, hedge=self.hedge)
+        except httpx.HTTPError:
+            HTTP_REQUESTS.labels("sensor_data_batch", "error").inc()
+            raise
+        HTTP_REQUESTS.labels("sensor_data_batch", str(response.status_code)).inc()
+
+        if response.status_code in BATCH_UNSUPPORTED_STATUSES:
+            logger.warning(
+                f"Sensor service does not support batch requests ({response.status_code}), "
+                "falling back to single requests")
+            self.batch_supported = False
+            return await self._call_batch(payloads)
+
+        response.raise_for_status()
+        results: List[Union[TceSensorData, Exception]] = []
+        for payload, entry in zip(payloads, response.json()):
+            if "error" in entry:
+                results.append(SensorDataServiceError(
+                    f"Request for TCE {payload['tceId']} failed: {entry['error']}"))
+            else:
+                try:
+                    results.append(_parse_response(entry))
+                except Exception as e:
+                    results.append(e)
+        return results
+
+
+def _request_payload(variables) -> dict:
+    return {
+        "shipment_id": variables.get("shipment_id", "unknown"),
+        "tceId": variables.get("tceId"),
+        "camundaProcessInstanceKey": variables.get("camundaProcessInstanceKey"),
+        "camundaActivityId": variables.get("camundaActivityId")
+    }
+
+
+def _parse_response(response_data: dict) -> TceSensorData:
+    # Formatted only with debug logging, as responses can be large
+    logger.debug("Sensor data response: %s", response_data)
+
+    # Parse sensorData if it's a JSON string, keeping the signed bytes for verification
+    if 'sensorData' in response_data and isinstance(response_data['sensorData'], str):
+        response_data['rawSensorData'] = response_data['sensorData']
+        response_data['sensorData'] = json.loads(
+            response_data['sensorData'])
+
+    return TceSensorData(**response_data)
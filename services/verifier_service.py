@@ -1,57 +1,217 @@
-import services.pb.receipt_verifier_pb2 as receipt_verifier_pb2
-import services.pb.receipt_verifier_pb2_grpc as receipt_verifier_pb2_grpc
-from pathlib import Path
+import logging
+import mmap
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+
 import grpc
 from grpc import aio
-import os
-from config.settings import VERIFIER_SERVICE_API_URL as server_addr
-CHUNK_SIZE_BYTES = 3 * 1024 * 1024  # 3MB Chunks
 
+import services.pb.receipt_verifier_pb2 as receipt_verifier_pb2
+from config.settings import (
+    VERIFIER_CHUNK_SIZE_BYTES,
+    VERIFIER_COMPRESSION,
+    VERIFIER_DEADLINE_SECONDS,
+    VERIFIER_KEEPALIVE_TIME_MS,
+    VERIFIER_KEEPALIVE_TIMEOUT_MS,
+    VERIFIER_MAX_MESSAGE_BYTES,
+    VERIFIER_SERVICE_API_URL,
+)
+from utils.error_handling import ReceiptVerifierServiceError
+from utils.tracing import traced
 
-class ReceiptVerifierService():
-    """Service to verify proof receipts using gRPC streaming."""
+logger = logging.getLogger("camunda_service")
 
-    def __read_file_chunks(self, file_path, chunk_size=1024):
-        """Generator to read a file in chunks."""
-        try:
-            with open(file_path, 'rb') as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield receipt_verifier_pb2.BytesChunk(data=chunk)
-        except Exception as e:
-            print(f"Error reading file: {e}")
-
-    async def VerifyReceiptStream(self):
-        """Process a stream of BytesChunk and return a GrpcVerifyResponse."""
-
-        async with aio.insecure_channel(server_addr) as channel:
-            client = receipt_verifier_pb2_grpc.ReceiptVerifierServiceStub(
-                channel)
-            print(f"Verbunden mit gRPC Server auf {server_addr}")
-
-            # Create the stream of chunks
-            # Until Felix database is available, we use a static file
-            file_path = "./data/proof_verify_example/receipt_output.json"
-            chunk_stream = self.__read_file_chunks(file_path)
-
-            print("Starte Stream zum Server...")
-
-            # Call the streaming RPC
+# Until Felix database is available, receipts without payload use a static file
+RECEIPT_FILE_PATH = "./data/proof_verify_example/receipt_output.json"
+VERIFY_RECEIPT_STREAM = "/receipt_verifier.ReceiptVerifierService/VerifyReceiptStream"
+# Tag and length prefix of a serialized BytesChunk
+CHUNK_OVERHEAD_BYTES = 6
+
+COMPRESSION = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+}
+
+Receipt = Union[bytes, bytearray, memoryview, str]
+
+
+def serialize_chunk(data: memoryview) -> bytes:
+    """
+    Serialize a slice of a receipt as BytesChunk message.
+
+    Writes the protobuf wire format of field 1 (data) directly, because
+    BytesChunk only accepts bytes and would need a copy of every slice
+    before serializing it into a second one.
+
+    Args:
+        data: Slice of the receipt buffer
+
+    Returns:
+        Serialized BytesChunk
+    """
+    size = len(data)
+    prefix = bytearray(b"\x0a")
+    while size > 0x7F:
+        prefix.append(size & 0x7F | 0x80)
+        size >>= 7
+    prefix.append(size)
+    return b"".join((prefix, data))
+
+
+def iter_chunks(buffer: memoryview, chunk_size: int) -> Iterator[memoryview]:
+    """
+    Yield consecutive slices of a buffer without copying them.
+
+    Args:
+        buffer: Receipt buffer
+        chunk_size: Maximum bytes per slice
+
+    Yields:
+        memoryview slices of at most chunk_size bytes
+    """
+    for start in range(0, len(buffer), chunk_size):
+        yield buffer[start:start + chunk_size]
+
+
+@contextmanager
+def open_receipt(file_path: str) -> Iterator[memoryview]:
+    """
+    Map a receipt file into memory.
+
+    Args:
+        file_path: Receipt file
+
+    Yields:
+        Read-only view of the file contents
+
+    Raises:
+        OSError: If the file cannot be opened
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
             try:
-                response = await client.VerifyReceiptStream(chunk_stream)
+                yield view
+            finally:
+                view.release()
+
+
+class ReceiptVerifierService():
+    """
+    Service to verify proof receipts using gRPC streaming.
+
+    The channel is created on the first call and reused by all later and
+    concurrent calls of the worker process, so verify_receipt jobs share one
+    HTTP/2 connection instead of opening one each. It must be used from a
+    single event loop and closed with close() on shutdown.
+    """
 
-                print("gRPC Antwort erhalten:")
-                print(f"  Valid: {response.valid}")
-                print(f"  Message: {response.message}")
+    def __init__(self,
+                 address: str = VERIFIER_SERVICE_API_URL,
+                 deadline: float = VERIFIER_DEADLINE_SECONDS,
+                 compression: str = VERIFIER_COMPRESSION,
+                 max_message_bytes: int = VERIFIER_MAX_MESSAGE_BYTES,
+                 keepalive_time_ms: int = VERIFIER_KEEPALIVE_TIME_MS,
+                 keepalive_timeout_ms: int = VERIFIER_KEEPALIVE_TIMEOUT_MS,
+                 chunk_size: int = VERIFIER_CHUNK_SIZE_BYTES):
+        """
+        Initialize the ReceiptVerifierService.
 
-                message = response.message
+        Args:
+            address: host:port of the verifier gRPC server
+            deadline: Seconds a verification may take, 0 for none
+            compression: Compression of sent messages, 'none' or 'gzip'
+            max_message_bytes: Largest message sent or received
+            keepalive_time_ms: Interval of HTTP/2 keepalive pings during calls
+            keepalive_timeout_ms: Time to wait for a ping acknowledgement before closing the connection
+            chunk_size: Receipt bytes per streamed BytesChunk
+
+        Raises:
+            ValueError: If the compression is not supported or chunks would exceed max_message_bytes
+        """
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unsupported verifier compression: {compression}")
+        if not 0 < chunk_size <= max_message_bytes - CHUNK_OVERHEAD_BYTES:
+            raise ValueError(
+                f"Verifier chunk size must be between 1 and {max_message_bytes - CHUNK_OVERHEAD_BYTES}")
+        self.address = address
+        self.deadline = deadline or None
+        self.compression = COMPRESSION[compression]
+        self.chunk_size = chunk_size
+        self.options = [
+            ("grpc.keepalive_time_ms", keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", keepalive_timeout_ms),
+            # No pings while idle: servers answer them with GOAWAY too_many_pings by default
+            ("grpc.keepalive_permit_without_calls", 0),
+            ("grpc.max_send_message_length", max_message_bytes),
+            ("grpc.max_receive_message_length", max_message_bytes),
+        ]
+        self._channel: Optional[aio.Channel] = None
+        self._verify_stream: Optional[aio.StreamUnaryMultiCallable] = None
+
+    def _stub(self) -> aio.StreamUnaryMultiCallable:
+        """Return the VerifyReceiptStream call of the shared channel, creating both on first use."""
+        if self._verify_stream is None:
+            self._channel = aio.insecure_channel(
+                self.address, options=self.options, compression=self.compression)
+            # Same method as the generated stub, but sending memoryview slices
+            self._verify_stream = self._channel.stream_unary(
+                VERIFY_RECEIPT_STREAM,
+                request_serializer=serialize_chunk,
+                response_deserializer=receipt_verifier_pb2.GrpcVerifyResponse.FromString)
+            logger.info(f"Opened gRPC channel to verifier at {self.address}")
+        return self._verify_stream
+
+    @traced("verifier.verify_receipt_stream")
+    async def VerifyReceiptStream(self, receipt: Optional[Receipt] = None,
+                                  file_path: str = RECEIPT_FILE_PATH) -> str:
+        """
+        Stream a receipt to the verifier and return its verdict.
+
+        Args:
+            receipt: Receipt payload, e.g. the proofReceipt of a proof response;
+                the file at file_path is streamed if None
+            file_path: Receipt file to verify if no payload is given
+
+        Returns:
+            Message of the verifier's GrpcVerifyResponse
+
+        Raises:
+            ReceiptVerifierServiceError: If the call fails or exceeds the deadline
+            OSError: If the receipt file cannot be read
+        """
+        if receipt is None:
+            with open_receipt(file_path) as buffer:
+                return await self._verify(buffer)
+        if isinstance(receipt, str):
+            receipt = receipt.encode('utf-8')
+        with memoryview(receipt) as buffer:
+            return await self._verify(buffer)
+
+    async def _verify(self, buffer: memoryview) -> str:
+        verify_stream = self._stub()
+        chunks = iter_chunks(buffer, self.chunk_size)
+        try:
+            response = await verify_stream(chunks, timeout=self.deadline)
+        except grpc.RpcError as e:
+            raise ReceiptVerifierServiceError(f"{e.code()}: {e.details()}") from e
+        finally:
+            # Drop the slice of an interrupted stream before the buffer is released
+            chunks.close()
 
-                if response.HasField('journal_value'):
-                    print(f"  Journal Value: {response.journal_value}")
+        logger.info(f"Verifier response: valid={response.valid}, message={response.message}")
+        if response.HasField('journal_value'):
+            logger.info(f"Verifier journal value: {response.journal_value}")
 
-            except grpc.RpcError as e:
-                print(f"gRPC Fehler: {e.code()}: {e.details()}")
+        return response.message
 
-            return message
+    async def close(self) -> None:
+        """Close the shared channel, cancelling calls still in flight."""
+        if self._channel is not None:
+            channel, self._channel, self._verify_stream = self._channel, None, None
+            await channel.close()
@@ -1,19 +1,63 @@
+import asyncio
+import inspect
+import logging
 import random
 import uuid
-from typing import Optional
+from typing import List, Optional
 
 from pyzeebe import ZeebeWorker, ZeebeClient, Job
-
+from pyzeebe.errors import MessageAlreadyExistsError
+
+from config.settings import (
+    PROOFING_ASYNC_MODE,
+    PROOF_RESPONSE_MESSAGE_NAME,
+    PROOF_RESPONSE_MESSAGE_TTL_MS,
+    SENSOR_CACHE_PATH,
+)
+from utils.claim_check import ClaimCheck
 from utils.error_handling import on_error
+from utils.executors import TaskExecutors
 from utils.logging_utils import log_task_start, log_task_completion
+from utils.metrics import instrument, measure_variables
+from utils.tracing import bind_job, trace_job
 
 from services.database import HocTocService
 from services.verifier_service import ReceiptVerifierService
-from services.sensor_data_service import SensorDataService
+from services.sensor_data_cache import SensorDataCache
+from services.sensor_data_service import AsyncSensorDataService, SensorDataService
 from services.proving_service import ProofingService
 from services.product_footprint import ProductFootprintService
 from services.logistics_operation_service import LogisticsOperationService
 
+logger = logging.getLogger("camunda_service")
+
+# Seconds the reply consumer waits for a proof response message to be published
+PROOF_RESPONSE_PUBLISH_TIMEOUT = 30.0
+
+# Zeebe returns all variables for an empty fetch list, so handlers needing none
+# ask for a name no process sets
+NO_VARIABLES = "__no_variables__"
+
+
+def variables_to_fetch(handler) -> Optional[List[str]]:
+    """
+    Derive the variables to fetch on job activation from a handler's signature.
+
+    Args:
+        handler: Task handler, or a wrapper keeping the handler's signature
+
+    Returns:
+        Names of the handler's parameters except the Job, [NO_VARIABLES] if it
+        has none, or None if it accepts **kwargs and needs all variables
+    """
+    names = []
+    for parameter in inspect.signature(handler).parameters.values():
+        if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            return None
+        if parameter.annotation is not Job:
+            names.append(parameter.name)
+    return names or [NO_VARIABLES]
+
 
 class CamundaWorkerTasks:
     """Zeebe worker task handlers."""
@@ -23,101 +67,169 @@ class CamundaWorkerTasks:
         self.client = client
         self.hoc_toc_service = HocTocService()
         self.sensor_data_service = SensorDataService()
+        self.async_sensor_data_service = AsyncSensorDataService()
+        # Redelivered transport jobs reuse the tceId and sensor data of their first attempt
+        self.sensor_data_cache = SensorDataCache() if SENSOR_CACHE_PATH else None
         self.receipt_verifier_service = ReceiptVerifierService()
         self.proofing_service = ProofingService()
         self.product_footprint_service = ProductFootprintService()
         self.logistics_operation_service = LogisticsOperationService(
-            self.sensor_data_service)
+            self.sensor_data_service,
+            async_sensor_data_service=self.async_sensor_data_service,
+            sensor_data_cache=self.sensor_data_cache)
+
+        # Blocking handlers run on dedicated thread pools per task type
+        self.executors = TaskExecutors()
+        # Large variables travel through Zeebe as references to a blob store
+        self.claim_check = ClaimCheck()
+
+        # In fire-and-forget mode proof responses resume the process via a Zeebe message
+        self.proofing_async_mode = PROOFING_ASYNC_MODE
+        if self.proofing_async_mode:
+            self._loop = asyncio.get_running_loop()
+            self.proofing_service.set_response_listener(
+                self._on_proof_response)
 
         # Register all tasks
         self._register_tasks()
 
+    async def close(self):
+        """Release the resources held by the services."""
+        # The response listener may be waiting for a publish on this loop
+        await asyncio.to_thread(self.proofing_service.close)
+        self.executors.shutdown()
+        self.claim_check.close()
+        self.sensor_data_service.close()
+        await self.async_sensor_data_service.close()
+        await self.receipt_verifier_service.close()
+        if self.sensor_data_cache is not None:
+            self.sensor_data_cache.close()
+        self.hoc_toc_service.close()
+
     def _register_tasks(self):
         """Register all task handlers with the Zeebe worker."""
-        self.worker.task(task_type="determine_job_sequence",
-                         exception_handler=on_error)(self.determine_job_sequence)
-        self.worker.task(task_type="send_to_proofing_service",
-                         exception_handler=on_error)(self.send_to_proofing_service)
-        self.worker.task(task_type="notify_next_node",
-                         exception_handler=on_error)(self.notify_next_node)
-        self.worker.task(task_type="send_data_to_origin",
-                         exception_handler=on_error)(self.send_data_to_origin)
-        self.worker.task(task_type="define_product_footprint_template",
-                         exception_handler=on_error)(self.define_product_footprint_template)
-        self.worker.task(task_type="hub_procedure",
-                         exception_handler=on_error)(self.hub_procedure)
-        self.worker.task(task_type="transport_procedure",
-                         exception_handler=on_error)(self.transport_procedure)
-        self.worker.task(task_type="set_shipment_information",
-                         exception_handler=on_error)(self.set_shipment_information)
-        self.worker.task(task_type="collect_hoc_toc_data",
-                         exception_handler=on_error)(self.collect_hoc_toc_data)
-        self.worker.task(task_type="verify_receipt",
-                         exception_handler=on_error)(self.verify_receipt)
-
-    async def verify_receipt(self) -> dict:
+        tasks = {
+            "determine_job_sequence": self.determine_job_sequence,
+            "send_to_proofing_service": self.send_to_proofing_service,
+            "notify_next_node": self.notify_next_node,
+            "send_data_to_origin": self.send_data_to_origin,
+            "define_product_footprint_template": self.define_product_footprint_template,
+            "hub_procedure": self.hub_procedure,
+            "transport_procedure": self.transport_procedure,
+            "set_shipment_information": self.set_shipment_information,
+            "collect_hoc_toc_data": self.collect_hoc_toc_data,
+            "verify_receipt": self.verify_receipt,
+        }
+        for task_type, handler in tasks.items():
+            self._register_task(task_type, handler)
+
+    def _register_task(self, task_type: str, handler):
+        """
+        Register a handler, running blocking handlers on the task type's thread pool.
+
+        Only the variables named by the handler's parameters are fetched on job
+        activation. Claim-check references among them are resolved and large
+        results stored on the same thread as the handler. Jobs, errors,
+        latency and variable sizes are recorded per task type, and each job
+        runs in a trace span of its process instance. Variable sizes of
+        blocking handlers are measured on their thread, those of async
+        handlers for a sample of jobs.
+
+        Args:
+            task_type: Zeebe task type
+            handler: Task handler method
+        """
+        max_jobs = self.executors.options(task_type)["max_jobs"]
+        fetch = variables_to_fetch(handler)
+        logger.debug(f"Task {task_type} fetches variables {fetch or 'all'}")
+        handler = self.claim_check.wrap(handler)
+        if asyncio.iscoroutinefunction(handler):
+            handler = instrument(task_type, trace_job(task_type, handler))
+        else:
+            # Variable sizes are measured on the handler's thread, off the event loop
+            handler = self.executors.offload(task_type, measure_variables(task_type, handler))
+            handler = instrument(task_type, trace_job(task_type, handler), variable_sample_rate=0)
+        self.worker.task(task_type=task_type,
+                         exception_handler=on_error,
+                         variables_to_fetch=fetch,
+                         max_jobs_to_activate=max_jobs,
+                         max_running_jobs=max_jobs,
+                         before=[bind_job])(handler)
+
+    async def verify_receipt(self, product_footprint: Optional[dict] = None) -> dict:
         """
         Verify the receipt using the ReceiptVerifier service.
 
         Args:
-            proofing_document: Dictionary containing the proofing document to verify
+            product_footprint: Proof response set by send_to_proofing_service or the
+                proof response message; its proofReceipt is streamed to the verifier
 
         Returns:
             Dictionary containing the verification result
         """
         log_task_start("verify_receipt")
 
+        # Processes without proof response fall back to the example receipt file
+        receipt = (product_footprint or {}).get("proofReceipt")
         receipt_verifier = self.receipt_verifier_service
-        result = await receipt_verifier.VerifyReceiptStream()
+        result = await receipt_verifier.VerifyReceiptStream(receipt)
 
         log_task_completion("verify_receipt")
         return {"verification_result": result}
 
-    def collect_hoc_toc_data(self, product_footprint: dict, sensor_data: Optional[list[dict]] = None) -> dict:
+    def collect_hoc_toc_data(self, product_footprint: dict, sensor_data: Optional[list[dict]] = None,
+                             tce_chain_digest: Optional[dict] = None) -> dict:
         """
         Collect HOC and TOC data based on product footprint.
         Args:
             product_footprint: Product footprint data
             sensor_data: Optional sensor data to include in the proofing document
+            tce_chain_digest: Optional digest the footprint's TCE chain is verified against
         Returns:
             Dictionary containing the proofing document with HOC and TOC data
         """
 
         log_task_start("collect_hoc_toc_data")
         result = self.hoc_toc_service.collect_hoc_toc_data(
-            product_footprint, sensor_data)
+            product_footprint, sensor_data, tce_chain_digest)
         log_task_completion("collect_hoc_toc_data")
 
         return result
 
-    def transport_procedure(self, tocId: int, product_footprint: dict, job: Job, sensor_data: Optional[list[dict]] = None) -> dict:
+    async def transport_procedure(self, tocId: int, product_footprint: dict, job: Job, sensor_data: Optional[list[dict]] = None,
+                                  tce_chain_digest: Optional[dict] = None) -> dict:
         """
         Handle the transport procedure for a given tocId and product footprint using LogisticsOperationService.
 
+        Runs on the event loop, so concurrent transport jobs overlap their
+        waits for the sensor service.
+
         Args:
             tocId: Unique identifier for the transport operation category (toc)
             job: Zeebe Job instance containing process instance and element ID
             product_footprint: Product footprint data
             sensor_data: Optional list of previous sensor data dictionaries to append to
+            tce_chain_digest: Optional digest of the footprint's TCE chain
 
         Returns:
             product_footprint with tocId Information
         """
         log_task_start("transport_procedure")
 
-        result = self.logistics_operation_service.execute_transport_procedure(
-            tocId, product_footprint, job, sensor_data)
+        result = await self.logistics_operation_service.execute_transport_procedure_async(
+            tocId, product_footprint, job, sensor_data, tce_chain_digest)
 
         log_task_completion("transport_procedure")
         return result
 
-    def hub_procedure(self, hocId: str, product_footprint: dict) -> dict:
+    def hub_procedure(self, hocId: str, product_footprint: dict, tce_chain_digest: Optional[dict] = None) -> dict:
         """
         Handle the hub procedure for a given hocId and product footprint using LogisticsOperationService.
 
         Args:
             hocId: Unique identifier for the hub operation category (hoc)
             product_footprint: Product footprint data
+            tce_chain_digest: Optional digest of the footprint's TCE chain
 
         Returns:
             product_footprint with hocId Information
@@ -126,7 +238,7 @@ class CamundaWorkerTasks:
 
         # Use the logistics operation service to handle the hub procedure
         result = self.logistics_operation_service.execute_hub_procedure(
-            hocId, product_footprint)
+            hocId, product_footprint, tce_chain_digest)
 
         log_task_completion("hub_procedure")
         return result
@@ -174,14 +286,25 @@ class CamundaWorkerTasks:
         """
         Send proofing document to the proofing service.
 
+        In fire-and-forget mode the job completes as soon as the document is
+        published; the proof response is delivered later as a Zeebe message.
+
         Args:
             proofing_document: Dictionary containing the proofing document
 
         Returns:
-            Dictionary containing the proof response
+            Dictionary containing the proof response, or the correlation key
+            of the expected proof response message in fire-and-forget mode
         """
         log_task_start("send_to_proofing_service")
 
+        if self.proofing_async_mode:
+            correlation_key = self.proofing_service.publish_proofing_document(
+                proofing_document)
+            log_task_completion("send_to_proofing_service",
+                                proof_correlation_key=correlation_key)
+            return {"proof_correlation_key": correlation_key}
+
         result = self.proofing_service.send_proofing_document(
             proofing_document)
 
@@ -190,6 +313,48 @@ class CamundaWorkerTasks:
 
         return {"product_footprint": result}
 
+    def _on_proof_response(self, proof_response: dict, reply_id: str) -> None:
+        """
+        Publish a proof response from the reply consumer thread and wait for it.
+
+        The response is only committed on Kafka once this returns, so a
+        failed publish is retried instead of leaving the process waiting.
+
+        Args:
+            proof_response: Parsed proof response
+            reply_id: Id of the Kafka reply, the same for every delivery of it
+        """
+        product_footprint_id = proof_response["productFootprintId"]
+        proof_response = self.claim_check.check_in("product_footprint", proof_response)
+        asyncio.run_coroutine_threadsafe(
+            self._publish_proof_response(product_footprint_id, proof_response, reply_id),
+            self._loop).result(PROOF_RESPONSE_PUBLISH_TIMEOUT)
+
+    async def _publish_proof_response(self, product_footprint_id: str, proof_response: dict,
+                                      reply_id: str) -> None:
+        """
+        Publish a proof response as a Zeebe message to resume the waiting process.
+
+        Args:
+            product_footprint_id: Correlation key of the waiting process
+            proof_response: Proof response, or its claim-check reference
+            reply_id: Id of the Kafka reply
+        """
+        try:
+            # The message id deduplicates redeliveries of the same reply, not later proofs
+            await self.client.publish_message(
+                name=PROOF_RESPONSE_MESSAGE_NAME,
+                correlation_key=product_footprint_id,
+                variables={"product_footprint": proof_response},
+                time_to_live_in_milliseconds=PROOF_RESPONSE_MESSAGE_TTL_MS,
+                message_id=f"proof-{reply_id}"
+            )
+            logger.info(
+                f"Published {PROOF_RESPONSE_MESSAGE_NAME} for product footprint {product_footprint_id}")
+        except MessageAlreadyExistsError:
+            logger.debug(
+                f"Proof response {reply_id} for product footprint {product_footprint_id} already published")
+
     async def notify_next_node(self, message_name: str, shipment_information: dict) -> None:
         """
         Publish a message to notify the next node in the process.
@@ -0,0 +1,46 @@
+import unittest
+
+from utils.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test cases for the bounded LRU/TTL cache."""
+
+    def setUp(self):
+        """Create a cache driven by a fake clock."""
+        self.now = 0.0
+        self.cache = LRUCache(max_entries=2, ttl_seconds=10,
+                              clock=lambda: self.now)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Reading an entry protects it from eviction."""
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")
+        self.cache.put("c", 3)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        """Entries older than the TTL are misses."""
+        self.cache.put("a", 1)
+        self.now = 10.5
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_statistics(self):
+        """Hits and misses are counted."""
+        self.cache.put("a", 1)
+        self.cache.get("a")
+        self.cache.get("missing")
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
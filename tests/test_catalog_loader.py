@@ -0,0 +1,71 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from models.catalog_loader import CatalogLoader
+from models.database import HocTocDatabase
+from services.database import HocTocService
+from utils.data_utils import get_mock_data
+
+
+class TestCatalogLoader(unittest.TestCase):
+    """Test cases for streaming HOC/TOC catalog imports."""
+
+    def setUp(self):
+        """Create a database with the mock catalog in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.service = HocTocService(HocTocDatabase(
+            os.path.join(self.tmp_dir.name, "hoc_toc_data.db")), version_check_interval=0)
+        self.addCleanup(self.service.close)
+        self.loader = CatalogLoader(self.service.db, chunk_size=100)
+
+    def toc_records(self, count):
+        """Build TOC records based on the mock TOC 200."""
+        template = get_mock_data("200")
+        return [dict(template, tocId=f"T{i}", description=f"Truck {i}") for i in range(count)]
+
+    def test_jsonl_import_replaces_table(self):
+        """A JSONL catalog replaces the TOC table and leaves HOC data alone."""
+        path = os.path.join(self.tmp_dir.name, "catalog.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.toc_records(1050):
+                f.write(json.dumps(record) + "\n")
+
+        counts = self.loader.load_file(path)
+
+        self.assertEqual(counts, {"toc": 1050, "hoc": 0})
+        self.assertEqual(self.service.get_toc_data("T1049")["description"], "Truck 1049")
+        self.assertIsNone(self.service.get_toc_data("200"))
+        self.assertIsNotNone(self.service.get_hoc_data("100"))
+
+    def test_csv_import(self):
+        """CSV catalogs carry list columns as JSON."""
+        path = os.path.join(self.tmp_dir.name, "catalog.csv")
+        record = get_mock_data("101")
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(record))
+            writer.writeheader()
+            writer.writerow(dict(record, hocId="H1",
+                                 energyCarriers=json.dumps(record["energyCarriers"])))
+
+        self.assertEqual(self.loader.load_file(path), {"toc": 0, "hoc": 1})
+        self.assertEqual(self.service.get_hoc_models(["H1"])["H1"].energyCarriers[0].energyCarrier,
+                         "Hydrogen")
+
+    def test_invalid_record_keeps_live_table(self):
+        """A failing import leaves the previous catalog in place."""
+        records = self.toc_records(250)
+        records[230]["mode"] = "teleport"
+
+        with self.assertRaises(ValueError):
+            self.loader.load(records)
+
+        self.assertIsNone(self.service.get_toc_data("T0"))
+        self.assertEqual(self.service.get_toc_data("200")["mode"], "road")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from pyzeebe import Job
+from pyzeebe.function_tools.parameter_tools import get_parameters_from_function
+
+from models.database import SQLiteConnectionPool
+from utils.claim_check import (
+    REFERENCE_KEY,
+    ClaimCheck,
+    FileBlobStore,
+    SQLiteBlobStore,
+    is_reference,
+)
+from utils.error_handling import ClaimCheckError
+
+
+class TestClaimCheck(unittest.TestCase):
+    """Test cases for claim-checking large process variables."""
+
+    def setUp(self):
+        """Create a claim check on a file store in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.store = FileBlobStore(os.path.join(self.tmp_dir.name, "blobs"))
+        self.claim_check = ClaimCheck(self.store, threshold_bytes=100,
+                                      variables=["sensor_data"])
+        self.sensor_data = [{"tceId": str(i), "signature": "x" * 50} for i in range(5)]
+
+    def test_large_variables_are_stored(self):
+        """Only listed variables above the threshold become references."""
+        result = self.claim_check.check_in_variables({
+            "sensor_data": self.sensor_data,
+            "other": self.sensor_data,
+        })
+
+        self.assertTrue(is_reference(result["sensor_data"]))
+        self.assertEqual(result["other"], self.sensor_data)
+        self.assertEqual(self.claim_check.check_in("sensor_data", [1]), [1])
+
+    def test_round_trip_without_cache(self):
+        """References resolve from the store in another process."""
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        other_process = ClaimCheck(self.store, threshold_bytes=0)
+
+        self.assertEqual(other_process.check_out(reference), self.sensor_data)
+        self.assertEqual(other_process.cache.stats()["misses"], 1)
+
+    def test_nested_references_are_resolved(self):
+        """References collected into lists and dictionaries, e.g. by multi-instance outputs, resolve."""
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        collected = [reference, {"footprint": reference, "id": 1}, None]
+
+        self.assertEqual(self.claim_check.check_out_variables({"product_footprints": collected}),
+                         {"product_footprints": [self.sensor_data,
+                                                 {"footprint": self.sensor_data, "id": 1}, None]})
+
+    def test_values_without_references_are_not_copied(self):
+        """Only containers on the path to a reference are rebuilt."""
+        footprint = {"id": "pf-1", "tces": [{"tceId": "1"}]}
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        collected = [reference, footprint]
+
+        variables = self.claim_check.check_out_variables(
+            {"product_footprint": footprint, "product_footprints": collected})
+
+        self.assertIs(variables["product_footprint"], footprint)
+        self.assertIsNot(variables["product_footprints"], collected)
+        self.assertIs(variables["product_footprints"][1], footprint)
+
+    def test_disabled_claim_check_leaves_handlers_unwrapped(self):
+        """Without threshold and store, handlers are registered as they are."""
+        async def verify(product_footprint: dict) -> dict:
+            return {}
+
+        self.assertIs(ClaimCheck(threshold_bytes=0).wrap(verify), verify)
+
+    def test_async_handler_without_references_stays_on_the_loop(self):
+        """Async handlers only hand blob I/O to a thread when there is any."""
+        async def verify(product_footprint: dict) -> dict:
+            return {"verified": product_footprint}
+
+        wrapped = self.claim_check.wrap(verify)
+        with patch("asyncio.to_thread", side_effect=AssertionError("thread hop")):
+            result = asyncio.run(wrapped(product_footprint={"id": "pf-1"}))
+
+        self.assertEqual(result, {"verified": {"id": "pf-1"}})
+
+    def test_content_addressed(self):
+        """Equal values share one blob."""
+        first = self.claim_check.check_in("sensor_data", self.sensor_data)
+        second = self.claim_check.check_in("sensor_data", list(self.sensor_data))
+
+        self.assertEqual(first, second)
+
+    def test_checked_out_values_are_independent(self):
+        """Handlers mutating a resolved value do not corrupt the cache."""
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        self.claim_check.check_out(reference).append({"tceId": "new"})
+
+        self.assertEqual(self.claim_check.check_out(reference), self.sensor_data)
+
+    def test_corrupt_and_missing_blobs(self):
+        """Blobs that are missing or do not match their key are rejected."""
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        key = reference[REFERENCE_KEY]["key"]
+        other_process = ClaimCheck(self.store, threshold_bytes=0, compression="none")
+        with open(self.store._path(key), 'wb') as f:
+            f.write(b"garbage")
+
+        with self.assertRaises(ClaimCheckError):
+            other_process.check_out({REFERENCE_KEY: {"key": key}})
+        with self.assertRaises(ClaimCheckError):
+            other_process.check_out({REFERENCE_KEY: {"key": "0" * 64}})
+
+    def test_sqlite_store(self):
+        """The SQLite store round-trips blobs."""
+        store = SQLiteBlobStore(os.path.join(self.tmp_dir.name, "blobs.db"))
+        self.addCleanup(store.close)
+        claim_check = ClaimCheck(store, threshold_bytes=100, variables=["sensor_data"])
+        reference = claim_check.check_in("sensor_data", self.sensor_data)
+
+        self.assertEqual(ClaimCheck(store).check_out(reference), self.sensor_data)
+
+    def test_sqlite_store_on_read_only_replicas(self):
+        """The SQLite store stays writable when HOC_TOC_DB_READ_ONLY makes pools immutable."""
+        def read_only_pool(db_path, read_only=True, **kwargs):
+            return SQLiteConnectionPool(db_path, read_only=read_only, **kwargs)
+
+        with patch("utils.claim_check.SQLiteConnectionPool", read_only_pool):
+            store = SQLiteBlobStore(os.path.join(self.tmp_dir.name, "blobs.db"))
+        self.addCleanup(store.close)
+        store.put("key", b"blob")
+
+        self.assertEqual(store.get("key"), b"blob")
+
+    def test_sqlite_store_missing_blob(self):
+        """The SQLite store rejects unknown keys and ignores repeated puts."""
+        store = SQLiteBlobStore(os.path.join(self.tmp_dir.name, "blobs.db"))
+        self.addCleanup(store.close)
+        store.put("key", b"blob")
+        store.put("key", b"blob")
+
+        self.assertEqual(store.get("key"), b"blob")
+        with self.assertRaises(ClaimCheckError):
+            store.get("missing")
+
+    def test_wrapped_handlers(self):
+        """Wrapped sync and async handlers see values and return references."""
+        def transport(job: Job, sensor_data: list) -> dict:
+            return {"sensor_data": sensor_data + [{"tceId": "new"}]}
+
+        async def verify(sensor_data: list) -> dict:
+            return {"count": len(sensor_data)}
+
+        reference = self.claim_check.check_in("sensor_data", self.sensor_data)
+        wrapped = self.claim_check.wrap(transport)
+        self.assertEqual(get_parameters_from_function(wrapped), ["sensor_data"])
+
+        result = wrapped(job=None, sensor_data=reference)
+        self.assertTrue(is_reference(result["sensor_data"]))
+        self.assertEqual(len(self.claim_check.check_out(result["sensor_data"])), 6)
+
+        wrapped_async = self.claim_check.wrap(verify)
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped_async))
+        self.assertEqual(asyncio.run(wrapped_async(sensor_data=reference)), {"count": 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from models.proofing_document import ProofingDocument
+from utils.codec import WireFormat, decode_payload
+
+
+class TestWireFormat(unittest.TestCase):
+    """Test cases for the proofing document wire codecs."""
+
+    def setUp(self):
+        """Load an example proofing document."""
+        with open("data/proof_documents_examples/new_data_2.json", 'r', encoding='utf-8') as f:
+            self.document = ProofingDocument.model_validate(json.load(f))
+
+    def test_round_trip_all_formats(self):
+        """Every codec/compression combination decodes to the same document."""
+        for codec in ("json", "msgpack", "protobuf"):
+            for compression in ("none", "gzip", "zstd", "lz4"):
+                with self.subTest(codec=codec, compression=compression):
+                    try:
+                        wire_format = WireFormat(codec, compression)
+                    except ImportError as e:
+                        self.skipTest(str(e))
+                    encoded = wire_format.encode(self.document)
+
+                    decoded = decode_payload(encoded, wire_format.headers)
+
+                    self.assertEqual(
+                        ProofingDocument.model_validate(decoded), self.document)
+
+    def test_json_without_headers(self):
+        """Messages without headers are read as plain JSON."""
+        encoded = WireFormat().encode(self.document)
+
+        self.assertEqual(WireFormat().headers, [
+                         ("content-type", b"application/json")])
+        self.assertEqual(decode_payload(encoded), json.loads(
+            self.document.model_dump_json()))
+
+    def test_unknown_codec(self):
+        """Unknown codecs are rejected."""
+        with self.assertRaises(ValueError):
+            WireFormat("xml")
+        with self.assertRaises(ValueError):
+            WireFormat("json", "brotli")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from models.database import HocTocDatabase, SQLiteConnectionPool
+from services.database import HocTocService
+
+
+class TestHocTocDatabase(unittest.TestCase):
+    """Test cases for the pooled HOC/TOC database access."""
+
+    def setUp(self):
+        """Create a populated database in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_path = os.path.join(self.tmp_dir.name, "hoc_toc_data.db")
+        self.service = HocTocService(HocTocDatabase(self.db_path))
+        self.addCleanup(self.service.close)
+
+    def test_connections_are_reused(self):
+        """Lookups borrow pooled connections instead of opening new ones."""
+        for _ in range(20):
+            self.assertEqual(self.service.get_toc_data("200")["mode"], "road")
+            self.assertEqual(self.service.get_hoc_data(
+                "100")["passhubType"], "Charging Hub")
+
+        self.assertEqual(self.service.db.pool._opened, 1)
+
+    def test_wal_and_mmap_enabled(self):
+        """Writable connections use WAL journaling and memory-mapped I/O."""
+        with self.service.db.pool.connection() as conn:
+            self.assertEqual(conn.execute(
+                "PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertGreater(conn.execute(
+                "PRAGMA mmap_size").fetchone()[0], 0)
+
+    def test_read_only_replica(self):
+        """Read-only databases serve lookups and reject writes."""
+        self.service.close()
+        replica = HocTocService(HocTocDatabase(self.db_path, read_only=True))
+        self.addCleanup(replica.close)
+
+        self.assertEqual(replica.get_toc_data("204")["mode"], "sea")
+        with replica.db.pool.connection() as conn:
+            with self.assertRaises(Exception):
+                conn.execute("DELETE FROM toc_data")
+
+    def test_collect_hoc_toc_data_resolves_each_id_once(self):
+        """TOC/HOC data is fetched per unique id but listed per TCE."""
+        with open("data/proof_documents_examples/new_data_2.json", 'r', encoding='utf-8') as f:
+            product_footprint = json.load(f)["productFootprint"]
+        tces = product_footprint["extensions"][0]["data"]["tces"]
+        # A long multi-leg shipment repeating the same operations
+        product_footprint["extensions"][0]["data"]["tces"] = [
+            copy.deepcopy(tce) for _ in range(50) for tce in tces]
+
+        statements = []
+        with self.service.db.pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+        result = self.service.collect_hoc_toc_data(product_footprint)
+        with self.service.db.pool.connection() as conn:
+            conn.set_trace_callback(None)
+
+        document = result["proofing_document"]
+        self.assertEqual([toc["tocId"] for toc in document["tocData"]],
+                         ["201", "202"] * 50)
+        self.assertEqual([hoc["hocId"] for hoc in document["hocData"]],
+                         ["102", "103"] * 50)
+        self.assertEqual(len([sql for sql in statements if sql.startswith("SELECT")]), 2)
+
+    def test_bulk_lookup_chunks_large_id_sets(self):
+        """Bulk lookups handle more ids than fit into one statement."""
+        ids = [f"unknown-{i}" for i in range(1200)] + ["200", "204"]
+
+        found = self.service.get_toc_data_bulk(ids)
+
+        self.assertEqual(sorted(found), ["200", "204"])
+        self.assertEqual(found["204"]["mode"], "sea")
+
+    def test_validated_records_are_cached(self):
+        """Repeated lookups are served from the cache without queries."""
+        self.service.get_toc_models(["200", "201"])
+
+        statements = []
+        with self.service.db.pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+        toc_data = self.service.get_toc_models(["201", "200", "201"])
+        with self.service.db.pool.connection() as conn:
+            conn.set_trace_callback(None)
+
+        self.assertEqual(statements, [])
+        self.assertEqual(toc_data["201"].description,
+                         "Electric Van - Urban Delivery")
+        self.assertEqual(self.service.cache_stats()["toc"]["hits"], 2)
+        self.assertEqual(self.service.cache_stats()["toc"]["misses"], 2)
+
+    def test_cache_invalidated_by_other_writers(self):
+        """A commit by another connection invalidates the cache via data_version."""
+        service = HocTocService(HocTocDatabase(
+            self.db_path), version_check_interval=0)
+        self.addCleanup(service.close)
+        self.assertEqual(service.get_hoc_models(
+            ["100"])["100"].hubActivityUnit, "kWh delivered")
+
+        writer = HocTocDatabase(self.db_path)
+        self.addCleanup(writer.close)
+        with writer.pool.connection() as conn:
+            conn.execute(
+                "UPDATE hoc_data SET hub_activity_unit = 'MWh' WHERE hoc_id = '100'")
+            conn.commit()
+
+        self.assertEqual(service.get_hoc_models(
+            ["100"])["100"].hubActivityUnit, "MWh")
+
+    def test_pool_is_thread_safe(self):
+        """Concurrent lookups never exceed the pool size."""
+        pool = SQLiteConnectionPool(self.db_path, pool_size=2)
+        self.addCleanup(pool.close)
+        errors = []
+
+        def lookup():
+            try:
+                for _ in range(50):
+                    with pool.connection() as conn:
+                        conn.execute(
+                            "SELECT * FROM toc_data WHERE toc_id = ?", ("201",)).fetchone()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(pool._opened, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,33 +1,28 @@
 import unittest
 
-from models.proofing_document import ProofingDocument, ProofResponse
-from utils.kafka import send_message_to_kafka, consume_messages_from_kafka
+from models.proofing_document import ProofingDocument
+from services.proving_service import ProofingService
+from utils.kafka import close_producer_managers, close_reply_dispatchers
 
 
-class kafka_communication_test(unittest.TestCase):
-    def test_from_json_file(self):
-        filename = "data/proof_documents_examples/shipment_3.json"
-        content = None
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(content)
-        except FileNotFoundError:
-            print("Fehler: Die Datei 'meine_datei.txt' wurde nicht gefunden.")
-        except IOError as e:
-            print(f"Ein Fehler beim Lesen der Datei ist aufgetreten: {e}")
+class TestKafkaCommunication(unittest.TestCase):
+    """Round trip through a running Kafka broker and proofing service."""
 
-        proofing_document = ProofingDocument.model_validate_json(content)
+    def tearDown(self):
+        """Close the shared producer and reply consumer."""
+        close_reply_dispatchers()
+        close_producer_managers()
 
-        topic_out = "shipments"
-        topic_in = "pcf-results"
+    def test_from_json_file(self):
+        """A proofing document sent to the shipments topic is answered on pcf-results."""
+        with open("data/proof_documents_examples/shipment_3.json", 'r', encoding='utf-8') as f:
+            proofing_document = ProofingDocument.model_validate_json(f.read())
 
-        message_to_send = proofing_document.model_dump_json()
-        send_message_to_kafka(topic_out, message_to_send)
-        msg = consume_messages_from_kafka(topic_in)
+        service = ProofingService(topic_out="shipments", topic_in="pcf-results")
+        proof_response = service.send_proofing_document(proofing_document.model_dump())
 
-        print(msg)
+        self.assertEqual(proof_response["proofReference"], "123")
 
-        proof_response = ProofResponse.model_validate_json(msg)
 
-        self.assertEqual(proof_response.proofReference, "123")
+if __name__ == '__main__':
+    unittest.main()
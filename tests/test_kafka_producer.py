@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from confluent_kafka import KafkaException
+
+from utils.kafka import KafkaProducerManager
+
+
+class TestKafkaProducerManager(unittest.TestCase):
+    """Test cases for the shared KafkaProducerManager."""
+
+    def setUp(self):
+        """Replace the confluent_kafka Producer with a mock."""
+        patcher = patch('utils.kafka.Producer')
+        self.producer_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.producer = self.producer_cls.return_value
+        self.producer.flush.return_value = 0
+        self.manager = KafkaProducerManager(
+            bootstrap_servers="kafka:9092", linger_ms=20, batch_size=65536, compression_type="zstd")
+        self.addCleanup(self.manager.close)
+
+    def test_producer_is_created_once(self):
+        """The producer is created lazily and reused across messages."""
+        self.manager.produce("shipments", "first")
+        self.manager.produce("shipments", "second")
+
+        self.producer_cls.assert_called_once_with({
+            'bootstrap.servers': "kafka:9092",
+            'linger.ms': 20,
+            'batch.size': 65536,
+            'compression.type': "zstd",
+            'partitioner': "murmur2_random",
+        })
+        self.assertEqual(self.producer.produce.call_count, 2)
+        self.producer.flush.assert_not_called()
+
+    def test_delivery_future_resolves(self):
+        """The returned future reflects the delivery report."""
+        future = self.manager.produce("shipments", "payload", key="k")
+
+        kwargs = self.producer.produce.call_args.kwargs
+        self.assertEqual(kwargs["value"], b"payload")
+        delivered = MagicMock()
+        kwargs["on_delivery"](None, delivered)
+
+        self.assertIs(future.result(timeout=1), delivered)
+
+    def test_delivery_future_fails(self):
+        """A failed delivery report fails the future."""
+        future = self.manager.produce("shipments", b"payload")
+
+        self.producer.produce.call_args.kwargs["on_delivery"](
+            "broker down", None)
+
+        with self.assertRaises(KafkaException):
+            future.result(timeout=1)
+
+    def test_close_flushes_producer(self):
+        """Closing the manager flushes pending messages and releases the producer."""
+        self.manager.start()
+        self.manager.close(timeout=2)
+
+        self.producer.flush.assert_called_once_with(2)
+        self.assertFalse(self.manager.started)
+
+
+if __name__ == '__main__':
+    unittest.main()
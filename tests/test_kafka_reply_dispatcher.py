@@ -0,0 +1,169 @@
+import json
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest.mock import MagicMock, patch
+
+from utils.codec import WireFormat
+from utils.kafka import KafkaReplyDispatcher, KafkaReplyListener, correlation_id_from_message
+
+
+def make_message(payload: dict, headers=None, offset=7):
+    """Build a fake confluent_kafka Message."""
+    msg = MagicMock()
+    msg.value.return_value = json.dumps(payload).encode('utf-8')
+    msg.headers.return_value = headers
+    msg.error.return_value = None
+    msg.topic.return_value = "pcf-results"
+    msg.partition.return_value = 2
+    msg.offset.return_value = offset
+    return msg
+
+
+class TestKafkaReplyDispatcher(unittest.TestCase):
+    """Test cases for routing proof responses to waiting callers."""
+
+    def setUp(self):
+        """Create a dispatcher with a mocked consumer."""
+        patcher = patch('utils.kafka.Consumer')
+        self.consumer_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.consumer_cls.return_value.poll.return_value = None
+        self.dispatcher = KafkaReplyDispatcher(
+            "pcf-results", group_id="test-group", assignment_timeout=0)
+        self.addCleanup(self.dispatcher.close)
+
+    def test_correlation_id_prefers_header(self):
+        """The correlation_id header wins over the payload field."""
+        msg = make_message({"productFootprintId": "from-body"},
+                           headers=[("correlation_id", b"from-header")])
+
+        self.assertEqual(correlation_id_from_message(msg), "from-header")
+        self.assertEqual(correlation_id_from_message(
+            make_message({"productFootprintId": "from-body"})), "from-body")
+
+    def test_reply_is_routed_to_matching_caller(self):
+        """Each caller only receives the reply with its own correlation id."""
+        first = self.dispatcher.register("pf-1")
+        second = self.dispatcher.register("pf-2")
+
+        self.dispatcher._dispatch(make_message({"productFootprintId": "pf-2"}))
+
+        self.assertFalse(first.done())
+        self.assertEqual(second.result(timeout=1)[
+                         "productFootprintId"], "pf-2")
+        self.assertEqual(self.dispatcher.pending_count(), 1)
+
+    def test_compressed_reply_is_decoded(self):
+        """Replies are decoded according to their wire format headers."""
+        wire_format = WireFormat("msgpack", "gzip")
+        msg = make_message({})
+        msg.value.return_value = wire_format.encode(
+            {"productFootprintId": "pf-1", "pcf": 1.5})
+        msg.headers.return_value = wire_format.headers
+        waiting = self.dispatcher.register("pf-1")
+
+        self.dispatcher._dispatch(msg)
+
+        self.assertEqual(waiting.result(timeout=1)["pcf"], 1.5)
+
+    def test_unknown_reply_is_dropped(self):
+        """Replies nobody waits for do not resolve other callers."""
+        waiting = self.dispatcher.register("pf-1")
+
+        self.dispatcher._dispatch(make_message({"productFootprintId": "other"}))
+
+        self.assertFalse(waiting.done())
+
+    def test_unmatched_reply_goes_to_handler(self):
+        """Replies without a waiting caller are passed to the unmatched handler."""
+        received = []
+        self.dispatcher.set_unmatched_handler(received.append)
+        waiting = self.dispatcher.register("pf-1")
+
+        self.dispatcher._dispatch(make_message({"productFootprintId": "pf-1"}))
+        self.dispatcher._dispatch(make_message({"productFootprintId": "pf-2"}))
+
+        self.assertTrue(waiting.done())
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]["productFootprintId"], "pf-2")
+
+    def test_wait_timeout_unregisters(self):
+        """A timed out caller is removed from the pending replies."""
+        future = self.dispatcher.register("pf-1")
+
+        with self.assertRaises(FutureTimeoutError):
+            self.dispatcher.wait("pf-1", future, timeout=0.01)
+
+        self.assertEqual(self.dispatcher.pending_count(), 0)
+
+    def test_single_consumer_group_subscription(self):
+        """All callers share one consumer subscribed once."""
+        self.dispatcher.register("pf-1")
+        self.dispatcher.register("pf-2")
+
+        self.consumer_cls.assert_called_once()
+        self.assertEqual(
+            self.consumer_cls.call_args.args[0]["group.id"], "test-group")
+        self.consumer_cls.return_value.subscribe.assert_called_once()
+
+
+class TestKafkaReplyListener(unittest.TestCase):
+    """Test cases for consuming proof responses in a shared consumer group."""
+
+    def setUp(self):
+        """Create a listener with a mocked consumer."""
+        patcher = patch('utils.kafka.Consumer')
+        self.consumer_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.consumer = self.consumer_cls.return_value
+        self.consumer.poll.return_value = None
+        self.received = []
+        self.listener = KafkaReplyListener("pcf-results", group_id="shared", retry_backoff=0)
+        self.listener.start(lambda payload, msg: self.received.append(payload))
+        self.addCleanup(self.listener.close)
+
+    def test_shared_group_commits_manually(self):
+        """All workers share the group, start at the earliest offset and commit themselves."""
+        config = self.consumer_cls.call_args.args[0]
+
+        self.assertEqual(config["group.id"], "shared")
+        self.assertEqual(config["auto.offset.reset"], "earliest")
+        self.assertFalse(config["enable.auto.commit"])
+
+    def test_handled_reply_is_committed(self):
+        """A reply is committed after its handler returned."""
+        msg = make_message({"productFootprintId": "pf-1"})
+
+        self.assertTrue(self.listener._process(msg))
+
+        self.assertEqual(self.received, [{"productFootprintId": "pf-1"}])
+        self.consumer.commit.assert_called_once_with(message=msg, asynchronous=False)
+
+    def test_failed_reply_is_retried(self):
+        """A reply whose handler raised is not committed and consumed again."""
+        def fail(payload, msg):
+            raise ConnectionError("gateway unavailable")
+        self.listener._handler = fail
+
+        with self.assertLogs("camunda_service", "ERROR"):
+            self.assertFalse(self.listener._process(make_message({})))
+
+        self.consumer.commit.assert_not_called()
+        partition = self.consumer.seek.call_args.args[0]
+        self.assertEqual((partition.topic, partition.partition, partition.offset),
+                         ("pcf-results", 2, 7))
+
+    def test_undecodable_reply_is_skipped(self):
+        """Replies that cannot be decoded are committed without retry."""
+        msg = make_message({})
+        msg.value.return_value = b"\xff"
+
+        with self.assertLogs("camunda_service", "ERROR"):
+            self.assertTrue(self.listener._process(msg))
+
+        self.assertEqual(self.received, [])
+        self.consumer.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import copy
+import json
+import os
+import tempfile
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from models.database import HocTocDatabase
+from models.product_footprint import ProductFootprint
+from services.database import HocTocService
+from services.logistics_operation_service import LogisticsOperationService
+from services.product_footprint import ProductFootprintService
+from utils.error_handling import TceChainError
+from utils.tce_chain import chain_digest, verify_chain
+
+
+class TestIncrementalTceAppend(unittest.TestCase):
+    """Test cases for appending TCEs to raw footprints guarded by the chain digest."""
+
+    def setUp(self):
+        """Create a footprint template and a service with a stubbed sensor data call."""
+        sensor_data = MagicMock()
+        sensor_data.model_dump.return_value = {"tceId": "sensor"}
+        sensor_data.sensorData.distance.actual = 42.0
+        sensor_service = MagicMock()
+        sensor_service.call_service_sensordata.return_value = sensor_data
+        self.async_sensor_service = MagicMock()
+        self.async_sensor_service.call_service_sensordata = AsyncMock(return_value=sensor_data)
+        self.service = LogisticsOperationService(
+            sensor_service, async_sensor_data_service=self.async_sensor_service)
+
+        self.job = MagicMock(process_instance_key=1, element_id="transport")
+        template = ProductFootprintService().create_product_footprint_template(
+            "ACME", {"shipment_id": "SHIP_1", "shipment_weight": 1500.0})
+        self.footprint = template["product_footprint"]
+        self.digest = template["tce_chain_digest"]
+
+    def run_hops(self, hops=3):
+        footprint, digest = self.footprint, self.digest
+        for i in range(hops):
+            if i % 2:
+                result = self.service.execute_hub_procedure("100", footprint, digest)
+            else:
+                result = self.service.execute_transport_procedure(
+                    200, footprint, self.job, None, digest)
+            # Variables travel through Zeebe as JSON between hops
+            footprint = json.loads(json.dumps(result["product_footprint"]))
+            digest = json.loads(json.dumps(result["tce_chain_digest"]))
+        return footprint, digest
+
+    def test_hops_skip_full_validation(self):
+        """With a digest, hops never validate the whole footprint."""
+        with patch.object(ProductFootprint, "model_validate",
+                          side_effect=AssertionError("full validation")):
+            footprint, digest = self.run_hops()
+
+        verified = ProductFootprint.model_validate(footprint)
+        tces = verified.extensions[0].data.tces
+        self.assertEqual(len(tces), 3)
+        self.assertEqual(tces[2].prevTceIds, [tces[0].tceId, tces[1].tceId])
+        self.assertEqual(tces[0].distance.actual, 42.0)
+        self.assertEqual(digest, chain_digest(verified))
+        verify_chain(verified, digest)
+
+    def test_async_transport_appends_like_sync(self):
+        """The async transport procedure awaits the async client and extends the chain."""
+        result = asyncio.run(self.service.execute_transport_procedure_async(
+            200, self.footprint, self.job, None, self.digest))
+
+        tces = result["product_footprint"]["extensions"][0]["data"]["tces"]
+        request = self.async_sensor_service.call_service_sensordata.await_args.args[0]
+        self.assertEqual(request["tceId"], tces[0]["tceId"])
+        self.assertEqual(request["camundaProcessInstanceKey"], "1")
+        self.assertEqual(tces[0]["distance"]["actual"], 42.0)
+        self.assertEqual(result["sensor_data"], [{"tceId": "sensor"}])
+        verify_chain(ProductFootprint.model_validate(result["product_footprint"]),
+                     result["tce_chain_digest"])
+
+    def test_missing_digest_falls_back_to_full_validation(self):
+        """Footprints without a digest are validated once and get one."""
+        self.digest = None
+        footprint, digest = self.run_hops(2)
+
+        self.assertEqual(digest, chain_digest(ProductFootprint.model_validate(footprint)))
+
+    def test_modified_last_tce_is_rejected(self):
+        """A hop detects changes to the last TCE."""
+        footprint, digest = self.run_hops(2)
+        footprint["extensions"][0]["data"]["tces"][-1]["hocId"] = "101"
+
+        with self.assertRaises(TceChainError):
+            self.service.execute_hub_procedure("100", footprint, digest)
+
+    def test_modified_mass_is_rejected(self):
+        """A hop detects changes to the footprint fields new TCEs copy."""
+        footprint, digest = self.run_hops(1)
+        footprint["extensions"][0]["data"]["mass"] = 1.0
+
+        with self.assertRaises(TceChainError):
+            self.service.execute_hub_procedure("100", footprint, digest)
+
+    def test_modified_earlier_tce_is_rejected_on_collect(self):
+        """Changes to earlier TCEs are caught by the full verification."""
+        footprint, digest = self.run_hops(3)
+        tampered = copy.deepcopy(footprint)
+        tampered["extensions"][0]["data"]["tces"][0]["distance"]["actual"] = 1.0
+
+        with self.assertRaises(TceChainError):
+            verify_chain(ProductFootprint.model_validate(tampered), digest)
+
+    def test_dropped_digest_is_rejected_with_secret(self):
+        """With a secret, a footprint with TCEs but no digest is not re-signed."""
+        with patch("utils.tce_chain.TCE_CHAIN_SECRET", "secret"):
+            self.digest = chain_digest(ProductFootprint.model_validate(self.footprint))
+            footprint, _ = self.run_hops(2)
+            footprint["extensions"][0]["data"]["tces"][0]["distance"]["actual"] = 1.0
+
+            with self.assertRaises(TceChainError):
+                self.service.execute_hub_procedure("100", footprint, None)
+            with self.assertRaises(TceChainError):
+                verify_chain(ProductFootprint.model_validate(footprint), None)
+
+    def test_unknown_digest_version_is_not_re_signed(self):
+        """A digest the hop cannot check is not silently replaced by a new one."""
+        footprint, digest = self.run_hops(2)
+
+        with self.assertRaises(TceChainError):
+            self.service.execute_hub_procedure("100", footprint, dict(digest, version=0))
+
+
+class TestParentOnlyPrevTceIds(unittest.TestCase):
+    """Test cases for the compact parent-only prevTceIds encoding."""
+
+    def setUp(self):
+        """Create services appending hub TCEs in full and parent mode."""
+        self.full = LogisticsOperationService(MagicMock(), prev_ids_mode="full")
+        self.parent = LogisticsOperationService(MagicMock(), prev_ids_mode="parent")
+        template = ProductFootprintService().create_product_footprint_template(
+            "ACME", {"shipment_id": "SHIP_1", "shipment_weight": 1500.0})
+        self.footprint = template["product_footprint"]
+        self.digest = template["tce_chain_digest"]
+
+    def append(self, service, hops, footprint=None, digest=None):
+        footprint = footprint or copy.deepcopy(self.footprint)
+        digest = digest or self.digest
+        for _ in range(hops):
+            result = service.execute_hub_procedure("100", footprint, digest)
+            footprint, digest = result["product_footprint"], result["tce_chain_digest"]
+        return footprint, digest
+
+    def test_parent_mode_stores_direct_parent_only(self):
+        """Each TCE only carries the id of the TCE before it."""
+        footprint, _ = self.append(self.parent, 5)
+        tces = footprint["extensions"][0]["data"]["tces"]
+
+        self.assertEqual(tces[0]["prevTceIds"], [])
+        for previous, tce in zip(tces, tces[1:]):
+            self.assertEqual(tce["prevTceIds"], [previous["tceId"]])
+
+    def test_expansion_matches_full_mode(self):
+        """Expanded parent-only chains equal the chains full mode builds."""
+        footprint, _ = self.append(self.parent, 5)
+        expanded = self.parent.expand_tce_chain(footprint)
+
+        tces = expanded["extensions"][0]["data"]["tces"]
+        ids = [tce["tceId"] for tce in tces]
+        for i, tce in enumerate(tces):
+            self.assertEqual(tce["prevTceIds"], ids[:i])
+
+    def test_mixed_chain_is_expanded(self):
+        """Switching modes mid-shipment still yields the full ancestry."""
+        footprint, digest = self.append(self.parent, 3)
+        footprint, _ = self.append(self.full, 2, footprint, digest)
+
+        summary = self.full.get_tce_chain_summary(footprint)
+        ids = summary["tce_ids"]
+        self.assertEqual(summary["prev_tce_ids"][ids[4]], ids[:4])
+
+    def test_proofing_document_gets_full_chain(self):
+        """collect_hoc_toc_data verifies the compact chain and expands it."""
+        footprint, digest = self.append(self.parent, 3)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        service = HocTocService(HocTocDatabase(os.path.join(tmp_dir.name, "hoc_toc_data.db")))
+        self.addCleanup(service.close)
+
+        document = service.collect_hoc_toc_data(footprint, None, digest)["proofing_document"]
+        tces = document["productFootprint"]["extensions"][0]["data"]["tces"]
+        self.assertEqual(tces[2]["prevTceIds"], [tces[0]["tceId"], tces[1]["tceId"]])
+
+    def test_unknown_mode_is_rejected(self):
+        """Only full and parent are valid modes."""
+        with self.assertRaises(ValueError):
+            LogisticsOperationService(MagicMock(), prev_ids_mode="delta")
+
+
+if __name__ == '__main__':
+    unittest.main()
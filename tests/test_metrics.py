@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+from pyzeebe.function_tools.parameter_tools import get_parameters_from_function
+
+from utils.metrics import instrument, measure_variables
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestTaskMetrics(unittest.TestCase):
+    """Test cases for the per-task-type handler metrics."""
+
+    def test_successful_jobs(self):
+        """Jobs, latency and variable sizes are recorded per task type."""
+        async def handler(product_footprint: dict) -> dict:
+            self.assertEqual(sample("camunda_task_in_flight", task_type="metrics_ok"), 1.0)
+            return {}
+
+        wrapped = instrument("metrics_ok", handler, variable_sample_rate=1)
+        self.assertEqual(get_parameters_from_function(wrapped), ["product_footprint"])
+
+        for _ in range(3):
+            asyncio.run(wrapped(product_footprint={"id": "x" * 1000}))
+
+        self.assertEqual(sample("camunda_task_jobs_total", task_type="metrics_ok"), 3.0)
+        self.assertEqual(sample("camunda_task_duration_seconds_count", task_type="metrics_ok"), 3.0)
+        self.assertEqual(sample("camunda_task_in_flight", task_type="metrics_ok"), 0.0)
+        self.assertEqual(sample("camunda_task_variable_bytes_count",
+                                task_type="metrics_ok", variable="product_footprint"), 3.0)
+        self.assertGreater(sample("camunda_task_variable_bytes_sum",
+                                  task_type="metrics_ok", variable="product_footprint"), 3000)
+
+    def test_variables_are_sampled(self):
+        """Without sampling, async handlers do not serialize their variables."""
+        async def handler(product_footprint: dict) -> dict:
+            return {}
+
+        asyncio.run(instrument("metrics_unsampled", handler, variable_sample_rate=0)(
+            product_footprint={"id": "x"}))
+
+        self.assertEqual(sample("camunda_task_jobs_total", task_type="metrics_unsampled"), 1.0)
+        self.assertEqual(sample("camunda_task_variable_bytes_count",
+                                task_type="metrics_unsampled", variable="product_footprint"), 0.0)
+
+    def test_blocking_handler_measures_on_its_thread(self):
+        """Blocking handlers record their variable sizes on the thread they run on."""
+        threads = []
+
+        def handler(product_footprint: dict) -> dict:
+            return {}
+
+        def observe(task_type, variables):
+            threads.append(threading.current_thread())
+
+        wrapped = measure_variables("metrics_blocking", handler)
+        self.assertEqual(get_parameters_from_function(wrapped), ["product_footprint"])
+        with patch("utils.metrics.observe_variables", side_effect=observe):
+            thread = threading.Thread(target=wrapped, kwargs={"product_footprint": {}})
+            thread.start()
+            thread.join()
+
+        self.assertEqual(threads, [thread])
+
+    def test_failed_jobs(self):
+        """Exceptions are counted by type and still propagate to pyzeebe."""
+        async def handler() -> dict:
+            raise ValueError("broken")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(instrument("metrics_fail", handler)())
+
+        self.assertEqual(sample("camunda_task_errors_total",
+                                task_type="metrics_fail", error="ValueError"), 1.0)
+        self.assertEqual(sample("camunda_task_jobs_total", task_type="metrics_fail"), 1.0)
+        self.assertEqual(sample("camunda_task_in_flight", task_type="metrics_fail"), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import json
+import time
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+from confluent_kafka import KafkaException
+from prometheus_client import REGISTRY
+
+from services.proving_service import ProofingService
+from utils.error_handling import ProofingServiceError
+
+
+def delivered_future(partition: int) -> Future:
+    """Build a delivery future resolved with a message on the given partition."""
+    msg = MagicMock()
+    msg.partition.return_value = partition
+    future = Future()
+    future.set_result(msg)
+    return future
+
+
+class TestProofingService(unittest.TestCase):
+    """Test cases for publishing proofing documents with mocked Kafka clients."""
+
+    def setUp(self):
+        """Load an example proofing document and mock the Kafka clients."""
+        with open("data/proof_documents_examples/new_data_2.json", 'r', encoding='utf-8') as f:
+            self.document = json.load(f)
+        self.footprint_id = self.document["productFootprint"]["id"]
+        self.shipment_id = self.document["productFootprint"]["extensions"][0]["data"]["shipmentId"]
+
+        self.producer_manager = MagicMock()
+        self.producer_manager.produce.return_value = delivered_future(3)
+        self.reply_dispatcher = MagicMock()
+
+    def make_service(self, partition_key="shipment_id", **kwargs):
+        return ProofingService(producer_manager=self.producer_manager,
+                               reply_dispatcher=self.reply_dispatcher,
+                               partition_key=partition_key, **kwargs)
+
+    def in_flight_metric(self, topic):
+        return REGISTRY.get_sample_value(
+            "camunda_proofs_in_flight", {"topic": topic, "partition": "3"})
+
+    def test_message_key_strategies(self):
+        """The message key follows the configured partition key strategy."""
+        expected = {
+            "shipment_id": self.shipment_id,
+            "product_footprint_id": self.footprint_id,
+            "none": None,
+        }
+        for strategy, key in expected.items():
+            with self.subTest(strategy=strategy):
+                self.make_service(strategy).publish_proofing_document(
+                    self.document)
+                self.assertEqual(
+                    self.producer_manager.produce.call_args.kwargs["key"], key)
+
+    def test_unknown_partition_key_strategy(self):
+        """Unknown partition key strategies are rejected."""
+        with self.assertRaises(ValueError):
+            self.make_service("random")
+
+    def test_in_flight_released_on_response(self):
+        """A proof stays in flight on its partition until the response arrives."""
+        service = self.make_service()
+        in_flight_while_waiting = []
+
+        def wait(*args):
+            in_flight_while_waiting.append(service.in_flight_by_partition())
+            return {
+                "productFootprintId": self.footprint_id,
+                "proofReceipt": "receipt",
+                "proofReference": "ref",
+                "pcf": 12.5,
+                "imageId": "image",
+            }
+        self.reply_dispatcher.wait.side_effect = wait
+
+        result = service.send_proofing_document(self.document)
+
+        self.assertEqual(result["pcf"], 12.5)
+        self.assertEqual(in_flight_while_waiting, [{3: 1}])
+        self.reply_dispatcher.register.assert_called_once_with(
+            self.footprint_id)
+        self.assertEqual(service.in_flight_by_partition(), {})
+
+    def test_in_flight_is_exported_and_expires(self):
+        """Proofs without response are exported per partition until the response timeout."""
+        service = self.make_service(topic_out="in-flight-expiry", response_timeout=0.05)
+
+        service.publish_proofing_document(self.document)
+
+        self.assertEqual(service.in_flight_by_partition(), {3: 1})
+        self.assertEqual(self.in_flight_metric("in-flight-expiry"), 1.0)
+        time.sleep(0.1)
+        self.assertEqual(service.in_flight_by_partition(), {})
+        self.assertEqual(self.in_flight_metric("in-flight-expiry"), 0.0)
+
+    def test_response_before_delivery_report_is_not_counted(self):
+        """A response arriving before the delivery report leaves nothing in flight."""
+        service = self.make_service(topic_out="in-flight-early")
+
+        def produce(*args, **kwargs):
+            service._release_in_flight(self.footprint_id)
+            return delivered_future(3)
+        self.producer_manager.produce.side_effect = produce
+
+        service.publish_proofing_document(self.document)
+
+        self.assertEqual(service.in_flight_by_partition(), {})
+        self.assertFalse(self.in_flight_metric("in-flight-early"))
+
+    def test_failed_delivery_is_not_in_flight(self):
+        """Documents that could not be delivered are not awaited."""
+        service = self.make_service()
+        self.producer_manager.produce.side_effect = KafkaException("broker down")
+
+        with self.assertRaises(ProofingServiceError):
+            service.publish_proofing_document(self.document)
+
+        self.assertEqual(service._in_flight, {})
+
+
+class TestProofResponseListener(unittest.TestCase):
+    """Test cases for handing proof responses to the fire-and-forget listener."""
+
+    def setUp(self):
+        """Create a service with a mocked reply listener."""
+        self.reply_listener = MagicMock()
+        self.service = ProofingService(producer_manager=MagicMock(),
+                                       reply_dispatcher=MagicMock(),
+                                       reply_listener=self.reply_listener)
+        self.received = []
+        self.service.set_response_listener(
+            lambda response, reply_id: self.received.append((response, reply_id)))
+        self.handle = self.reply_listener.start.call_args.args[0]
+
+    def test_response_is_passed_with_reply_id(self):
+        """Listeners receive the parsed response and an id stable across redeliveries."""
+        msg = MagicMock()
+        msg.topic.return_value, msg.partition.return_value, msg.offset.return_value = \
+            "pcf-results", 1, 42
+
+        self.handle({"productFootprintId": "pf-1", "proofReceipt": "receipt",
+                     "proofReference": "ref", "pcf": 1.5, "imageId": "image"}, msg)
+
+        self.assertEqual(self.received[0][0]["pcf"], 1.5)
+        self.assertEqual(self.received[0][1], "pcf-results-1-42")
+
+    def test_invalid_response_is_skipped(self):
+        """Responses that do not validate are logged instead of retried forever."""
+        with self.assertLogs("camunda_service", "ERROR"):
+            self.handle({"productFootprintId": "pf-1"}, MagicMock())
+
+        self.assertEqual(self.received, [])
+
+    def test_close_stops_the_listener(self):
+        """Closing the service leaves the shared consumer group."""
+        self.service.close()
+
+        self.reply_listener.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
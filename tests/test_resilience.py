@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+from prometheus_client import REGISTRY
+
+from utils.error_handling import DependencyUnavailableError, on_error
+from utils.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, Dependency
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for the latency-aware circuit breaker."""
+
+    def setUp(self):
+        """Create a breaker with a controllable clock."""
+        self.now = 0.0
+        self.breaker = CircuitBreaker("test", failure_rate=0.5, slow_call_seconds=1.0,
+                                      window=10, min_calls=4, open_seconds=30,
+                                      half_open_calls=2, clock=lambda: self.now)
+
+    def record(self, *outcomes):
+        for success, seconds in outcomes:
+            self.breaker.acquire()
+            self.breaker.record(success, seconds)
+
+    def test_opens_on_failure_rate(self):
+        """The circuit opens once half of the recent calls failed."""
+        self.record((True, 0.1), (False, 0.1), (True, 0.1))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.record((False, 0.1))
+
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(DependencyUnavailableError) as raised:
+            self.breaker.acquire()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_slow_calls_count_as_failures(self):
+        """Successful calls slower than the threshold open the circuit too."""
+        self.record((True, 2.0), (True, 2.0), (True, 0.1), (True, 0.1))
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probes_close_the_circuit(self):
+        """After the open period a limited number of probes decide."""
+        self.record(*[(False, 0.1)] * 4)
+        self.now += 30
+
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.acquire()
+        self.breaker.acquire()
+        with self.assertRaises(DependencyUnavailableError) as raised:
+            self.breaker.acquire()
+        # Rejected callers retry once the probes must have finished
+        self.assertEqual(raised.exception.retry_after, 1.0)
+        self.breaker.record(True, 0.1)
+        self.breaker.record(True, 0.1)
+
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        """A failing probe opens the circuit for another period."""
+        self.record(*[(False, 0.1)] * 4)
+        self.now += 30
+        self.record((False, 0.1))
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_cancelled_probe_is_returned(self):
+        """A probe without outcome frees its place for another one."""
+        self.record(*[(False, 0.1)] * 4)
+        self.now += 30
+        self.breaker.acquire()
+        self.breaker.acquire()
+        self.breaker.release()
+
+        self.breaker.acquire()
+
+
+class TestDependency(unittest.TestCase):
+    """Test cases for the concurrency limit of a dependency."""
+
+    def test_full_limit_rejects_after_timeout(self):
+        """Callers wait for a slot only up to the limit timeout."""
+        dependency = Dependency("test_limit", max_concurrency=1, limit_timeout=0.05)
+        release = threading.Event()
+        holder = threading.Thread(target=dependency.call, args=(release.wait,))
+        holder.start()
+        self.addCleanup(holder.join)
+        self.addCleanup(release.set)
+        time.sleep(0.05)
+
+        with self.assertRaises(DependencyUnavailableError):
+            dependency.call(lambda: None)
+        with self.assertRaises(DependencyUnavailableError):
+            asyncio.run(dependency.call_async(AsyncMock()))
+
+    def test_failed_results_count_against_the_circuit(self):
+        """Results classified as failures open the circuit like exceptions."""
+        dependency = Dependency("test_results", CircuitBreaker("test_results", min_calls=2))
+        for _ in range(2):
+            self.assertEqual(dependency.call(lambda: 503, is_failure=lambda status: status >= 500), 503)
+
+        self.assertEqual(dependency.breaker.state, OPEN)
+
+    def test_open_circuit_fails_without_waiting_for_a_slot(self):
+        """An open circuit rejects calls at once, even while the limit is full."""
+        dependency = Dependency("test_open_limit", CircuitBreaker("test_open_limit", min_calls=1),
+                                max_concurrency=1, limit_timeout=5.0)
+        with self.assertRaises(ValueError):
+            dependency.call(Mock(side_effect=ValueError))
+        dependency._slots.acquire()
+        self.addCleanup(dependency._slots.release)
+        started = time.monotonic()
+
+        with self.assertRaises(DependencyUnavailableError):
+            dependency.call(lambda: None)
+        with self.assertRaises(DependencyUnavailableError):
+            asyncio.run(dependency.call_async(AsyncMock()))
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_rejected_probe_is_returned(self):
+        """A half-open probe rejected by the full limit frees its place."""
+        now = [0.0]
+        dependency = Dependency("test_probe_limit", CircuitBreaker(
+            "test_probe_limit", min_calls=1, open_seconds=30, half_open_calls=1,
+            clock=lambda: now[0]), max_concurrency=1, limit_timeout=0.01)
+        with self.assertRaises(ValueError):
+            dependency.call(Mock(side_effect=ValueError))
+        now[0] += 30
+        dependency._slots.acquire()
+        with self.assertRaises(DependencyUnavailableError):
+            dependency.call(lambda: None)
+        dependency._slots.release()
+
+        self.assertEqual(dependency.call(lambda: "probe"), "probe")
+
+
+class TestHedging(unittest.IsolatedAsyncioTestCase):
+    """Test cases for hedged async calls."""
+
+    async def asyncSetUp(self):
+        """Create a hedging dependency whose recent calls took 10 ms."""
+        self.dependency = Dependency("test_hedge", hedge=True, min_hedge_delay=0.02)
+        for _ in range(20):
+            self.dependency.latency.record(0.01)
+        self.calls = 0
+
+    def hedged(self):
+        return REGISTRY.get_sample_value(
+            "camunda_dependency_hedged_total", {"dependency": "test_hedge"}) or 0.0
+
+    async def test_slow_call_is_hedged(self):
+        """A call exceeding the p95 latency is raced by a second one."""
+        async def call():
+            self.calls += 1
+            await asyncio.sleep(1.0 if self.calls == 1 else 0.01)
+            return self.calls
+        before = self.hedged()
+        started = time.perf_counter()
+
+        self.assertEqual(await self.dependency.call_async(call), 2)
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(self.hedged() - before, 1)
+
+    async def test_fast_call_is_not_hedged(self):
+        """Calls finishing within the hedge delay run once."""
+        async def call():
+            self.calls += 1
+            return "ok"
+
+        self.assertEqual(await self.dependency.call_async(call), "ok")
+        self.assertEqual(self.calls, 1)
+
+    async def test_failed_attempt_waits_for_the_other(self):
+        """An attempt failing while the other still runs does not fail the call."""
+        async def call():
+            self.calls += 1
+            if self.calls == 1:
+                await asyncio.sleep(0.05)
+                raise ConnectionError("reset")
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        self.assertEqual(await self.dependency.call_async(call), "ok")
+
+    async def test_hedging_can_be_disabled_per_call(self):
+        """Non-idempotent calls opt out of hedging."""
+        async def call():
+            self.calls += 1
+            await asyncio.sleep(0.1)
+
+        await self.dependency.call_async(call, hedge=False)
+        self.assertEqual(self.calls, 1)
+
+
+class TestOnError(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the Zeebe error handler."""
+
+    async def test_unavailable_dependency_fails_for_retry(self):
+        """Jobs rejected by a circuit are retried after its open time, not thrown."""
+        controller = AsyncMock()
+
+        await on_error(DependencyUnavailableError("sensor_data", "circuit open", 12.5),
+                       MagicMock(key=1), controller)
+
+        controller.set_failure_status.assert_awaited_once()
+        self.assertEqual(controller.set_failure_status.await_args.kwargs["retry_back_off_ms"], 12500)
+        controller.set_error_status.assert_not_awaited()
+
+    async def test_other_errors_are_thrown(self):
+        """Other errors are thrown as BPMN errors with their message."""
+        controller = AsyncMock()
+
+        with self.assertLogs("camunda_service", "ERROR"):
+            await on_error(ValueError("bad input"), MagicMock(key=1), controller)
+
+        message = controller.set_error_status.await_args.args[0]
+        self.assertIn("bad input", message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import copy
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from models.sensor_data import TceSensorData
+from services.logistics_operation_service import LogisticsOperationService
+from services.product_footprint import ProductFootprintService
+from services.sensor_data_cache import SensorDataCache
+
+
+def sensor_record(tce_id, distance=12.5):
+    return TceSensorData(
+        tceId=tce_id,
+        camundaProcessInstanceKey="1",
+        camundaActivityId="transport",
+        sensorkey="key",
+        signedSensorData="signature",
+        sensorData={"distance": {"actual": distance}},
+    )
+
+
+class TestSensorDataCache(unittest.TestCase):
+    """Test cases for the durable sensor data response cache."""
+
+    def setUp(self):
+        """Open a cache in a temporary directory with a controllable clock."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.now = 1000.0
+        self.db_path = os.path.join(self.tmp_dir.name, "sensor_data_cache.db")
+        self.cache = SensorDataCache(self.db_path, ttl_seconds=60, clock=lambda: self.now)
+        self.addCleanup(self.cache.close)
+
+    def test_round_trip(self):
+        """A stored response is returned for the same job."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1"))
+
+        tce_id, sensor_data = self.cache.get(1, "transport", 10)
+
+        self.assertEqual(tce_id, "tce-1")
+        self.assertEqual(sensor_data, sensor_record("tce-1"))
+        self.assertIsNone(self.cache.get(1, "hub", 10))
+        self.assertIsNone(self.cache.get(2, "transport", 10))
+
+    def test_entries_survive_restarts(self):
+        """Another cache on the same file sees the entry."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1"))
+        other = SensorDataCache(self.db_path, ttl_seconds=60, clock=lambda: self.now)
+        self.addCleanup(other.close)
+
+        self.assertEqual(other.get(1, "transport", 10)[0], "tce-1")
+
+    def test_expired_entries_are_ignored_and_replaced(self):
+        """Entries older than the TTL miss and are overwritten."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1"))
+        self.now += 61
+
+        self.assertIsNone(self.cache.get(1, "transport", 10))
+        self.assertEqual(self.cache.put(1, "transport", 10, "tce-2", sensor_record("tce-2"))[0],
+                         "tce-2")
+
+    def test_new_element_instance_requests_fresh_data(self):
+        """An activity visited again in a loop does not reuse the earlier visit."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1"))
+
+        self.assertIsNone(self.cache.get(1, "transport", 11))
+        self.assertEqual(self.cache.put(1, "transport", 11, "tce-2", sensor_record("tce-2"))[0],
+                         "tce-2")
+
+    def test_first_attempt_wins(self):
+        """A concurrent attempt storing later gets the first attempt's entry."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1", 1.0))
+
+        tce_id, sensor_data = self.cache.put(1, "transport", 10, "tce-2", sensor_record("tce-2", 2.0))
+
+        self.assertEqual(tce_id, "tce-1")
+        self.assertEqual(sensor_data.sensorData.distance.actual, 1.0)
+
+    def test_expired_entries_are_evicted(self):
+        """Expired rows are deleted on later writes."""
+        self.cache.put(1, "transport", 10, "tce-1", sensor_record("tce-1"))
+        self.now += 120
+        self.cache.put(2, "transport", 20, "tce-2", sensor_record("tce-2"))
+
+        with self.cache.pool.connection() as conn:
+            keys = conn.execute("SELECT process_instance_key FROM sensor_data_cache").fetchall()
+        self.assertEqual(keys, [("2",)])
+
+
+class TestRedeliveredTransportJobs(unittest.TestCase):
+    """Test cases for transport procedures of redelivered jobs."""
+
+    def setUp(self):
+        """Create a service with stubbed sensor clients and a temporary cache."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = SensorDataCache(os.path.join(tmp_dir.name, "cache.db"))
+        self.addCleanup(cache.close)
+        self.sensor_service = MagicMock()
+        self.sensor_service.call_service_sensordata.side_effect = \
+            lambda request: sensor_record(request["tceId"])
+        self.async_sensor_service = MagicMock()
+        self.async_sensor_service.call_service_sensordata = AsyncMock(
+            side_effect=lambda request: sensor_record(request["tceId"]))
+        self.service = LogisticsOperationService(
+            self.sensor_service, async_sensor_data_service=self.async_sensor_service,
+            sensor_data_cache=cache)
+        template = ProductFootprintService().create_product_footprint_template(
+            "ACME", {"shipment_id": "SHIP_1", "shipment_weight": 1500.0})
+        self.footprint = template["product_footprint"]
+        self.digest = template["tce_chain_digest"]
+
+    def transport(self, job, run_async=False):
+        # Every delivery of a job carries the variables the process had when it was created
+        footprint = copy.deepcopy(self.footprint)
+        if run_async:
+            return asyncio.run(self.service.execute_transport_procedure_async(
+                200, footprint, job, None, self.digest))
+        return self.service.execute_transport_procedure(200, footprint, job, None, self.digest)
+
+    def test_redelivery_is_served_from_cache(self):
+        """A retried job appends the same TCE without calling the sensor service again."""
+        job = MagicMock(key=5, process_instance_key=1, element_id="transport",
+                        element_instance_key=10)
+        first = self.transport(job)
+        retried = self.transport(job, run_async=True)
+
+        self.assertEqual(retried, first)
+        self.sensor_service.call_service_sensordata.assert_called_once()
+        self.async_sensor_service.call_service_sensordata.assert_not_awaited()
+
+    def test_other_jobs_call_the_service(self):
+        """Jobs of other activities get their own TCE."""
+        first = self.transport(MagicMock(process_instance_key=1, element_id="transport",
+                                         element_instance_key=10))
+        second = self.transport(MagicMock(process_instance_key=1, element_id="transport_2",
+                                          element_instance_key=11), run_async=True)
+
+        self.assertNotEqual(first["sensor_data"][0]["tceId"], second["sensor_data"][0]["tceId"])
+        self.async_sensor_service.call_service_sensordata.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
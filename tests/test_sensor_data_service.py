@@ -0,0 +1,298 @@
+import asyncio
+import io
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from services.sensor_data_service import AsyncSensorDataService, SensorDataService
+from utils.error_handling import DependencyUnavailableError, SensorDataServiceError
+from utils.http import create_async_client, create_session
+from utils.resilience import CircuitBreaker, Dependency
+
+
+class SensorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    delay = 0.0
+    batch_supported = True
+    requests = []
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        SensorHandler.requests.append((self.path, request))
+        time.sleep(SensorHandler.delay)
+        if SensorHandler.failures:
+            SensorHandler.failures -= 1
+            self.reply(503, {"error": "busy"})
+        elif self.path == "/api/v1/sensor-data":
+            self.reply(200, self.sensor_data(request))
+        elif self.path == "/api/v1/sensor-data/batch" and SensorHandler.batch_supported:
+            self.reply(200, [
+                {"error": "unknown shipment"} if item["shipment_id"] == "UNKNOWN"
+                else self.sensor_data(item) for item in request])
+        else:
+            self.reply(404, {"detail": "Not Found"})
+
+    @staticmethod
+    def sensor_data(request):
+        return {
+            "tceId": request["tceId"],
+            "camundaProcessInstanceKey": request["camundaProcessInstanceKey"],
+            "camundaActivityId": request["camundaActivityId"],
+            "sensorkey": "key",
+            "signedSensorData": "signature",
+            "sensorData": json.dumps({"distance": {"actual": 12.5}}),
+        }
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class SensorServer(ThreadingHTTPServer):
+    # Accept bursts of concurrent connections
+    request_queue_size = 128
+
+
+def start_server(test):
+    """Start a local keep-alive sensor service for the duration of a test."""
+    server = SensorServer(("127.0.0.1", 0), SensorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    SensorHandler.failures = 0
+    SensorHandler.delay = 0.0
+    SensorHandler.batch_supported = True
+    SensorHandler.requests = []
+    return server
+
+
+def sensor_request(tce_id="tce-1", shipment_id="SHIP_1"):
+    return {
+        "shipment_id": shipment_id,
+        "tceId": tce_id,
+        "camundaProcessInstanceKey": "1",
+        "camundaActivityId": "transport",
+    }
+
+
+def connections(server):
+    return REGISTRY.get_sample_value(
+        "camunda_http_connections_created_total",
+        {"host": f"127.0.0.1:{server.server_port}"}) or 0.0
+
+
+class TestSensorDataService(unittest.TestCase):
+    """Test cases for the pooled sensor data HTTP client."""
+
+    def setUp(self):
+        """Start a local keep-alive sensor service."""
+        self.server = start_server(self)
+        self.host = f"127.0.0.1:{self.server.server_port}"
+        self.service = SensorDataService(
+            base_url=f"http://{self.host}",
+            session=create_session(pool_size=2, retries=2, backoff_factor=0.01,
+                                   backoff_jitter=0.01),
+            dependency=Dependency("sensor_data_test"))
+        self.addCleanup(self.service.close)
+
+    def call(self, tce_id="tce-1"):
+        return self.service.call_service_sensordata(sensor_request(tce_id))
+
+    def test_connections_are_reused(self):
+        """Sequential calls share one keep-alive connection."""
+        for i in range(5):
+            self.assertEqual(self.call(f"tce-{i}").sensorData.distance.actual, 12.5)
+
+        self.assertEqual(connections(self.server), 1.0)
+
+    def test_signed_sensor_data_is_kept(self):
+        """The sensorData string is kept as received, since its bytes are signed."""
+        sensor_data = self.call()
+
+        self.assertEqual(sensor_data.rawSensorData, json.dumps({"distance": {"actual": 12.5}}))
+
+    def test_response_is_logged_not_printed(self):
+        """Responses go to the debug log instead of stdout."""
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                self.assertLogs("camunda_service", "DEBUG") as logs:
+            self.call()
+
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue(any("Sensor data response" in line for line in logs.output))
+
+    def test_unavailable_service_is_retried(self):
+        """503 responses are retried with backoff."""
+        SensorHandler.failures = 2
+
+        self.assertEqual(self.call().tceId, "tce-1")
+
+    def test_retries_are_bounded(self):
+        """The last 503 is raised once retries are exhausted."""
+        SensorHandler.failures = 3
+
+        with self.assertRaises(Exception):
+            self.call()
+
+    def test_timeouts_from_config(self):
+        """Connect and read timeouts are passed separately."""
+        service = SensorDataService(base_url="http://unused", connect_timeout=1.5,
+                                    read_timeout=20)
+        self.addCleanup(service.close)
+
+        self.assertEqual(service.timeout, (1.5, 20))
+
+
+class TestAsyncSensorDataService(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the asyncio sensor data HTTP client."""
+
+    async def asyncSetUp(self):
+        """Start a local keep-alive sensor service and an async client."""
+        self.server = start_server(self)
+        self.service = AsyncSensorDataService(
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+            client=create_async_client(pool_size=50), retries=2,
+            backoff_factor=0.01, backoff_jitter=0.01,
+            dependency=Dependency("sensor_data_test", max_concurrency=50))
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def test_calls_overlap(self):
+        """Concurrent calls wait for the service together, not one after another."""
+        SensorHandler.delay = 0.2
+        started = time.perf_counter()
+
+        results = await asyncio.gather(*(
+            self.service.call_service_sensordata(sensor_request(f"tce-{i}")) for i in range(20)))
+
+        self.assertEqual([r.tceId for r in results], [f"tce-{i}" for i in range(20)])
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+    async def test_connections_are_reused(self):
+        """Sequential calls share one keep-alive connection."""
+        for i in range(5):
+            await self.service.call_service_sensordata(sensor_request(f"tce-{i}"))
+
+        self.assertEqual(connections(self.server), 1.0)
+
+    async def test_unavailable_service_is_retried(self):
+        """503 responses are retried, the last one is raised."""
+        SensorHandler.failures = 2
+        self.assertEqual((await self.service.call_service_sensordata(sensor_request())).tceId, "tce-1")
+
+        SensorHandler.failures = 3
+        with self.assertRaises(Exception):
+            await self.service.call_service_sensordata(sensor_request())
+
+    async def test_requests_are_not_hedged(self):
+        """Slow requests are not sent twice unless read errors may be retried."""
+        self.service.dependency = Dependency("sensor_data_test", hedge=True, min_hedge_delay=0.01)
+        for _ in range(20):
+            self.service.dependency.latency.record(0.001)
+        SensorHandler.delay = 0.1
+
+        await self.service.call_service_sensordata(sensor_request())
+
+        self.assertEqual(len(SensorHandler.requests), 1)
+
+
+class TestSensorDataBatching(unittest.IsolatedAsyncioTestCase):
+    """Test cases for coalescing concurrent sensor data requests."""
+
+    async def asyncSetUp(self):
+        """Start a local sensor service and a client with a batch window."""
+        self.server = start_server(self)
+        self.service = AsyncSensorDataService(
+            base_url=f"http://127.0.0.1:{self.server.server_port}",
+            retries=0, batch_window=0.05, batch_max_size=8,
+            dependency=Dependency("sensor_data_test"))
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def call_all(self, requests):
+        return await asyncio.gather(
+            *(self.service.call_service_sensordata(request) for request in requests),
+            return_exceptions=True)
+
+    def paths(self):
+        return [path.rsplit("/", 1)[-1] for path, _ in SensorHandler.requests]
+
+    async def test_concurrent_requests_are_batched(self):
+        """Requests within the window share calls of at most batch_max_size."""
+        results = await self.call_all([sensor_request(f"tce-{i}") for i in range(20)])
+
+        self.assertEqual([r.tceId for r in results], [f"tce-{i}" for i in range(20)])
+        self.assertEqual(self.paths(), ["batch"] * 3)
+        self.assertEqual(sorted(len(body) for _, body in SensorHandler.requests), [4, 8, 8])
+
+    async def test_errors_fail_only_their_request(self):
+        """An error entry of the batch response is raised to its caller only."""
+        results = await self.call_all([
+            sensor_request("tce-1"), sensor_request("tce-2", shipment_id="UNKNOWN")])
+
+        self.assertEqual(results[0].tceId, "tce-1")
+        self.assertIsInstance(results[1], SensorDataServiceError)
+
+    async def test_unsupported_batch_endpoint_falls_back(self):
+        """Without a batch endpoint, requests are sent one by one from then on."""
+        SensorHandler.batch_supported = False
+
+        results = await self.call_all([sensor_request(f"tce-{i}") for i in range(3)])
+        results += await self.call_all([sensor_request(f"tce-{i}") for i in range(3, 5)])
+
+        self.assertEqual([r.tceId for r in results], [f"tce-{i}" for i in range(5)])
+        self.assertEqual(self.paths(), ["batch"] + ["sensor-data"] * 5)
+        self.assertFalse(self.service.batch_supported)
+
+    async def test_single_request_is_not_batched(self):
+        """A request without concurrent ones uses the single endpoint after the window."""
+        result = await self.service.call_service_sensordata(sensor_request())
+
+        self.assertEqual(result.tceId, "tce-1")
+        self.assertEqual(self.paths(), ["sensor-data"])
+
+
+class TestSensorDataCircuit(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the circuit breaker around sensor data calls."""
+
+    async def asyncSetUp(self):
+        """Start a local sensor service and a client with a sensitive circuit."""
+        self.server = start_server(self)
+        self.service = AsyncSensorDataService(
+            base_url=f"http://127.0.0.1:{self.server.server_port}", retries=0,
+            dependency=Dependency("sensor_data_test", CircuitBreaker(
+                "sensor_data_test", min_calls=4, open_seconds=60)))
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def test_failing_service_opens_the_circuit(self):
+        """Once most calls fail, further calls fail fast without reaching the service."""
+        SensorHandler.failures = 4
+        for _ in range(4):
+            with self.assertRaises(Exception):
+                await self.service.call_service_sensordata(sensor_request())
+
+        with self.assertRaises(DependencyUnavailableError) as raised:
+            await self.service.call_service_sensordata(sensor_request())
+
+        self.assertEqual(len(SensorHandler.requests), 4)
+        self.assertGreater(raised.exception.retry_after, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
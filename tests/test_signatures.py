@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+import unittest
+
+from models.database import HocTocDatabase
+from models.proofing_document import ProofingDocument
+from models.sensor_data import TceSensorData
+from services.database import HocTocService
+from services.product_footprint import ProductFootprintService
+from utils.data_utils import create_crypto_keys, sign_data
+from utils.error_handling import SensorSignatureError
+from utils.signatures import SignatureVerifier, load_public_key, signed_message
+
+
+def signed_record(private_key, public_key_pem, tce_id, distance=12.5):
+    sensor_data = {"distance": {"actual": distance}}
+    return TceSensorData(
+        tceId=tce_id,
+        camundaProcessInstanceKey="1",
+        camundaActivityId="transport",
+        sensorkey=public_key_pem,
+        signedSensorData=sign_data(private_key, signed_message(sensor_data).decode('utf-8')),
+        sensorData=sensor_data,
+    )
+
+
+def raw_signed_record(private_key, public_key_pem, tce_id, raw):
+    return TceSensorData(
+        tceId=tce_id,
+        camundaProcessInstanceKey="1",
+        camundaActivityId="transport",
+        sensorkey=public_key_pem,
+        signedSensorData=sign_data(private_key, raw),
+        sensorData=json.loads(raw),
+        rawSensorData=raw,
+    )
+
+
+class TestSignatureVerifier(unittest.TestCase):
+    """Test cases for the batch verification of sensor data signatures."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create two sensor key pairs."""
+        cls.keys = [create_crypto_keys() for _ in range(2)]
+
+    def records(self, count):
+        return [signed_record(*self.keys[i % 2], f"tce-{i}", distance=float(i))
+                for i in range(count)]
+
+    def test_valid_signatures(self):
+        """Records signed over their canonical measurement verify."""
+        records = self.records(4)
+        # Zeebe hands the records back as JSON dictionaries
+        records = [TceSensorData.model_validate(r.model_dump()) for r in records]
+
+        self.assertEqual(SignatureVerifier(processes=1).verify(records), [None] * 4)
+
+    def test_signed_bytes_are_verified(self):
+        """Records are verified over the sensorData string the sensor signed, in any formatting."""
+        raw = '{ "distance": {"target": null, "actual": 12.5} }'
+        record = raw_signed_record(*self.keys[0], "tce-0", raw)
+        record = TceSensorData.model_validate(record.model_dump())
+
+        self.assertEqual(SignatureVerifier(processes=1).verify([record]), [None])
+
+    def test_sensor_data_must_match_signed_bytes(self):
+        """A changed measurement is caught even if the signed string is intact."""
+        record = raw_signed_record(*self.keys[0], "tce-0", '{"distance": {"actual": 12.5}}')
+        record.sensorData.distance.actual = 1.0
+        garbled = raw_signed_record(*self.keys[0], "tce-1", '{"distance": {"actual": 12.5}}')
+        garbled.rawSensorData = "{"
+
+        self.assertEqual(SignatureVerifier(processes=1).verify([record, garbled]),
+                         ["sensor data differs from signed data", "unreadable signed sensor data"])
+
+    def test_bad_records_are_identified(self):
+        """Changed measurements, foreign keys and garbage are reported per record."""
+        records = self.records(4)
+        records[0].sensorData.distance.actual = 1000.0
+        records[1].sensorkey = self.keys[0][1]
+        records[2].sensorkey = "not a key"
+        records[3].signedSensorData = "zz"
+
+        results = SignatureVerifier(processes=1).verify(records)
+
+        self.assertEqual(results[0], "invalid signature")
+        self.assertEqual(results[1], "invalid signature")
+        self.assertTrue(results[2].startswith("invalid sensor key"))
+        self.assertEqual(results[3], "malformed signature")
+
+    def test_public_keys_are_cached(self):
+        """Each sensor key is parsed once."""
+        load_public_key.cache_clear()
+
+        SignatureVerifier(processes=1).verify(self.records(10))
+
+        info = load_public_key.cache_info()
+        self.assertEqual((info.misses, info.hits), (2, 8))
+
+    def test_process_pool_matches_serial(self):
+        """Large batches verified on the process pool keep the record order."""
+        records = self.records(12)
+        records[5].sensorData.distance.actual = -1.0
+        verifier = SignatureVerifier(processes=2, parallel_threshold=8)
+        self.addCleanup(verifier.close)
+
+        results = verifier.verify(records)
+
+        self.assertIsNotNone(verifier._pool)
+        self.assertEqual(results, SignatureVerifier(processes=1).verify(records))
+        self.assertEqual([i for i, r in enumerate(results) if r], [5])
+
+    def test_check_modes(self):
+        """Bad records are rejected, logged or ignored depending on the mode."""
+        records = self.records(2)
+        records[1].sensorData.distance.actual = 0.0
+
+        with self.assertRaises(SensorSignatureError) as raised:
+            SignatureVerifier("reject", processes=1).check(records)
+        self.assertIn("tce-1", str(raised.exception))
+        with self.assertLogs("camunda_service", "WARNING"):
+            SignatureVerifier("warn", processes=1).check(records)
+        SignatureVerifier("off", processes=1).check(records)
+        with self.assertRaises(ValueError):
+            SignatureVerifier("strict")
+
+    def test_collect_rejects_bad_records(self):
+        """collect_hoc_toc_data refuses to build a proofing document from bad records."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        service = HocTocService(HocTocDatabase(os.path.join(tmp_dir.name, "hoc_toc.db")),
+                                signature_verifier=SignatureVerifier("reject", processes=1))
+        self.addCleanup(service.close)
+        footprint = ProductFootprintService().create_product_footprint_template(
+            "ACME", {"shipment_id": "SHIP_1", "shipment_weight": 1500.0})["product_footprint"]
+        sensor_data = [record.model_dump() for record in self.records(2)]
+
+        document = service.collect_hoc_toc_data(footprint, sensor_data)["proofing_document"]
+        self.assertEqual(len(document["signedSensorData"]), 2)
+
+        sensor_data[0]["sensorData"]["distance"]["actual"] = 99.0
+        with self.assertRaises(SensorSignatureError):
+            service.collect_hoc_toc_data(footprint, sensor_data)
+
+    def test_collect_verifies_signed_bytes_without_sending_them(self):
+        """The signed sensorData string is checked but left out of the proofing document."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        service = HocTocService(HocTocDatabase(os.path.join(tmp_dir.name, "hoc_toc.db")),
+                                signature_verifier=SignatureVerifier("reject", processes=1))
+        self.addCleanup(service.close)
+        footprint = ProductFootprintService().create_product_footprint_template(
+            "ACME", {"shipment_id": "SHIP_1", "shipment_weight": 1500.0})["product_footprint"]
+        record = raw_signed_record(*self.keys[0], "tce-0", '{"distance": {"actual": 12.5}}')
+
+        document = service.collect_hoc_toc_data(
+            footprint, [record.model_dump()])["proofing_document"]
+
+        self.assertNotIn("rawSensorData", document["signedSensorData"][0])
+        self.assertEqual(ProofingDocument.model_validate(document).signedSensorData[0].tceId, "tce-0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from utils.supervisor import WORKER_COUNT_ENV, WorkerSupervisor, cpu_share, send_heartbeats
+
+
+def exit_immediately(index, heartbeat):
+    pass
+
+
+def hang_without_heartbeat(index, heartbeat):
+    time.sleep(60)
+
+
+def run_with_heartbeats(index, heartbeat):
+    asyncio.run(send_heartbeats(heartbeat, interval=0.05))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestWorkerSupervisor(unittest.TestCase):
+    """Test cases for the multi-process worker supervisor."""
+
+    def create_supervisor(self, target, processes=1, heartbeat_timeout=5.0):
+        supervisor = WorkerSupervisor(target, processes,
+                                      heartbeat_timeout=heartbeat_timeout,
+                                      restart_backoff=0.0,
+                                      shutdown_grace=1.0,
+                                      start_method="fork")
+        self.addCleanup(supervisor.shutdown)
+        return supervisor
+
+    def test_exited_worker_is_restarted(self):
+        """A worker process that exits is started again."""
+        supervisor = self.create_supervisor(exit_immediately, processes=2)
+        for worker in supervisor.workers:
+            worker.start()
+        self.assertTrue(wait_for(lambda: not any(w.is_alive() for w in supervisor.workers)))
+
+        supervisor.check_workers()
+
+        self.assertEqual([w.restarts for w in supervisor.workers], [1, 1])
+
+    def test_worker_without_heartbeat_is_replaced(self):
+        """A worker whose heartbeat goes stale is terminated and restarted."""
+        supervisor = self.create_supervisor(hang_without_heartbeat, heartbeat_timeout=0.2)
+        worker = supervisor.workers[0]
+        worker.start()
+        first_pid = worker.process.pid
+        time.sleep(0.3)
+
+        supervisor.check_workers()
+
+        self.assertEqual(worker.restarts, 1)
+        self.assertNotEqual(worker.process.pid, first_pid)
+        self.assertTrue(worker.is_alive())
+
+    def test_healthy_worker_is_kept_and_shut_down(self):
+        """Workers sending heartbeats are left alone and stopped on shutdown."""
+        supervisor = self.create_supervisor(run_with_heartbeats, heartbeat_timeout=0.5)
+        worker = supervisor.workers[0]
+        worker.start()
+        time.sleep(0.7)
+
+        supervisor.check_workers()
+        self.assertEqual(worker.restarts, 0)
+
+        supervisor.shutdown()
+        self.assertFalse(worker.is_alive())
+
+
+class TestCpuShare(unittest.TestCase):
+    """Test cases for splitting the CPUs between worker processes."""
+
+    @patch("utils.supervisor.default_process_count", return_value=8)
+    def test_cpus_are_split_between_workers(self, _):
+        """Each supervised worker gets its share of the CPUs, at least one."""
+        with patch.dict(os.environ, {WORKER_COUNT_ENV: "2"}):
+            self.assertEqual(cpu_share(), 4)
+        with patch.dict(os.environ, {WORKER_COUNT_ENV: "16"}):
+            self.assertEqual(cpu_share(), 1)
+
+    @patch("utils.supervisor.default_process_count", return_value=8)
+    def test_unsupervised_process_gets_all_cpus(self, _):
+        """A worker running without supervisor uses every CPU."""
+        with patch.dict(os.environ):
+            os.environ.pop(WORKER_COUNT_ENV, None)
+            self.assertEqual(cpu_share(), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
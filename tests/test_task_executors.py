@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import threading
+import time
+import unittest
+
+from pyzeebe import Job
+from pyzeebe.function_tools.parameter_tools import (
+    get_job_parameter_name,
+    get_parameters_from_function,
+)
+
+from utils.executors import TaskExecutors, parse_executor_config
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestTaskExecutors(unittest.TestCase):
+    """Test cases for the per-task-type handler thread pools."""
+
+    def setUp(self):
+        """Create executors with one configured task type."""
+        self.executors = TaskExecutors(
+            config={"slow": {"threads": 2, "max_jobs": 4}},
+            default_threads=None,
+            default_max_jobs=3)
+
+    def tearDown(self):
+        self.executors.shutdown(wait=True)
+
+    def test_options(self):
+        """Unconfigured task types get one thread per running job."""
+        self.assertEqual(self.executors.options("slow"), {"threads": 2, "max_jobs": 4})
+        self.assertEqual(self.executors.options("other"), {"threads": 3, "max_jobs": 3})
+
+    def test_parse_executor_config(self):
+        """The configuration is a JSON object keyed by task type."""
+        self.assertEqual(parse_executor_config(""), {})
+        self.assertEqual(parse_executor_config('{"a": {"threads": 1}}'), {"a": {"threads": 1}})
+        with self.assertRaises(ValueError):
+            parse_executor_config("[]")
+
+    def test_offload_keeps_signature(self):
+        """pyzeebe still derives variables and the job parameter from the handler."""
+        def handler(job: Job, shipment_id: str, amount: float = 1.0) -> dict:
+            return {}
+
+        wrapped = self.executors.offload("slow", handler)
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped))
+        self.assertEqual(get_parameters_from_function(wrapped), ["shipment_id", "amount"])
+        self.assertEqual(get_job_parameter_name(wrapped), "job")
+
+    def test_offload_runs_on_task_type_pool_with_context(self):
+        """Handlers run on the task type's threads with the caller's context."""
+        def handler(value):
+            return threading.current_thread().name, request_id.get(), value
+
+        async def run():
+            request_id.set("abc")
+            return await self.executors.offload("slow", handler)(value=1)
+
+        thread_name, context_value, value = asyncio.run(run())
+        self.assertTrue(thread_name.startswith("task-slow"))
+        self.assertEqual(context_value, "abc")
+        self.assertEqual(value, 1)
+
+    def test_slow_task_type_does_not_block_others(self):
+        """A saturated task type pool leaves other task types responsive."""
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            return "slow"
+
+        def fast():
+            return "fast"
+
+        async def run():
+            slow_handler = self.executors.offload("slow", slow)
+            fast_handler = self.executors.offload("fast", fast)
+            blocked = [asyncio.ensure_future(slow_handler()) for _ in range(4)]
+            started = time.monotonic()
+            result = await asyncio.wait_for(fast_handler(), timeout=2)
+            elapsed = time.monotonic() - started
+            release.set()
+            await asyncio.gather(*blocked)
+            return result, elapsed
+
+        result, elapsed = asyncio.run(run())
+        self.assertEqual(result, "fast")
+        self.assertLess(elapsed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
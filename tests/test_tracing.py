@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+from utils.executors import TaskExecutors
+from utils.tracing import (
+    HttpSpanExporter,
+    JsonlSpanExporter,
+    SpanExporter,
+    bind_job,
+    set_exporter,
+    span,
+    trace_job,
+    traced,
+)
+
+
+class MemoryExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@traced("db.lookup")
+def lookup(fail=False):
+    if fail:
+        raise KeyError("missing")
+    return "row"
+
+
+@traced("sensor.call")
+async def call_sensor():
+    return lookup()
+
+
+class TestTracing(unittest.TestCase):
+    """Test cases for job and dependency spans."""
+
+    def setUp(self):
+        """Collect spans in memory."""
+        self.exporter = MemoryExporter()
+        previous = set_exporter(self.exporter)
+        self.addCleanup(set_exporter, previous)
+        self.executors = TaskExecutors(config={})
+        self.addCleanup(self.executors.shutdown)
+
+    def run_job(self, handler, process_instance_key=4711):
+        job = MagicMock(process_instance_key=process_instance_key, key=1,
+                        element_id="hub", bpmn_process_id="case_2", retries=3)
+
+        async def job_handler():
+            # pyzeebe runs every job in its own task, before-decorators first
+            await bind_job(job)
+            return await handler()
+
+        return asyncio.run(job_handler())
+
+    def test_spans_nest_under_job_on_executor_threads(self):
+        """Dependency spans of offloaded handlers share the job's trace."""
+        handler = trace_job("hub_procedure", self.executors.offload("hub_procedure", lookup))
+
+        self.assertEqual(self.run_job(handler), "row")
+
+        inner, root = self.exporter.spans
+        self.assertEqual(root["name"], "job hub_procedure")
+        self.assertEqual(root["trace_id"], f"{4711:032x}")
+        self.assertEqual(root["process_instance_key"], 4711)
+        self.assertEqual(root["attributes"]["element_id"], "hub")
+        self.assertEqual(inner["name"], "db.lookup")
+        self.assertEqual(inner["parent_id"], root["span_id"])
+        self.assertEqual(inner["trace_id"], root["trace_id"])
+        self.assertEqual(inner["process_instance_key"], 4711)
+
+    def test_async_spans_and_errors(self):
+        """Async calls nest and exceptions mark the spans as failed."""
+        self.assertEqual(self.run_job(trace_job("verify", call_sensor)), "row")
+        self.assertEqual([s["name"] for s in self.exporter.spans],
+                         ["db.lookup", "sensor.call", "job verify"])
+
+        self.exporter.spans.clear()
+        failing = trace_job("hub", self.executors.offload("hub", lambda: lookup(fail=True)))
+        with self.assertRaises(KeyError):
+            self.run_job(failing)
+        self.assertEqual([s["status"] for s in self.exporter.spans], ["error", "error"])
+        self.assertIn("KeyError", self.exporter.spans[0]["error"])
+
+    def test_disabled_tracing(self):
+        """Without exporter functions run without spans."""
+        set_exporter(None)
+        self.assertEqual(lookup(), "row")
+        with span("anything") as current:
+            self.assertIsNone(current)
+
+    def test_jsonl_exporter(self):
+        """Spans are appended to a JSON Lines file."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "traces", "spans.jsonl")
+            exporter = JsonlSpanExporter(path)
+            set_exporter(exporter)
+            lookup()
+            lookup()
+            exporter.close()
+
+            with open(path) as f:
+                spans = [json.loads(line) for line in f]
+        self.assertEqual([s["name"] for s in spans], ["db.lookup", "db.lookup"])
+
+    def start_collector(self):
+        """Start a local collector and return its URL and the spans it received."""
+        received = []
+
+        class Collector(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.extend(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Collector)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_port}/spans", received
+
+    def test_http_exporter(self):
+        """Spans are posted in batches to the collector."""
+        url, received = self.start_collector()
+
+        exporter = HttpSpanExporter(url, flush_interval=0.05)
+        set_exporter(exporter)
+        for _ in range(3):
+            lookup()
+        exporter.close()
+
+        self.assertEqual(len(received), 3)
+
+    def test_http_exporter_flushes_on_close(self):
+        """Closing sends the pending partial batch without waiting for the flush interval."""
+        url, received = self.start_collector()
+        exporter = HttpSpanExporter(url, flush_interval=60)
+        set_exporter(exporter)
+        lookup()
+        started = time.monotonic()
+
+        exporter.close()
+
+        self.assertEqual([span["name"] for span in received], ["db.lookup"])
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_http_exporter_drops_spans_when_full(self):
+        """A full queue drops spans instead of blocking the job."""
+        exporter = HttpSpanExporter("http://127.0.0.1:9/spans", max_queue_size=1, timeout=0.1)
+        self.addCleanup(exporter._session.close)
+        # Stop the sender, so the queue stays full
+        exporter._queue.put(None)
+        exporter._thread.join()
+
+        exporter.export({"name": "queued"})
+        exporter.export({"name": "dropped"})
+
+        self.assertEqual(exporter.dropped, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
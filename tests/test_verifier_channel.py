@@ -0,0 +1,168 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from grpc import aio
+
+import services.pb.receipt_verifier_pb2 as receipt_verifier_pb2
+import services.pb.receipt_verifier_pb2_grpc as receipt_verifier_pb2_grpc
+from services.verifier_service import ReceiptVerifierService
+from utils.error_handling import ReceiptVerifierServiceError
+
+
+class StubVerifier(receipt_verifier_pb2_grpc.ReceiptVerifierServiceServicer):
+    """Verifier answering with the size of the received receipt."""
+
+    def __init__(self):
+        self.peers = []
+        self.chunks = []
+        self.delay = 0.0
+
+    async def VerifyReceiptStream(self, request_iterator, context):
+        self.peers.append(context.peer())
+        await asyncio.sleep(self.delay)
+        data = b""
+        async for chunk in request_iterator:
+            self.chunks.append(len(chunk.data))
+            data += chunk.data
+        return receipt_verifier_pb2.GrpcVerifyResponse(
+            valid=data.startswith(b"{"), message=f"{len(data)} bytes")
+
+
+class VerifierServerTestCase(unittest.IsolatedAsyncioTestCase):
+    """Base class running a stand-in verifier server per test."""
+
+    async def asyncSetUp(self):
+        """Start a local verifier server and write a receipt file."""
+        self.verifier = StubVerifier()
+        self.server = aio.server()
+        receipt_verifier_pb2_grpc.add_ReceiptVerifierServiceServicer_to_server(
+            self.verifier, self.server)
+        port = self.server.add_insecure_port("127.0.0.1:0")
+        await self.server.start()
+        self.address = f"127.0.0.1:{port}"
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.receipt = os.path.join(tmp_dir.name, "receipt.json")
+        with open(self.receipt, "wb") as f:
+            f.write(b"{" + b"x" * 4999)
+
+    async def asyncTearDown(self):
+        """Stop the local verifier server."""
+        await self.server.stop(None)
+
+    def create_service(self, **kwargs):
+        service = ReceiptVerifierService(self.address, **kwargs)
+        self.addAsyncCleanup(service.close)
+        return service
+
+
+class TestVerifierChannel(VerifierServerTestCase):
+    """Test cases for the shared gRPC channel of ReceiptVerifierService."""
+
+    async def test_calls_share_one_connection(self):
+        """Sequential and concurrent verifications reuse the same channel."""
+        service = self.create_service()
+
+        self.assertEqual(await service.VerifyReceiptStream(file_path=self.receipt), "5000 bytes")
+        channel = service._channel
+        results = await asyncio.gather(
+            *[service.VerifyReceiptStream(file_path=self.receipt) for _ in range(5)])
+
+        self.assertEqual(results, ["5000 bytes"] * 5)
+        self.assertIs(service._channel, channel)
+        self.assertEqual(len(set(self.verifier.peers)), 1)
+
+    async def test_deadline_exceeded_raises(self):
+        """A verification exceeding the deadline fails with a service error."""
+        service = self.create_service(deadline=0.1)
+        self.verifier.delay = 1.0
+
+        with self.assertRaises(ReceiptVerifierServiceError) as raised:
+            await service.VerifyReceiptStream(file_path=self.receipt)
+        self.assertIn("DEADLINE_EXCEEDED", str(raised.exception))
+
+    async def test_gzip_compression(self):
+        """Compressed receipts arrive intact."""
+        service = self.create_service(compression="gzip")
+
+        self.assertEqual(await service.VerifyReceiptStream(file_path=self.receipt), "5000 bytes")
+
+    async def test_close_allows_reopening(self):
+        """A closed service opens a new channel on its next call."""
+        service = self.create_service()
+        await service.VerifyReceiptStream(file_path=self.receipt)
+        await service.close()
+
+        self.assertIsNone(service._channel)
+        self.assertEqual(await service.VerifyReceiptStream(file_path=self.receipt), "5000 bytes")
+
+    def test_keepalive_is_accepted_by_default_servers(self):
+        """Default keepalive pings stay within what servers allow without GOAWAY too_many_pings."""
+        options = dict(ReceiptVerifierService(self.address).options)
+
+        self.assertEqual(options["grpc.keepalive_permit_without_calls"], 0)
+        self.assertGreaterEqual(options["grpc.keepalive_time_ms"], 300000)
+
+    def test_unknown_compression_is_rejected(self):
+        """Unsupported compression settings fail at construction."""
+        with self.assertRaises(ValueError):
+            ReceiptVerifierService(self.address, compression="zstd")
+
+    def test_chunks_must_fit_into_messages(self):
+        """Chunks larger than the max message size fail at construction."""
+        with self.assertRaises(ValueError):
+            ReceiptVerifierService(self.address, chunk_size=1024, max_message_bytes=1024)
+
+
+class TestReceiptStreaming(VerifierServerTestCase):
+    """Test cases for the chunking of streamed receipts."""
+
+    async def test_file_is_streamed_in_configured_chunks(self):
+        """A receipt file is split into chunks of the configured size."""
+        service = self.create_service(chunk_size=2048)
+
+        self.assertEqual(await service.VerifyReceiptStream(file_path=self.receipt), "5000 bytes")
+        self.assertEqual(self.verifier.chunks, [2048, 2048, 904])
+
+    async def test_proof_receipt_payload_is_streamed(self):
+        """A proofReceipt string is streamed without a file."""
+        service = self.create_service(chunk_size=3)
+
+        self.assertEqual(await service.VerifyReceiptStream('{"seal": "ä"}'), "14 bytes")
+        self.assertEqual(self.verifier.chunks, [3, 3, 3, 3, 2])
+
+    async def test_bytes_payload_is_streamed(self):
+        """Bytes payloads are streamed as they are."""
+        service = self.create_service()
+
+        self.assertEqual(await service.VerifyReceiptStream(bytearray(b"{}")), "2 bytes")
+
+    async def test_empty_file(self):
+        """An empty receipt is sent as an empty stream."""
+        empty = os.path.join(os.path.dirname(self.receipt), "empty.json")
+        open(empty, "wb").close()
+        service = self.create_service()
+
+        self.assertEqual(await service.VerifyReceiptStream(file_path=empty), "0 bytes")
+        self.assertEqual(self.verifier.chunks, [])
+
+    async def test_interrupted_stream_releases_the_file(self):
+        """A stream cut off by its deadline still unmaps the receipt file."""
+        service = self.create_service(chunk_size=16, deadline=0.1)
+        self.verifier.delay = 1.0
+
+        with self.assertRaises(ReceiptVerifierServiceError):
+            await service.VerifyReceiptStream(file_path=self.receipt)
+
+    async def test_missing_file_raises(self):
+        """A missing receipt file fails before the call."""
+        service = self.create_service()
+
+        with self.assertRaises(FileNotFoundError):
+            await service.VerifyReceiptStream(file_path=self.receipt + ".missing")
+
+
+if __name__ == '__main__':
+    unittest.main()
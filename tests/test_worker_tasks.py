@@ -0,0 +1,101 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from pyzeebe.errors import MessageAlreadyExistsError
+
+from tasks.worker_tasks import NO_VARIABLES, CamundaWorkerTasks, variables_to_fetch
+from utils.claim_check import ClaimCheck, FileBlobStore, is_reference
+from utils.executors import TaskExecutors
+
+
+class TestVariablesToFetch(unittest.TestCase):
+    """Test cases for deriving the fetched variables from handler signatures."""
+
+    def setUp(self):
+        """Bind the handlers to a bare instance."""
+        self.tasks = CamundaWorkerTasks.__new__(CamundaWorkerTasks)
+
+    def test_handler_parameters_are_fetched(self):
+        """Only the handler's parameters are fetched, never the Job."""
+        self.assertEqual(variables_to_fetch(self.tasks.hub_procedure),
+                         ["hocId", "product_footprint", "tce_chain_digest"])
+        self.assertEqual(variables_to_fetch(self.tasks.transport_procedure),
+                         ["tocId", "product_footprint", "sensor_data", "tce_chain_digest"])
+        self.assertEqual(variables_to_fetch(self.tasks.verify_receipt), ["product_footprint"])
+
+    def test_handlers_without_parameters_fetch_nothing(self):
+        """An empty fetch list would return every variable, so a sentinel is used."""
+        self.assertEqual(variables_to_fetch(self.tasks.determine_job_sequence), [NO_VARIABLES])
+
+    def test_kwargs_handlers_fetch_everything(self):
+        """Handlers taking **kwargs still receive all variables."""
+        self.assertIsNone(variables_to_fetch(lambda **variables: {}))
+
+    def test_wrapped_handlers_keep_their_projection(self):
+        """Offloaded handlers fetch the same variables as the original."""
+        executors = TaskExecutors(config={})
+        self.addCleanup(executors.shutdown)
+        wrapped = executors.offload("hub_procedure", self.tasks.hub_procedure)
+
+        self.assertEqual(variables_to_fetch(wrapped),
+                         variables_to_fetch(self.tasks.hub_procedure))
+
+    def test_registration_passes_projection(self):
+        """_register_task hands the derived list to the worker."""
+        self.tasks.worker = MagicMock()
+        self.tasks.executors = TaskExecutors(config={})
+        self.addCleanup(self.tasks.executors.shutdown)
+        self.tasks.claim_check = MagicMock(wrap=lambda handler: handler)
+
+        self.tasks._register_task("determine_job_sequence", self.tasks.determine_job_sequence)
+
+        kwargs = self.tasks.worker.task.call_args.kwargs
+        self.assertEqual(kwargs["variables_to_fetch"], [NO_VARIABLES])
+
+
+class TestProofResponseMessages(unittest.IsolatedAsyncioTestCase):
+    """Test cases for publishing proof responses in fire-and-forget mode."""
+
+    async def asyncSetUp(self):
+        """Bind the handlers to a bare instance with a mocked Zeebe client."""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tasks = CamundaWorkerTasks.__new__(CamundaWorkerTasks)
+        self.tasks.client = AsyncMock()
+        self.tasks.claim_check = ClaimCheck(FileBlobStore(os.path.join(tmp_dir.name, "blobs")),
+                                            threshold_bytes=50, variables=["product_footprint"])
+        self.tasks._loop = asyncio.get_running_loop()
+        self.response = {"productFootprintId": "pf-1", "proofReceipt": "x" * 100}
+
+    async def deliver(self, reply_id="pcf-results-0-7"):
+        # The reply consumer thread blocks until the message is published
+        await asyncio.to_thread(self.tasks._on_proof_response, self.response, reply_id)
+
+    async def test_response_is_published_claim_checked(self):
+        """The response is published once, as claim-check reference, keyed by the reply."""
+        await self.deliver()
+
+        kwargs = self.tasks.client.publish_message.await_args.kwargs
+        self.assertEqual(kwargs["correlation_key"], "pf-1")
+        self.assertEqual(kwargs["message_id"], "proof-pcf-results-0-7")
+        self.assertTrue(is_reference(kwargs["variables"]["product_footprint"]))
+
+    async def test_redelivered_response_is_accepted(self):
+        """A reply published before a crash counts as handled when delivered again."""
+        self.tasks.client.publish_message.side_effect = MessageAlreadyExistsError()
+
+        await self.deliver()
+
+    async def test_failed_publish_is_raised(self):
+        """A failed publish propagates, so the reply is not committed."""
+        self.tasks.client.publish_message.side_effect = ConnectionError("gateway unavailable")
+
+        with self.assertRaises(ConnectionError):
+            await self.deliver()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Micro-batching of concurrent asyncio calls.
+
+MicroBatcher collects the items submitted by concurrent coroutines for up
+to a short window (or until a batch is full), hands them to one batch
+function and resolves each caller with its own result. It trades at most
+one window of latency for fewer round trips when many jobs arrive at once.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+# Returns one result per item, in order; exceptions among them fail only their caller
+BatchFunction = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """Coalesces concurrent submissions into batches."""
+
+    def __init__(self, send_batch: BatchFunction, max_size: int = 50, window: float = 0.005):
+        """
+        Initialize the MicroBatcher.
+
+        Args:
+            send_batch: Coroutine function processing a list of items
+            max_size: Items after which a batch is sent without waiting for the window
+            window: Seconds the first item of a batch waits for others
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.send_batch = send_batch
+        self.max_size = max_size
+        self.window = window
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Add an item to the next batch and wait for its result.
+
+        Args:
+            item: Item to process
+
+        Returns:
+            The item's result
+
+        Raises:
+            Exception: The item's error, or the error of the whole batch
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        # Keep a reference, the loop only holds weak ones
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Callers may have been cancelled meanwhile
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Send pending items and wait for all batches in flight."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,360 @@
+"""
+Claim-check storage for large process variables.
+
+sensor_data grows by one signed record per transport and travels through
+Zeebe with the whole product_footprint on every job activation. Variables
+whose JSON exceeds a size threshold are written to a content-addressed blob
+store instead, and only a small reference is passed in the process:
+
+    {"$claimCheck": {"key": "<sha256>", "size": 123456, "compression": "gzip"}}
+
+Handlers wrapped with ClaimCheck.wrap get references resolved transparently
+(through an in-process cache, blobs never change) and large return values
+replaced by references. References are also resolved inside lists and
+dictionaries, e.g. the product_footprints collected by a multi-instance
+activity from its instances' product_footprint. The store must be shared by
+every worker that can pick up a process's jobs, e.g. a volume mounted into
+all worker pods. Only variables that BPMN expressions do not read should be
+claim-checked.
+"""
+
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config.settings import (
+    CLAIM_CHECK_CACHE_ENTRIES,
+    CLAIM_CHECK_COMPRESSION,
+    CLAIM_CHECK_PATH,
+    CLAIM_CHECK_STORE,
+    CLAIM_CHECK_THRESHOLD_BYTES,
+    CLAIM_CHECK_VARIABLES,
+)
+from models.database import SQLiteConnectionPool
+from utils.cache import LRUCache
+from utils.codec import get_compressor
+from utils.error_handling import ClaimCheckError
+
+REFERENCE_KEY = "$claimCheck"
+
+
+class BlobStore(ABC):
+    """Content-addressed storage of immutable blobs."""
+
+    @abstractmethod
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Store a blob under its content key; storing an existing key is a no-op.
+
+        Args:
+            key: SHA-256 hex digest identifying the content
+            data: Blob bytes
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """
+        Load a blob.
+
+        Args:
+            key: Content key
+
+        Returns:
+            Blob bytes
+
+        Raises:
+            ClaimCheckError: If no blob is stored under the key
+        """
+
+    def close(self) -> None:
+        """Release resources held by the store."""
+
+
+class FileBlobStore(BlobStore):
+    """Blobs as files below a directory, fanned out by the first key characters."""
+
+    def __init__(self, root: str):
+        """
+        Initialize the FileBlobStore.
+
+        Args:
+            root: Directory holding the blobs, created if missing
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and rename, so readers never see partial blobs
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError as e:
+            raise ClaimCheckError(f"Blob {key} not found in {self.root}") from e
+
+
+class SQLiteBlobStore(BlobStore):
+    """Blobs as rows of a SQLite database, read through a connection pool."""
+
+    def __init__(self, db_path: str, pool_size: int = 4):
+        """
+        Initialize the SQLiteBlobStore.
+
+        Args:
+            db_path: Path to the SQLite database file, created if missing
+            pool_size: Number of pooled connections
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Writable even on replicas whose HOC/TOC database is opened read-only
+        self.pool = SQLiteConnectionPool(db_path, pool_size=pool_size, read_only=False)
+        with self.pool.connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, data BLOB NOT NULL)")
+            conn.commit()
+
+    def put(self, key: str, data: bytes) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO blobs (key, data) VALUES (?, ?)", (key, data))
+            conn.commit()
+
+    def get(self, key: str) -> bytes:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT data FROM blobs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise ClaimCheckError(f"Blob {key} not found")
+        return bytes(row[0])
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+BLOB_STORES: Dict[str, Callable[[str], BlobStore]] = {
+    "file": FileBlobStore,
+    "sqlite": SQLiteBlobStore,
+}
+
+
+def create_blob_store(kind: str = CLAIM_CHECK_STORE, path: str = CLAIM_CHECK_PATH) -> BlobStore:
+    """
+    Create the blob store registered under a name.
+
+    Args:
+        kind: Store name (file, sqlite)
+        path: Directory (file) or database file (sqlite)
+
+    Returns:
+        BlobStore instance
+
+    Raises:
+        ValueError: If the store is unknown
+    """
+    if kind not in BLOB_STORES:
+        raise ValueError(f"Unknown claim-check store: {kind}")
+    return BLOB_STORES[kind](path)
+
+
+def is_reference(value: Any) -> bool:
+    """Tell whether a variable value is a claim-check reference."""
+    return isinstance(value, dict) and len(value) == 1 and REFERENCE_KEY in value
+
+
+def contains_reference(value: Any) -> bool:
+    """Tell whether a variable value is or contains a claim-check reference."""
+    if is_reference(value):
+        return True
+    if isinstance(value, list):
+        return any(contains_reference(item) for item in value)
+    if isinstance(value, dict):
+        return any(contains_reference(item) for item in value.values())
+    return False
+
+
+class ClaimCheck:
+    """Swaps large variables for references to a blob store and back."""
+
+    def __init__(self,
+                 store: Optional[BlobStore] = None,
+                 threshold_bytes: int = CLAIM_CHECK_THRESHOLD_BYTES,
+                 variables: Iterable[str] = CLAIM_CHECK_VARIABLES,
+                 compression: str = CLAIM_CHECK_COMPRESSION,
+                 cache_entries: int = CLAIM_CHECK_CACHE_ENTRIES):
+        """
+        Initialize the ClaimCheck.
+
+        Args:
+            store: Blob store, created from CLAIM_CHECK_STORE/CLAIM_CHECK_PATH on first use if omitted
+            threshold_bytes: Minimum JSON size of a variable to be claim-checked, 0 disables storing
+            variables: Names of the variables that may be claim-checked
+            compression: Compression of stored blobs (none, gzip, zstd, lz4)
+            cache_entries: Number of resolved blobs cached in process
+        """
+        self.threshold_bytes = threshold_bytes
+        self.variables = frozenset(variables)
+        self.compressor = get_compressor(compression)
+        self._store = store
+        # Blobs are immutable, so cached entries never go stale
+        self.cache = LRUCache(cache_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_bytes > 0
+
+    @property
+    def store(self) -> BlobStore:
+        """The blob store, opened on first use so references resolve even with storing disabled."""
+        if self._store is None:
+            self._store = create_blob_store()
+        return self._store
+
+    def check_in(self, name: str, value: Any) -> Any:
+        """
+        Store a variable value if it is claim-checked and large enough.
+
+        Args:
+            name: Variable name
+            value: JSON-compatible variable value
+
+        Returns:
+            A reference to the stored value, or the value itself
+        """
+        if not self.enabled or name not in self.variables or value is None or is_reference(value):
+            return value
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if len(data) < self.threshold_bytes:
+            return value
+
+        key = hashlib.sha256(data).hexdigest()
+        self.store.put(key, self.compressor.compress(data))
+        self.cache.put(key, data)
+        return {REFERENCE_KEY: {"key": key, "size": len(data), "compression": self.compressor.name}}
+
+    def check_out(self, value: Any) -> Any:
+        """
+        Resolve the references in a variable value to the stored values.
+
+        Args:
+            value: Variable value, possibly a reference or containing references
+
+        Returns:
+            The value with every reference, also inside lists and dictionaries,
+            replaced by the stored value
+
+        Raises:
+            ClaimCheckError: If a blob is missing or does not match its key
+        """
+        if is_reference(value):
+            return self._load(value[REFERENCE_KEY])
+        # Containers are only copied on the path to a reference, everything else is returned as-is
+        if isinstance(value, list):
+            resolved = None
+            for index, item in enumerate(value):
+                checked_out = self.check_out(item)
+                if checked_out is not item:
+                    if resolved is None:
+                        resolved = list(value)
+                    resolved[index] = checked_out
+            return value if resolved is None else resolved
+        if isinstance(value, dict):
+            resolved = None
+            for key, item in value.items():
+                checked_out = self.check_out(item)
+                if checked_out is not item:
+                    if resolved is None:
+                        resolved = dict(value)
+                    resolved[key] = checked_out
+            return value if resolved is None else resolved
+        return value
+
+    def _load(self, reference: Dict[str, Any]) -> Any:
+        key = reference["key"]
+        data = self.cache.get(key)
+        if data is None:
+            data = get_compressor(reference.get("compression")).decompress(self.store.get(key))
+            if hashlib.sha256(data).hexdigest() != key:
+                raise ClaimCheckError(f"Blob {key} is corrupt")
+            self.cache.put(key, data)
+        # Decode on every checkout, handlers mutate the values they receive
+        return json.loads(data)
+
+    def check_out_variables(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve all references among a handler's keyword arguments."""
+        return {name: self.check_out(value) for name, value in variables.items()}
+
+    def check_in_variables(self, variables: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Replace large claim-checked values among a handler's results with references."""
+        if not self._checks_in(variables):
+            return variables
+        return {name: self.check_in(name, value) for name, value in variables.items()}
+
+    def _checks_in(self, variables: Optional[Dict[str, Any]]) -> bool:
+        """Tell whether any result may be stored, without serializing it."""
+        return self.enabled and bool(variables) and any(
+            name in self.variables and value is not None for name, value in variables.items())
+
+    def wrap(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap a task handler to resolve references in its arguments and store large results.
+
+        The wrapper keeps the handler's signature, so pyzeebe still derives the
+        variables to fetch from it. With storing disabled and no store given,
+        nothing can be checked out either and the handler is returned as-is.
+        Async handlers only hand blob I/O to a thread when a reference was
+        found or a result may be stored.
+
+        Args:
+            function: Sync or async task handler returning a variables dictionary
+
+        Returns:
+            Wrapped handler of the same kind
+        """
+        if not self.enabled and self._store is None:
+            return function
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def run_async(*args, **kwargs):
+                if contains_reference(kwargs):
+                    kwargs = await asyncio.to_thread(self.check_out_variables, kwargs)
+                result = await function(*args, **kwargs)
+                if self._checks_in(result):
+                    result = await asyncio.to_thread(self.check_in_variables, result)
+                return result
+
+            return run_async
+
+        @functools.wraps(function)
+        def run(*args, **kwargs):
+            return self.check_in_variables(function(*args, **self.check_out_variables(kwargs)))
+
+        return run
+
+    def close(self) -> None:
+        if self._store is not None:
+            self._store.close()
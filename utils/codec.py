@@ -0,0 +1,297 @@
+"""
+Wire codecs for Kafka payloads.
+
+A wire format is a serialization codec (json, msgpack, protobuf) combined with
+an optional compression (gzip, zstd, lz4). Producers announce both through
+message headers so consumers can decode any combination; messages without
+headers are treated as uncompressed JSON.
+"""
+
+import gzip
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+CONTENT_TYPE_HEADER = "content-type"
+CONTENT_ENCODING_HEADER = "content-encoding"
+
+
+class Codec(ABC):
+    """Serialization of JSON-compatible payloads to bytes."""
+
+    name = ""
+    content_type = ""
+
+    @abstractmethod
+    def encode(self, payload: Any) -> bytes:
+        """Serialize a payload or pydantic model."""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """Deserialize bytes produced by encode."""
+
+
+class JsonCodec(Codec):
+    """UTF-8 JSON, the format understood by every consumer."""
+
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, payload: Any) -> bytes:
+        if isinstance(payload, BaseModel):
+            return payload.model_dump_json().encode('utf-8')
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack, a compact binary encoding of the JSON data model."""
+
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError(
+                "The msgpack codec requires the 'msgpack' package") from e
+        self._msgpack = msgpack
+
+    def encode(self, payload: Any) -> bytes:
+        if isinstance(payload, BaseModel):
+            payload = payload.model_dump(mode="json")
+        return self._msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class ProtobufCodec(Codec):
+    """
+    Protocol Buffers using the well-known google.protobuf.Struct message.
+
+    Struct is schema-less, so any proofing document can be carried without a
+    dedicated .proto; numbers are transported as doubles.
+    """
+
+    name = "protobuf"
+    content_type = "application/x-protobuf; messageType=google.protobuf.Struct"
+
+    def __init__(self):
+        from google.protobuf import json_format, struct_pb2
+        self._json_format = json_format
+        self._struct_pb2 = struct_pb2
+
+    def encode(self, payload: Any) -> bytes:
+        if isinstance(payload, BaseModel):
+            payload = payload.model_dump(mode="json")
+        message = self._struct_pb2.Struct()
+        message.update(payload)
+        return message.SerializeToString()
+
+    def decode(self, data: bytes) -> Any:
+        message = self._struct_pb2.Struct()
+        message.ParseFromString(data)
+        return self._json_format.MessageToDict(message)
+
+
+class Compressor:
+    """Byte-level compression applied after encoding."""
+
+    name = "none"
+
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class GzipCompressor(Compressor):
+    name = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    name = "zstd"
+
+    def __init__(self, level: int = 3):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "The zstd compression requires the 'zstandard' package") from e
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    name = "lz4"
+
+    def __init__(self):
+        try:
+            import lz4.frame
+        except ImportError as e:
+            raise ImportError(
+                "The lz4 compression requires the 'lz4' package") from e
+        self._lz4 = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._lz4.decompress(data)
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+    ProtobufCodec.name: ProtobufCodec,
+}
+
+COMPRESSORS: Dict[str, Callable[[], Compressor]] = {
+    Compressor.name: Compressor,
+    GzipCompressor.name: GzipCompressor,
+    ZstdCompressor.name: ZstdCompressor,
+    Lz4Compressor.name: Lz4Compressor,
+}
+
+_codec_instances: Dict[str, Codec] = {}
+_compressor_instances: Dict[str, Compressor] = {}
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Return the codec registered under the given name or content type.
+
+    Args:
+        name: Codec name (json, msgpack, protobuf) or its content type
+
+    Returns:
+        Codec instance
+
+    Raises:
+        ValueError: If the codec is unknown
+        ImportError: If the codec's optional dependency is not installed
+    """
+    for codec_name, factory in CODECS.items():
+        if name == codec_name or name == getattr(factory, "content_type", None):
+            if codec_name not in _codec_instances:
+                _codec_instances[codec_name] = factory()
+            return _codec_instances[codec_name]
+    raise ValueError(f"Unknown wire codec: {name}")
+
+
+def get_compressor(name: Optional[str]) -> Compressor:
+    """
+    Return the compressor registered under the given name.
+
+    Args:
+        name: Compression name (none, gzip, zstd, lz4); None means none
+
+    Returns:
+        Compressor instance
+
+    Raises:
+        ValueError: If the compression is unknown
+        ImportError: If the compression's optional dependency is not installed
+    """
+    name = name or Compressor.name
+    if name not in COMPRESSORS:
+        raise ValueError(f"Unknown wire compression: {name}")
+    if name not in _compressor_instances:
+        _compressor_instances[name] = COMPRESSORS[name]()
+    return _compressor_instances[name]
+
+
+class WireFormat:
+    """A codec combined with a compression, announced through message headers."""
+
+    def __init__(self, codec: str = JsonCodec.name, compression: str = Compressor.name):
+        """
+        Initialize the WireFormat.
+
+        Args:
+            codec: Serialization codec name
+            compression: Compression name
+        """
+        self.codec = get_codec(codec)
+        self.compressor = get_compressor(compression)
+
+    @property
+    def headers(self) -> List[Tuple[str, bytes]]:
+        """Message headers announcing this wire format."""
+        headers = [(CONTENT_TYPE_HEADER, self.codec.content_type.encode('utf-8'))]
+        if self.compressor.name != Compressor.name:
+            headers.append(
+                (CONTENT_ENCODING_HEADER, self.compressor.name.encode('utf-8')))
+        return headers
+
+    def encode(self, payload: Any) -> bytes:
+        """
+        Serialize and compress a payload.
+
+        Args:
+            payload: Pydantic model or JSON-compatible data
+
+        Returns:
+            Bytes to send as message value
+        """
+        return self.compressor.compress(self.codec.encode(payload))
+
+    def decode(self, data: bytes) -> Any:
+        """
+        Decompress and deserialize a payload encoded with this wire format.
+
+        Args:
+            data: Message value
+
+        Returns:
+            Decoded JSON-compatible data
+        """
+        return self.codec.decode(self.compressor.decompress(data))
+
+
+def decode_payload(data: bytes, headers: Optional[List[Tuple[str, bytes]]] = None) -> Any:
+    """
+    Decode a message value according to its content-type/content-encoding headers.
+
+    Args:
+        data: Message value
+        headers: Message headers; missing headers mean uncompressed JSON
+
+    Returns:
+        Decoded JSON-compatible data
+    """
+    content_type = JsonCodec.content_type
+    content_encoding = Compressor.name
+    for name, value in headers or []:
+        if value is None:
+            continue
+        if name == CONTENT_TYPE_HEADER:
+            content_type = value.decode('utf-8')
+        elif name == CONTENT_ENCODING_HEADER:
+            content_encoding = value.decode('utf-8')
+
+    codec = get_codec(content_type)
+    compressor = get_compressor(content_encoding)
+    return codec.decode(compressor.decompress(data))
@@ -6,15 +6,25 @@ logger = logging.getLogger("camunda_service")
 async def on_error(exception: Exception, job: Job, job_controller: JobController):
     """
     Error handler for Zeebe worker tasks.
-    
+
+    Jobs failing because a dependency is unavailable are failed with a retry
+    backoff, so Zeebe redelivers them once the dependency may have recovered.
+    Each rejection uses up one of the job's retries, so a dependency that stays
+    down ends in an incident; all other errors are thrown as BPMN errors.
+
     Args:
         exception: The exception that was raised
         job: The job that failed
         job_controller: Controller to manage the job status
     """
+    if isinstance(exception, DependencyUnavailableError):
+        logger.warning(f"Failing job {job.key} for retry: {exception}")
+        await job_controller.set_failure_status(
+            str(exception), retry_back_off_ms=int(exception.retry_after * 1000))
+        return
     error_message = f"Failed to handle job {job}. Error: {str(exception)}"
     logger.error(error_message, exc_info=True)
-    await job_controller.set_error_status(job, error_message)
+    await job_controller.set_error_status(error_message)
 
 class ServiceError(Exception):
     """Base exception class for service errors."""
@@ -35,4 +45,34 @@ class ProofingServiceError(ServiceError):
 class CertificateServiceError(ServiceError):
     """Exception for errors in the certificate service."""
     def __init__(self, message: str):
-        super().__init__(message, "CertifciationService")
\ No newline at end of file
+        super().__init__(message, "CertifciationService")
+
+class TceChainError(ServiceError):
+    """Exception for product footprints whose TCE chain does not match its digest."""
+    def __init__(self, message: str):
+        super().__init__(message, "LogisticsOperationService")
+
+
+class ClaimCheckError(ServiceError):
+    """Exception for missing or corrupt claim-checked variables."""
+    def __init__(self, message: str):
+        super().__init__(message, "ClaimCheck")
+
+
+class SensorSignatureError(ServiceError):
+    """Exception for sensor data records whose signature does not verify."""
+    def __init__(self, message: str):
+        super().__init__(message, "SignatureVerifier")
+
+
+class ReceiptVerifierServiceError(ServiceError):
+    """Exception for failed calls of the receipt verifier service."""
+    def __init__(self, message: str):
+        super().__init__(message, "ReceiptVerifierService")
+
+
+class DependencyUnavailableError(ServiceError):
+    """Exception for calls rejected because a dependency is degraded or saturated."""
+    def __init__(self, dependency: str, reason: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Unavailable ({reason}), retry in {retry_after:.1f}s", dependency)
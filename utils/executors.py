@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import (
+    TASK_EXECUTOR_CONFIG,
+    TASK_DEFAULT_MAX_RUNNING_JOBS,
+    TASK_DEFAULT_THREADS,
+)
+
+
+def parse_executor_config(raw: str) -> Dict[str, Dict[str, int]]:
+    """
+    Parse the per-task-type executor configuration.
+
+    Args:
+        raw: JSON object mapping task types to {"threads": n, "max_jobs": m}
+
+    Returns:
+        Dictionary mapping task types to their options
+    """
+    if not raw:
+        return {}
+    config = json.loads(raw)
+    if not isinstance(config, dict):
+        raise ValueError("TASK_EXECUTOR_CONFIG must be a JSON object")
+    return config
+
+
+class TaskExecutors:
+    """
+    Dedicated thread pools for blocking task handlers, one per task type.
+
+    pyzeebe runs sync handlers in the event loop's shared default executor, so
+    a handler blocking for minutes (e.g. waiting for a proof) can take every
+    thread and stall all other task types. Giving each task type its own pool
+    and job limit isolates them, while the asyncio loop only awaits.
+    """
+
+    def __init__(self,
+                 config: Optional[Dict[str, Dict[str, int]]] = None,
+                 default_threads: Optional[int] = TASK_DEFAULT_THREADS,
+                 default_max_jobs: int = TASK_DEFAULT_MAX_RUNNING_JOBS):
+        """
+        Initialize the TaskExecutors.
+
+        Args:
+            config: Per-task-type options {"threads": n, "max_jobs": m}, defaults to TASK_EXECUTOR_CONFIG
+            default_threads: Thread pool size for unconfigured task types, None for one thread per job
+            default_max_jobs: Maximum concurrently running jobs for unconfigured task types
+        """
+        self.config = parse_executor_config(
+            TASK_EXECUTOR_CONFIG) if config is None else config
+        self.default_threads = default_threads
+        self.default_max_jobs = default_max_jobs
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def options(self, task_type: str) -> Dict[str, int]:
+        """
+        Return the executor options for a task type.
+
+        Args:
+            task_type: Zeebe task type
+
+        Returns:
+            Dictionary with the thread pool size ("threads") and job limit ("max_jobs")
+        """
+        options = self.config.get(task_type, {})
+        max_jobs = int(options.get("max_jobs", self.default_max_jobs))
+        threads = options.get("threads", self.default_threads)
+        return {"threads": int(threads) if threads else max_jobs, "max_jobs": max_jobs}
+
+    def executor(self, task_type: str) -> ThreadPoolExecutor:
+        """
+        Return the thread pool of a task type, creating it on first use.
+
+        Args:
+            task_type: Zeebe task type
+
+        Returns:
+            ThreadPoolExecutor dedicated to the task type
+        """
+        with self._lock:
+            executor = self._executors.get(task_type)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.options(task_type)["threads"],
+                    thread_name_prefix=f"task-{task_type}")
+                self._executors[task_type] = executor
+            return executor
+
+    def offload(self, task_type: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap a blocking handler into a coroutine function running on the task type's pool.
+
+        The wrapper keeps the handler's signature, so pyzeebe still derives the
+        variables to fetch and the job parameter from it. Context variables are
+        copied into the worker thread.
+
+        Args:
+            task_type: Zeebe task type
+            function: Blocking task handler
+
+        Returns:
+            Coroutine function with the same signature
+        """
+        @functools.wraps(function)
+        async def run_in_executor(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                self.executor(task_type),
+                functools.partial(context.run, function, *args, **kwargs))
+
+        return run_in_executor
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Shut down all thread pools, cancelling queued handlers.
+
+        Args:
+            wait: Whether to wait for running handlers to finish
+        """
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
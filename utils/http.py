@@ -0,0 +1,214 @@
+"""
+Pooled keep-alive HTTP sessions for downstream services.
+
+Sessions reuse TCP/TLS connections per host, retry failures that are safe
+to retry with jittered exponential backoff, and count the connections they
+open, so connection reuse is visible in the metrics
+(camunda_http_connections_created_total vs. camunda_http_requests_total).
+
+create_session returns a blocking requests.Session for handlers on executor
+threads; create_async_client and request_with_retries do the same on httpx
+for coroutine handlers, so waits overlap on the event loop.
+"""
+
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from utils.metrics import HTTP_CONNECTIONS
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.labels(f"{self.host}:{self.port}").inc()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        HTTP_CONNECTIONS.labels(f"{self.host}:{self.port}").inc()
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count newly opened connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_size: int = 10,
+                   retries: int = 3,
+                   backoff_factor: float = 0.2,
+                   backoff_jitter: float = 0.2,
+                   retry_statuses: Iterable[int] = (429, 503),
+                   retry_methods: Iterable[str] = Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+                   retry_read_errors: bool = False) -> requests.Session:
+    """
+    Create a session with a bounded keep-alive pool and retries.
+
+    Connection errors are always retried, since the request never reached the
+    server. Responses with one of retry_statuses (by default the ones telling
+    the request was not processed) are retried for retry_methods. Read
+    errors are only retried if retry_read_errors is set, because the server
+    may already have processed a non-idempotent request.
+
+    Args:
+        pool_size: Connections kept alive per host; should match the number of concurrent callers
+        retries: Maximum retries per request
+        backoff_factor: Base of the exponential backoff in seconds
+        backoff_jitter: Maximum random seconds added to each backoff
+        retry_statuses: Response status codes to retry
+        retry_methods: HTTP methods retried on retry_statuses (and read errors)
+        retry_read_errors: Whether to retry requests whose response could not be read
+
+    Returns:
+        Configured requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries if retry_read_errors else 0,
+        status=retries,
+        other=0,
+        allowed_methods=frozenset(retry_methods),
+        status_forcelist=frozenset(retry_statuses),
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_statuses(value: str) -> Tuple[int, ...]:
+    """Parse a comma-separated list of HTTP status codes."""
+    return tuple(int(status) for status in value.split(",") if status.strip())
+
+
+# Errors raised before the request was sent, retrying them is always safe
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Errors raised after the request was sent, the server may have processed it
+_READ_ERRORS = (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError)
+
+
+def create_async_client(pool_size: int = 10,
+                        connect_timeout: float = 3.05,
+                        read_timeout: float = 30.0) -> httpx.AsyncClient:
+    """
+    Create an async client with a bounded keep-alive pool.
+
+    Requests beyond pool_size wait for a free connection for up to
+    read_timeout seconds instead of opening more.
+
+    Args:
+        pool_size: Connections kept alive per client; should match the number of concurrent jobs
+        connect_timeout: Seconds to establish a connection
+        read_timeout: Seconds to wait for a response or a pooled connection
+
+    Returns:
+        Configured httpx.AsyncClient, to be closed with aclose()
+    """
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=read_timeout))
+
+
+def backoff_delay(attempt: int, backoff_factor: float, backoff_jitter: float,
+                  response: Optional[httpx.Response] = None) -> float:
+    """
+    Seconds to wait before a retry, honoring a Retry-After header of the response.
+
+    Args:
+        attempt: Number of the retry, starting at 1
+        backoff_factor: Base of the exponential backoff in seconds
+        backoff_jitter: Maximum random seconds added to the backoff
+        response: Response that is retried, if any
+
+    Returns:
+        Delay in seconds
+    """
+    if response is not None and "Retry-After" in response.headers:
+        retry_after = response.headers["Retry-After"]
+        if retry_after.isdigit():
+            return float(retry_after)
+        parsed = email.utils.parsedate_tz(retry_after)
+        if parsed is not None:
+            return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+    delay = backoff_factor * (2 ** (attempt - 1)) if attempt > 1 else 0.0
+    return delay + random.uniform(0, backoff_jitter)
+
+
+async def _count_connections(event_name: str, info: Any) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        stream = info["return_value"]
+        host, port = stream.get_extra_info("server_addr")[:2]
+        HTTP_CONNECTIONS.labels(f"{host}:{port}").inc()
+
+
+async def request_with_retries(client: httpx.AsyncClient,
+                               method: str,
+                               url: str,
+                               retries: int = 3,
+                               backoff_factor: float = 0.2,
+                               backoff_jitter: float = 0.2,
+                               retry_statuses: Iterable[int] = (429, 503),
+                               retry_read_errors: bool = False,
+                               **kwargs: Any) -> httpx.Response:
+    """
+    Send a request with the retry policy of create_session.
+
+    Connection errors are always retried, responses with one of
+    retry_statuses are retried, read errors only if retry_read_errors is set.
+    The response of the last attempt is returned without raising for its
+    status.
+
+    Args:
+        client: Client from create_async_client
+        method: HTTP method
+        url: Request URL
+        retries: Maximum retries per request
+        backoff_factor: Base of the exponential backoff in seconds
+        backoff_jitter: Maximum random seconds added to each backoff
+        retry_statuses: Response status codes to retry
+        retry_read_errors: Whether to retry requests whose response could not be read
+        **kwargs: Further arguments of httpx.AsyncClient.request
+
+    Returns:
+        The last response
+
+    Raises:
+        httpx.HTTPError: If the last attempt failed without a response
+    """
+    retry_statuses = frozenset(retry_statuses)
+    retryable = _CONNECT_ERRORS + _READ_ERRORS if retry_read_errors else _CONNECT_ERRORS
+    kwargs.setdefault("extensions", {}).setdefault("trace", _count_connections)
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except retryable:
+            if attempt >= retries:
+                raise
+            response = None
+        else:
+            if response.status_code not in retry_statuses or attempt >= retries:
+                return response
+        attempt += 1
+        await asyncio.sleep(backoff_delay(attempt, backoff_factor, backoff_jitter, response))
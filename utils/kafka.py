@@ -1,66 +1,618 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+import os
+import socket
+import threading
+
 from confluent_kafka import Producer
-from confluent_kafka import Consumer, KafkaException, KafkaError
-from config.settings import KAFKA_BOOTSTRAP_SERVERS
+from confluent_kafka import Consumer, KafkaException, KafkaError, TopicPartition
+from config.settings import (
+    KAFKA_BOOTSTRAP_SERVERS,
+    KAFKA_LINGER_MS,
+    KAFKA_BATCH_SIZE,
+    KAFKA_COMPRESSION_TYPE,
+    KAFKA_PARTITIONER,
+    KAFKA_DELIVERY_TIMEOUT,
+    KAFKA_PROOF_RESPONSE_GROUP,
+    KAFKA_REPLY_GROUP_PREFIX,
+)
+
+from utils.codec import decode_payload
+
+logger = logging.getLogger("camunda_service")
+
+
+class KafkaProducerManager:
+    """
+    Long-lived Kafka producer shared by all tasks of a worker process.
+
+    The underlying confluent_kafka Producer is created once and kept open, so
+    messages are batched by librdkafka (linger.ms / batch.size / compression)
+    instead of paying a broker bootstrap and a blocking flush per message.
+    A background thread polls the producer to serve delivery callbacks.
+    """
+
+    def __init__(self,
+                 bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+                 linger_ms: int = KAFKA_LINGER_MS,
+                 batch_size: int = KAFKA_BATCH_SIZE,
+                 compression_type: str = KAFKA_COMPRESSION_TYPE,
+                 partitioner: str = KAFKA_PARTITIONER,
+                 extra_config: Optional[Dict[str, Union[str, int]]] = None):
+        """
+        Initialize the KafkaProducerManager.
+
+        Args:
+            bootstrap_servers: Kafka bootstrap servers
+            linger_ms: Time librdkafka waits to fill a batch before sending it
+            batch_size: Maximum size of a message batch in bytes
+            compression_type: Compression codec for batches (none, gzip, snappy, lz4, zstd)
+            partitioner: librdkafka partitioner mapping message keys to partitions
+            extra_config: Optional additional librdkafka producer settings
+        """
+        self.config = {
+            'bootstrap.servers': bootstrap_servers,
+            'linger.ms': linger_ms,
+            'batch.size': batch_size,
+            'compression.type': compression_type,
+            'partitioner': partitioner,
+        }
+        if extra_config:
+            self.config.update(extra_config)
+
+        self._producer: Optional[Producer] = None
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._poll_thread: Optional[threading.Thread] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the underlying producer is currently open."""
+        return self._producer is not None
+
+    def start(self) -> None:
+        """Create the producer and start the delivery callback poll thread."""
+        with self._lock:
+            if self._producer is not None:
+                return
+            self._producer = Producer(self.config)
+            self._running.set()
+            self._poll_thread = threading.Thread(
+                target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+            self._poll_thread.start()
+        logger.info(
+            f"Kafka producer started for {self.config['bootstrap.servers']}")
+
+    def _poll_loop(self) -> None:
+        """Serve delivery callbacks until the manager is closed."""
+        while self._running.is_set():
+            producer = self._producer
+            if producer is None:
+                break
+            producer.poll(0.1)
+
+    def produce(self,
+                topic: str,
+                value: Union[str, bytes],
+                key: Optional[Union[str, bytes]] = None,
+                headers: Optional[List[Tuple[str, bytes]]] = None) -> Future:
+        """
+        Enqueue a message without waiting for the broker.
+
+        Args:
+            topic: Kafka topic to produce to
+            value: Message payload, strings are encoded as UTF-8
+            key: Optional message key
+            headers: Optional list of (name, value) message headers
+
+        Returns:
+            Future resolved with the delivered message, or failed with a KafkaException
+        """
+        if self._producer is None:
+            self.start()
+
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+
+        future: Future = Future()
+
+        def _on_delivery(err, msg):
+            if err is not None:
+                future.set_exception(KafkaException(err))
+            else:
+                future.set_result(msg)
+
+        try:
+            self._producer.produce(topic, value=value, key=key,
+                                   headers=headers, on_delivery=_on_delivery)
+        except BufferError:
+            # Local queue is full: let librdkafka drain it, then retry once
+            self._producer.poll(1.0)
+            self._producer.produce(topic, value=value, key=key,
+                                   headers=headers, on_delivery=_on_delivery)
+
+        return future
+
+    def flush(self, timeout: float = KAFKA_DELIVERY_TIMEOUT) -> int:
+        """
+        Wait until all queued messages are delivered.
+
+        Args:
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            Number of messages still queued after the timeout
+        """
+        if self._producer is None:
+            return 0
+        return self._producer.flush(timeout)
+
+    def close(self, timeout: float = KAFKA_DELIVERY_TIMEOUT) -> None:
+        """
+        Flush outstanding messages and shut the producer down.
+
+        Args:
+            timeout: Maximum time to wait for outstanding deliveries in seconds
+        """
+        with self._lock:
+            if self._producer is None:
+                return
+            self._running.clear()
+            if self._poll_thread is not None:
+                self._poll_thread.join()
+                self._poll_thread = None
+            remaining = self._producer.flush(timeout)
+            self._producer = None
+        if remaining:
+            logger.warning(
+                f"Kafka producer closed with {remaining} undelivered messages")
+        else:
+            logger.info("Kafka producer closed")
+
+
+_producer_managers: Dict[str, KafkaProducerManager] = {}
+_producer_managers_lock = threading.Lock()
+
+
+def get_producer_manager(bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS) -> KafkaProducerManager:
+    """
+    Return the process-wide producer manager for the given bootstrap servers.
+
+    Args:
+        bootstrap_servers: Kafka bootstrap servers
+
+    Returns:
+        Shared KafkaProducerManager instance
+    """
+    with _producer_managers_lock:
+        manager = _producer_managers.get(bootstrap_servers)
+        if manager is None:
+            manager = KafkaProducerManager(bootstrap_servers=bootstrap_servers)
+            _producer_managers[bootstrap_servers] = manager
+        return manager
+
+
+def close_producer_managers() -> None:
+    """Close all process-wide producer managers, flushing pending messages."""
+    with _producer_managers_lock:
+        managers = list(_producer_managers.values())
+        _producer_managers.clear()
+    for manager in managers:
+        manager.close()
+
+
+CORRELATION_ID_HEADER = "correlation_id"
+
+
+def correlation_id_from_message(msg, payload: Any = None, field: str = "productFootprintId") -> Optional[str]:
+    """
+    Extract the correlation id of a reply message.
+
+    The correlation_id header is preferred; replies without it are matched
+    on the given field of their payload.
+
+    Args:
+        msg: confluent_kafka Message
+        payload: Decoded message value, decoded from msg if not given
+        field: Payload field used when no header is present
+
+    Returns:
+        The correlation id, or None if the message carries none
+    """
+    for name, value in msg.headers() or []:
+        if name == CORRELATION_ID_HEADER and value is not None:
+            return value.decode('utf-8')
+    if payload is None:
+        try:
+            payload = decode_payload(msg.value(), msg.headers())
+        except Exception:
+            return None
+    if isinstance(payload, dict) and payload.get(field) is not None:
+        return str(payload[field])
+    return None
+
+
+class KafkaReplyDispatcher:
+    """
+    Background consumer that routes replies to the callers waiting for them.
+
+    One dispatcher per worker process subscribes to the reply topic with its
+    own consumer group, so the group never rebalances when jobs start or end.
+    Replies are decoded once according to their content-type/content-encoding
+    headers. Callers register a correlation id before sending their request
+    and wait on the returned future; replies nobody waits for go to the unmatched
+    handler if one is set, and are dropped otherwise.
+    """
+
+    def __init__(self,
+                 topic: str,
+                 bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+                 group_id: Optional[str] = None,
+                 correlation_extractor: Callable[..., Optional[str]] = correlation_id_from_message,
+                 assignment_timeout: float = 30.0):
+        """
+        Initialize the KafkaReplyDispatcher.
+
+        Args:
+            topic: Kafka topic the replies arrive on
+            bootstrap_servers: Kafka bootstrap servers
+            group_id: Consumer group, defaults to one group per host and process
+            correlation_extractor: Function returning the correlation id of a message and its decoded payload
+            assignment_timeout: Seconds start() waits for the partition assignment
+        """
+        self.topic = topic
+        self.group_id = group_id or f"{KAFKA_REPLY_GROUP_PREFIX}-{socket.gethostname()}-{os.getpid()}"
+        self.config = {
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': self.group_id,
+            # Only replies to requests sent after start() are of interest
+            'auto.offset.reset': 'latest',
+            'enable.auto.commit': True,
+            'auto.commit.interval.ms': 5000,
+        }
+        self.correlation_extractor = correlation_extractor
+        self.assignment_timeout = assignment_timeout
+
+        self._pending: Dict[str, List[Future]] = {}
+        self._unmatched_handler: Optional[Callable[[Any], None]] = None
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._assigned = threading.Event()
+        self._consumer: Optional[Consumer] = None
+        self._thread: Optional[threading.Thread] = None
 
-import sys
+    @property
+    def started(self) -> bool:
+        """Whether the background consumer is running."""
+        return self._consumer is not None
 
+    def start(self) -> None:
+        """Subscribe to the reply topic and start the consumer thread."""
+        with self._lock:
+            if self._consumer is not None:
+                return
+            self._consumer = Consumer(self.config)
+            self._consumer.subscribe(
+                [self.topic], on_assign=lambda consumer, partitions: self._assigned.set())
+            self._running.set()
+            self._thread = threading.Thread(
+                target=self._consume_loop, name=f"kafka-replies-{self.topic}", daemon=True)
+            self._thread.start()
 
-def delivery_report(err, msg):
-    """ Called once for each message produced to indicate delivery result.
-        Triggered by poll() or flush(). """
-    if err is not None:
-        print(f"Message delivery failed: {err}")
-    else:
-        print(f"Message delivered to {msg.topic()} [{msg.partition()}]")
+        if not self._assigned.wait(self.assignment_timeout):
+            logger.warning(
+                f"No partitions of {self.topic} assigned after {self.assignment_timeout}s")
+        logger.info(
+            f"Reply dispatcher consuming {self.topic} as group {self.group_id}")
 
+    def register(self, correlation_id: str) -> Future:
+        """
+        Register interest in the reply with the given correlation id.
 
-def send_message_to_kafka(topic_name, message, bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS):
-    conf = {'bootstrap.servers': bootstrap_servers}
-    producer = Producer(conf)
+        Must be called before the request is sent so the reply cannot be missed.
 
-    try:
-        producer.produce(topic_name, key="my_key", value=message.encode(
-            'utf-8'), callback=delivery_report)
-        producer.flush()  # Wait for all messages in the producer queue to be delivered
-    except Exception as e:
-        print(f"Error producing message: {e}")
+        Args:
+            correlation_id: Correlation id of the expected reply
 
+        Returns:
+            Future resolved with the decoded reply payload
+        """
+        if self._consumer is None:
+            self.start()
 
-def consume_messages_from_kafka(topic_name, bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, group_id='my_python_consumer_group') -> str:
-    conf = {
-        'bootstrap.servers': bootstrap_servers,
-        'group.id': group_id,
-        'auto.offset.reset': 'earliest',
-        'enable.auto.commit': True,
-        'auto.commit.interval.ms': 5000
-    }
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending.setdefault(correlation_id, []).append(future)
+        return future
 
-    consumer = Consumer(conf)
+    def cancel(self, correlation_id: str, future: Future) -> None:
+        """
+        Stop waiting for a reply, e.g. after a timeout.
 
-    try:
-        consumer.subscribe([topic_name])
-        while True:
-            # Poll for messages, with a 1-second timeout
-            msg = consumer.poll(timeout=1.0)
+        Args:
+            correlation_id: Correlation id the future was registered for
+            future: Future returned by register()
+        """
+        with self._pending_lock:
+            waiters = self._pending.get(correlation_id, [])
+            if future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                self._pending.pop(correlation_id, None)
+        future.cancel()
+
+    def wait(self, correlation_id: str, future: Future, timeout: float) -> Any:
+        """
+        Block until the reply arrives or the timeout expires.
+
+        Args:
+            correlation_id: Correlation id the future was registered for
+            future: Future returned by register()
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            Decoded reply payload
+
+        Raises:
+            concurrent.futures.TimeoutError: If no reply arrived in time
+        """
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            self.cancel(correlation_id, future)
+            raise
+
+    def set_unmatched_handler(self, handler: Optional[Callable[[Any], None]]) -> None:
+        """
+        Set the handler for replies no caller is waiting for.
+
+        The handler runs on the consumer thread and receives the decoded reply payload.
+
+        Args:
+            handler: Callable taking the reply payload, or None to drop such replies
+        """
+        self._unmatched_handler = handler
+
+    def pending_count(self) -> int:
+        """Number of replies currently awaited."""
+        with self._pending_lock:
+            return sum(len(waiters) for waiters in self._pending.values())
+
+    def _consume_loop(self) -> None:
+        """Poll the reply topic and dispatch messages until closed."""
+        while self._running.is_set():
+            try:
+                msg = self._consumer.poll(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Error polling {self.topic}: {e}", exc_info=True)
+                continue
             if msg is None:
                 continue
             if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
-                    # End of partition event - not an error
-                    sys.stderr.write(
-                        f'%% {msg.topic()} [{msg.partition()}] reached end offset {msg.offset()}\n')
-                elif msg.error():
-                    raise KafkaException(msg.error())
-            else:
-                # Message successfully received
-                print(
-                    f"Received message from Kafka: Topic={msg.topic()}, Partition={msg.partition()}, Offset={msg.offset()}")
-                print(
-                    f"Key: {msg.key().decode('utf-8') if msg.key() else 'N/A'}")
-                consumer.commit(asynchronous=False)
-                return msg.value().decode('utf-8')
-
-    except KeyboardInterrupt:
-        sys.stderr.write('%% Aborted by user\n')
-    finally:
-        consumer.close()
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error(f"Kafka error on {self.topic}: {msg.error()}")
+                continue
+            self._dispatch(msg)
+
+    def _dispatch(self, msg) -> None:
+        """Resolve the futures waiting for the given message."""
+        try:
+            payload = decode_payload(msg.value(), msg.headers())
+        except Exception as e:
+            logger.error(
+                f"Dropping undecodable reply on {msg.topic()} [{msg.partition()}] @ {msg.offset()}: {e}")
+            return
+
+        correlation_id = self.correlation_extractor(msg, payload)
+        with self._pending_lock:
+            waiters = self._pending.pop(correlation_id, []) if correlation_id else []
+
+        if not waiters:
+            handler = self._unmatched_handler
+            if handler is None:
+                logger.debug(
+                    f"Dropping reply on {msg.topic()} [{msg.partition()}] @ {msg.offset()} "
+                    f"with unknown correlation id {correlation_id}")
+                return
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(
+                    f"Error handling reply with correlation id {correlation_id}: {e}", exc_info=True)
+            return
+
+        for future in waiters:
+            if not future.done():
+                future.set_result(payload)
+
+    def close(self) -> None:
+        """Stop the consumer thread and fail all outstanding waiters."""
+        with self._lock:
+            if self._consumer is None:
+                return
+            self._running.clear()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+            self._consumer.close()
+            self._consumer = None
+            self._assigned.clear()
+
+        with self._pending_lock:
+            waiters = [f for futures in self._pending.values() for f in futures]
+            self._pending.clear()
+        for future in waiters:
+            if not future.done():
+                future.set_exception(KafkaException(
+                    KafkaError(KafkaError._DESTROY, "Reply dispatcher closed")))
+        logger.info(f"Reply dispatcher for {self.topic} closed")
+
+
+_reply_dispatchers: Dict[Tuple[str, str], KafkaReplyDispatcher] = {}
+_reply_dispatchers_lock = threading.Lock()
+
+
+def get_reply_dispatcher(topic: str, bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS) -> KafkaReplyDispatcher:
+    """
+    Return the process-wide reply dispatcher for the given topic.
+
+    Args:
+        topic: Kafka topic the replies arrive on
+        bootstrap_servers: Kafka bootstrap servers
+
+    Returns:
+        Shared KafkaReplyDispatcher instance
+    """
+    with _reply_dispatchers_lock:
+        dispatcher = _reply_dispatchers.get((bootstrap_servers, topic))
+        if dispatcher is None:
+            dispatcher = KafkaReplyDispatcher(
+                topic, bootstrap_servers=bootstrap_servers)
+            _reply_dispatchers[(bootstrap_servers, topic)] = dispatcher
+        return dispatcher
+
+
+def close_reply_dispatchers() -> None:
+    """Close all process-wide reply dispatchers."""
+    with _reply_dispatchers_lock:
+        dispatchers = list(_reply_dispatchers.values())
+        _reply_dispatchers.clear()
+    for dispatcher in dispatchers:
+        dispatcher.close()
+
+
+class KafkaReplyListener:
+    """
+    Background consumer handing every reply on a topic to one handler.
+
+    Unlike KafkaReplyDispatcher, all worker processes join one consumer group,
+    so each reply is handled by exactly one of them. Offsets are committed
+    only after the handler returned: replies arriving while no worker runs
+    are consumed once one is back, and a reply whose handler failed is
+    delivered again after a backoff. Handlers must therefore tolerate
+    repeated replies, e.g. by deduplicating on reply_id().
+    """
+
+    def __init__(self,
+                 topic: str,
+                 bootstrap_servers: str = KAFKA_BOOTSTRAP_SERVERS,
+                 group_id: str = KAFKA_PROOF_RESPONSE_GROUP,
+                 retry_backoff: float = 1.0):
+        """
+        Initialize the KafkaReplyListener.
+
+        Args:
+            topic: Kafka topic the replies arrive on
+            bootstrap_servers: Kafka bootstrap servers
+            group_id: Consumer group shared by all worker processes
+            retry_backoff: Seconds to wait before retrying a reply whose handler failed
+        """
+        self.topic = topic
+        self.group_id = group_id
+        self.config = {
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': group_id,
+            # A new group must not skip replies sent before it first started
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False,
+        }
+        self.retry_backoff = retry_backoff
+
+        self._handler: Optional[Callable[[Any, Any], None]] = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._consumer: Optional[Consumer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the background consumer is running."""
+        return self._consumer is not None
+
+    def start(self, handler: Callable[[Any, Any], None]) -> None:
+        """
+        Subscribe to the reply topic and hand replies to a handler.
+
+        The handler runs on the consumer thread and receives the decoded reply
+        payload and the confluent_kafka Message. The reply counts as handled
+        once the handler returns; if it raises, the reply is retried.
+
+        Args:
+            handler: Callable taking the reply payload and message
+        """
+        with self._lock:
+            self._handler = handler
+            if self._consumer is not None:
+                return
+            self._consumer = Consumer(self.config)
+            self._consumer.subscribe([self.topic])
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._consume_loop, name=f"kafka-listener-{self.topic}", daemon=True)
+            self._thread.start()
+        logger.info(f"Reply listener consuming {self.topic} as group {self.group_id}")
+
+    def _consume_loop(self) -> None:
+        """Poll the reply topic and handle messages until closed."""
+        while not self._stopping.is_set():
+            try:
+                msg = self._consumer.poll(timeout=1.0)
+            except Exception as e:
+                logger.error(f"Error polling {self.topic}: {e}", exc_info=True)
+                continue
+            if msg is None:
+                continue
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error(f"Kafka error on {self.topic}: {msg.error()}")
+                continue
+            if not self._process(msg):
+                self._stopping.wait(self.retry_backoff)
+
+    def _process(self, msg) -> bool:
+        """
+        Handle one reply and commit it, or rewind to it if the handler failed.
+
+        Returns:
+            Whether the reply was handled
+        """
+        try:
+            payload = decode_payload(msg.value(), msg.headers())
+        except Exception as e:
+            logger.error(
+                f"Skipping undecodable reply on {msg.topic()} [{msg.partition()}] @ {msg.offset()}: {e}")
+        else:
+            try:
+                self._handler(payload, msg)
+            except Exception as e:
+                logger.error(
+                    f"Error handling reply {reply_id(msg)}, retrying in {self.retry_backoff}s: {e}",
+                    exc_info=True)
+                self._consumer.seek(TopicPartition(msg.topic(), msg.partition(), msg.offset()))
+                return False
+        try:
+            self._consumer.commit(message=msg, asynchronous=False)
+        except KafkaException as e:
+            # Redelivered after a rebalance, which handlers tolerate
+            logger.warning(f"Failed to commit reply {reply_id(msg)}: {e}")
+        return True
+
+    def close(self) -> None:
+        """Stop the consumer thread and leave the consumer group."""
+        with self._lock:
+            if self._consumer is None:
+                return
+            self._stopping.set()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+            self._consumer.close()
+            self._consumer = None
+        logger.info(f"Reply listener for {self.topic} closed")
+
+
+def reply_id(msg) -> str:
+    """Identify a Kafka message by topic, partition and offset, stable across redeliveries."""
+    return f"{msg.topic()}-{msg.partition()}-{msg.offset()}"
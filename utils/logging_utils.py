@@ -12,6 +12,9 @@ def setup_logging():
     )
     logger = logging.getLogger("camunda_service")
     logger.setLevel(getattr(logging, LOG_LEVEL))
+    # Forked worker processes inherit the supervisor's handlers
+    if logger.handlers:
+        return logger
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -0,0 +1,200 @@
+"""
+Prometheus metrics of the Zeebe task handlers.
+
+Every handler registered by CamundaWorkerTasks is wrapped with instrument(),
+which counts jobs and errors and records latency, in-flight jobs and the
+size of the incoming variables per task type. Blocking handlers measure
+their variables on their executor thread with measure_variables(), async
+ones only for a sample of jobs, as serializing them blocks the event loop.
+Downstream HTTP clients count their requests and newly opened connections,
+utils.resilience the state of each dependency's circuit breaker, and the
+proving service the proofing documents awaiting a response per partition.
+main.py serves them on METRICS_PORT.
+
+With several worker processes (see utils.supervisor) the metrics are
+aggregated through prometheus_client's multiprocess mode, which requires
+PROMETHEUS_MULTIPROC_DIR to point to an empty, writable directory before
+the service starts; the supervisor then serves the sum of all workers.
+"""
+
+import functools
+import glob
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+from pyzeebe import Job
+
+from config.settings import METRICS_PORT, METRICS_VARIABLE_SAMPLE_RATE
+
+logger = logging.getLogger("camunda_service")
+
+# Proving round trips can take up to PROOF_RESPONSE_TIMEOUT (15 minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 900.0)
+PAYLOAD_BUCKETS = tuple(256 * 4 ** exponent for exponent in range(10))  # 256 B .. 64 MiB
+
+TASK_JOBS = Counter(
+    "camunda_task_jobs_total", "Jobs handled per task type", ["task_type"])
+TASK_ERRORS = Counter(
+    "camunda_task_errors_total", "Jobs failed per task type and exception", ["task_type", "error"])
+TASK_LATENCY = Histogram(
+    "camunda_task_duration_seconds", "Handler latency per task type, including executor queueing",
+    ["task_type"], buckets=LATENCY_BUCKETS)
+TASK_IN_FLIGHT = Gauge(
+    "camunda_task_in_flight", "Jobs currently being handled per task type",
+    ["task_type"], multiprocess_mode="livesum")
+TASK_VARIABLE_BYTES = Histogram(
+    "camunda_task_variable_bytes", "JSON size of the variables a job was activated with",
+    ["task_type", "variable"], buckets=PAYLOAD_BUCKETS)
+
+HTTP_CONNECTIONS = Counter(
+    "camunda_http_connections_created_total", "HTTP connections opened per downstream host",
+    ["host"])
+HTTP_REQUESTS = Counter(
+    "camunda_http_requests_total", "HTTP requests per downstream service and status",
+    ["service", "status"])
+
+DEPENDENCY_STATE = Gauge(
+    "camunda_dependency_circuit_state", "Circuit breaker state per dependency (0 closed, 1 half-open, 2 open)",
+    ["dependency"], multiprocess_mode="liveall")
+DEPENDENCY_REJECTED = Counter(
+    "camunda_dependency_rejected_total", "Calls rejected by an open circuit or a full concurrency limit",
+    ["dependency", "reason"])
+DEPENDENCY_HEDGED = Counter(
+    "camunda_dependency_hedged_total", "Hedged second calls started per dependency", ["dependency"])
+
+PROOFS_IN_FLIGHT = Gauge(
+    "camunda_proofs_in_flight", "Proofing documents awaiting a proof response per topic partition",
+    ["topic", "partition"], multiprocess_mode="livesum")
+
+
+def multiprocess_enabled() -> bool:
+    """Tell whether metrics are collected in prometheus_client's multiprocess mode."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def observe_variables(task_type: str, variables: Dict[str, Any]) -> None:
+    """
+    Record the JSON size of a job's variables.
+
+    Args:
+        task_type: Zeebe task type
+        variables: Keyword arguments the handler is called with
+    """
+    for name, value in variables.items():
+        if isinstance(value, Job):
+            continue
+        size = len(json.dumps(value, separators=(',', ':'), default=str))
+        TASK_VARIABLE_BYTES.labels(task_type, name).observe(size)
+
+
+def measure_variables(task_type: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap a blocking task handler to record the JSON size of its variables on its own thread.
+
+    Args:
+        task_type: Zeebe task type
+        function: Blocking task handler
+
+    Returns:
+        Function with the same signature
+    """
+    @functools.wraps(function)
+    def run(*args, **kwargs):
+        observe_variables(task_type, kwargs)
+        return function(*args, **kwargs)
+
+    return run
+
+
+def instrument(task_type: str, function: Callable[..., Any],
+               variable_sample_rate: float = METRICS_VARIABLE_SAMPLE_RATE) -> Callable[..., Any]:
+    """
+    Wrap an async task handler to record its metrics.
+
+    The wrapper keeps the handler's signature, so pyzeebe still derives the
+    variables to fetch from it.
+
+    Args:
+        task_type: Zeebe task type
+        function: Async task handler
+        variable_sample_rate: Share of jobs whose variable sizes are measured on
+            the event loop, 0 if the handler measures them, see measure_variables
+
+    Returns:
+        Instrumented coroutine function
+    """
+    jobs = TASK_JOBS.labels(task_type)
+    latency = TASK_LATENCY.labels(task_type)
+    in_flight = TASK_IN_FLIGHT.labels(task_type)
+
+    @functools.wraps(function)
+    async def run(*args, **kwargs):
+        if variable_sample_rate >= 1 or random.random() < variable_sample_rate:
+            observe_variables(task_type, kwargs)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        except Exception as e:
+            TASK_ERRORS.labels(task_type, type(e).__name__).inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+            in_flight.dec()
+            jobs.inc()
+
+    return run
+
+
+def start_metrics_server(port: int = METRICS_PORT) -> bool:
+    """
+    Serve the metrics over HTTP.
+
+    In multiprocess mode the server exposes the aggregate of all worker
+    processes and should be started by the supervisor only.
+
+    Args:
+        port: Port to listen on, 0 disables the server
+
+    Returns:
+        True if the server was started
+    """
+    if not port:
+        return False
+    registry = REGISTRY
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+    logger.info(f"Serving metrics on port {port}")
+    return True
+
+
+def clear_multiprocess_dir() -> None:
+    """Remove metric files of previous runs from PROMETHEUS_MULTIPROC_DIR."""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauges of an exited worker process from the aggregate."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
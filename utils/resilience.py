@@ -0,0 +1,395 @@
+"""
+Resilience layer for downstream dependencies.
+
+Each Dependency combines, for one downstream service shared by all callers
+of a worker process:
+
+- a latency-aware circuit breaker: calls that fail or take longer than
+  slow_call_seconds count against the service, and once their share of the
+  recent calls reaches failure_rate the circuit opens and calls fail fast.
+  After open_seconds a few probe calls are let through (half-open); if they
+  succeed the circuit closes, otherwise it opens again.
+- a concurrency limit, so a degraded service cannot tie up every job slot;
+  callers wait at most limit_timeout for a free slot.
+- optional hedging (async calls only): if a call has not completed after
+  the recent p95 latency, a second identical call is started and whichever
+  finishes first wins. Only for idempotent calls.
+
+Calls rejected by an open circuit or a full limit raise
+DependencyUnavailableError, which the Zeebe error handler turns into a job
+failure retried after the circuit's remaining open time instead of an
+incident.
+"""
+
+import asyncio
+import collections
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.error_handling import DependencyUnavailableError
+from utils.metrics import DEPENDENCY_HEDGED, DEPENDENCY_REJECTED, DEPENDENCY_STATE
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Values of the camunda_dependency_circuit_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class LatencyTracker:
+    """Rolling window of call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: "collections.deque[float]" = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float, min_samples: int = 20) -> Optional[float]:
+        """
+        Return a latency percentile of the window.
+
+        Args:
+            fraction: Percentile as fraction, e.g. 0.95
+            min_samples: Samples required for a meaningful value
+
+        Returns:
+            Latency in seconds, None with fewer than min_samples samples
+        """
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker counting failed and slow calls."""
+
+    def __init__(self,
+                 name: str,
+                 failure_rate: float = 0.5,
+                 slow_call_seconds: float = 5.0,
+                 window: int = 20,
+                 min_calls: int = 10,
+                 open_seconds: float = 30.0,
+                 half_open_calls: int = 2,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the CircuitBreaker.
+
+        Args:
+            name: Dependency name used in errors
+            failure_rate: Share of failed or slow calls among the recent ones that opens the circuit
+            slow_call_seconds: Duration after which a successful call counts as failed
+            window: Number of recent calls considered
+            min_calls: Calls in the window required before the circuit can open
+            open_seconds: Seconds the circuit stays open before probing
+            half_open_calls: Probe calls let through while half-open, all must succeed to close
+            clock: Monotonic time source, replaceable in tests
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._outcomes: "collections.deque[bool]" = collections.deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self._set_state(CLOSED)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._set_state(HALF_OPEN)
+            self._probes = 0
+            self._probe_successes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets calls through again."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def acquire(self) -> None:
+        """
+        Ask for permission to call the dependency.
+
+        Raises:
+            DependencyUnavailableError: If the circuit is open or all probes are taken
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            if state == OPEN:
+                retry_after = max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+            else:
+                # All probes taken; they succeed or count as failed within slow_call_seconds
+                retry_after = self.slow_call_seconds
+        raise DependencyUnavailableError(self.name, f"circuit {state}", retry_after)
+
+    def release(self) -> None:
+        """Return the permission of a call that ended without an outcome, e.g. cancelled."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > self._probe_successes:
+                self._probes -= 1
+
+    def record(self, success: bool, seconds: float) -> None:
+        """
+        Record the outcome of a permitted call.
+
+        Args:
+            success: Whether the call succeeded
+            seconds: Duration of the call
+        """
+        healthy = success and seconds < self.slow_call_seconds
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if not healthy:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._set_state(CLOSED)
+                    self._outcomes.clear()
+                return
+            if state == OPEN:
+                # Calls permitted before the circuit opened
+                return
+            self._outcomes.append(healthy)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and \
+                    failures >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self) -> None:
+        self._set_state(OPEN)
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        DEPENDENCY_STATE.labels(self.name).set(STATE_VALUES[state])
+
+
+class Dependency:
+    """Circuit breaker, concurrency limit and hedging for one downstream service."""
+
+    def __init__(self,
+                 name: str,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_concurrency: int = 32,
+                 limit_timeout: float = 10.0,
+                 hedge: bool = False,
+                 hedge_percentile: float = 0.95,
+                 min_hedge_delay: float = 0.05):
+        """
+        Initialize the Dependency.
+
+        Args:
+            name: Dependency name used in errors and metrics
+            breaker: Circuit breaker, defaults to one with default thresholds
+            max_concurrency: Concurrent calls per worker process, 0 for no limit
+            limit_timeout: Seconds a call waits for a free slot
+            hedge: Whether async calls are hedged
+            hedge_percentile: Latency percentile after which a hedged call starts
+            min_hedge_delay: Lower bound of the hedge delay in seconds
+        """
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name)
+        self.max_concurrency = max_concurrency
+        self.limit_timeout = limit_timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.latency = LatencyTracker()
+        # Slots are shared by sync callers on executor threads and async callers
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    def _permit(self) -> None:
+        try:
+            self.breaker.acquire()
+        except DependencyUnavailableError:
+            DEPENDENCY_REJECTED.labels(self.name, "circuit").inc()
+            raise
+
+    def _take_slot(self, timeout: float) -> None:
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            self._reject_full(timeout)
+
+    def _finish(self, started: float, success: bool) -> None:
+        elapsed = time.monotonic() - started
+        self.breaker.record(success, elapsed)
+        if success:
+            self.latency.record(elapsed)
+
+    def call(self, function: Callable[[], Any],
+             is_failure: Callable[[Any], bool] = lambda result: False) -> Any:
+        """
+        Run a blocking call of the dependency.
+
+        Args:
+            function: Callable performing the call
+            is_failure: Tells whether a returned result counts as failure, e.g. a 5xx response
+
+        Returns:
+            The function's result
+
+        Raises:
+            DependencyUnavailableError: If the circuit is open or no slot frees up in time
+        """
+        # Check the circuit first, so an open one fails fast instead of after waiting for a slot
+        self._permit()
+        try:
+            self._take_slot(self.limit_timeout)
+        except BaseException:
+            self.breaker.release()
+            raise
+        try:
+            started = time.monotonic()
+            try:
+                result = function()
+            except Exception:
+                self._finish(started, False)
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+        finally:
+            self._release_slot()
+        self._finish(started, not is_failure(result))
+        return result
+
+    async def call_async(self, function: Callable[[], Awaitable[Any]],
+                         is_failure: Callable[[Any], bool] = lambda result: False,
+                         hedge: Optional[bool] = None) -> Any:
+        """
+        Await a call of the dependency, hedging it if enabled.
+
+        Args:
+            function: Coroutine function performing the call, invoked once per attempt
+            is_failure: Tells whether a returned result counts as failure, e.g. a 5xx response
+            hedge: Override of the dependency's hedging, e.g. False for non-idempotent calls
+
+        Returns:
+            The result of the first attempt to finish
+
+        Raises:
+            DependencyUnavailableError: If the circuit is open or no slot frees up in time
+        """
+        self._permit()
+        try:
+            await self._acquire_slot(self.limit_timeout)
+        except BaseException:
+            self.breaker.release()
+            raise
+        try:
+            started = time.monotonic()
+            try:
+                delay = self._hedge_delay() if (self.hedge if hedge is None else hedge) else None
+                if delay is None:
+                    result = await function()
+                else:
+                    result = await self._hedged(function, delay)
+            except Exception:
+                self._finish(started, False)
+                raise
+            except BaseException:
+                # Cancelled, which says nothing about the dependency
+                self.breaker.release()
+                raise
+        finally:
+            self._release_slot()
+        self._finish(started, not is_failure(result))
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        delay = self.latency.percentile(self.hedge_percentile)
+        if delay is None:
+            return None
+        return max(delay, self.min_hedge_delay)
+
+    async def _hedged(self, function: Callable[[], Awaitable[Any]], delay: float) -> Any:
+        attempts = [asyncio.ensure_future(function())]
+        hedge_slot = False
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            # Only hedge if a slot is free right away, never queue behind a degraded service
+            if not done and (self._slots is None or self._slots.acquire(blocking=False)):
+                hedge_slot = self._slots is not None
+                DEPENDENCY_HEDGED.labels(self.name).inc()
+                attempts.append(asyncio.ensure_future(function()))
+            pending = set(attempts)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    # A failed attempt only counts if no other one is still running
+                    if attempt.exception() is None or not pending:
+                        return attempt.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+            if hedge_slot:
+                self._slots.release()
+
+    async def _acquire_slot(self, timeout: float) -> None:
+        if self._slots is None:
+            return
+        # The semaphore is shared with blocking callers, so poll instead of blocking the loop
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                self._reject_full(timeout)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _release_slot(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    def _reject_full(self, retry_after: float) -> None:
+        DEPENDENCY_REJECTED.labels(self.name, "limit").inc()
+        raise DependencyUnavailableError(
+            self.name, f"{self.max_concurrency} calls in flight", retry_after)
+
+
+_dependencies: Dict[str, Dependency] = {}
+_dependencies_lock = threading.Lock()
+
+
+def get_dependency(name: str, factory: Callable[[], Dependency]) -> Dependency:
+    """
+    Return the process-wide Dependency of a name, creating it on first use.
+
+    Args:
+        name: Dependency name
+        factory: Creates the Dependency if none exists yet
+
+    Returns:
+        The shared Dependency
+    """
+    with _dependencies_lock:
+        if name not in _dependencies:
+            _dependencies[name] = factory()
+        return _dependencies[name]
@@ -0,0 +1,247 @@
+"""
+Batch verification of signed sensor data.
+
+Sensors sign their measurements with RSA-PSS (MGF1/SHA-256, maximum salt
+length) and SHA-256, as utils.data_utils.sign_data does. The signed message
+is the sensorData string exactly as the sensor service sent it, which the
+client keeps in rawSensorData; the parsed sensorData must match it. Records
+whose sensorData arrived as JSON object have no such string and are checked
+against its canonical JSON instead: keys sorted, no whitespace, null fields
+left out. sensorkey holds the sensor's public key as PEM (or hex-encoded
+DER) and signedSensorData the hex signature.
+
+All records of a shipment are verified as one batch before a proof is
+requested. Parsed public keys are cached per sensorkey, and large batches
+are grouped by key and spread over a process pool, since verification is
+CPU-bound and holds the GIL.
+"""
+
+import functools
+import json
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+
+from config.settings import (
+    SENSOR_KEY_CACHE_ENTRIES,
+    SENSOR_SIGNATURE_CHECK,
+    SENSOR_SIGNATURE_PARALLEL_THRESHOLD,
+    SENSOR_SIGNATURE_PROCESSES,
+)
+from models.sensor_data import SensorData, TceSensorData
+from utils.error_handling import SensorSignatureError
+from utils.supervisor import cpu_share
+
+logger = logging.getLogger("camunda_service")
+
+SIGNATURE_CHECK_MODES = ("reject", "warn", "off")
+
+PSS_PADDING = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+# (sensorkey, hex signature, signed message)
+SignedItem = Tuple[str, str, bytes]
+
+
+def _without_none(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_none(v) for v in value]
+    return value
+
+
+def signed_message(sensor_data: Dict[str, Any]) -> bytes:
+    """
+    Return the canonical bytes of a measurement received without its signed string.
+
+    Args:
+        sensor_data: The record's sensorData as dictionary
+
+    Returns:
+        Canonical JSON of the measurement, UTF-8 encoded
+    """
+    return json.dumps(_without_none(sensor_data), sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+@functools.lru_cache(maxsize=SENSOR_KEY_CACHE_ENTRIES)
+def load_public_key(sensorkey: str) -> rsa.RSAPublicKey:
+    """
+    Parse a sensor's public key, cached per sensorkey.
+
+    Args:
+        sensorkey: PEM or hex-encoded DER SubjectPublicKeyInfo
+
+    Returns:
+        RSA public key
+
+    Raises:
+        ValueError: If the key cannot be parsed or is no RSA key
+    """
+    if sensorkey.lstrip().startswith("-----BEGIN"):
+        key = serialization.load_pem_public_key(sensorkey.encode('utf-8'))
+    else:
+        key = serialization.load_der_public_key(bytes.fromhex(sensorkey))
+    if not isinstance(key, rsa.RSAPublicKey):
+        raise ValueError("sensor key is no RSA public key")
+    return key
+
+
+def signed_item(record: TceSensorData) -> Tuple[Optional[SignedItem], Optional[str]]:
+    """
+    Return the signature check of a record.
+
+    Args:
+        record: Sensor data record
+
+    Returns:
+        The item to verify, or None and the reason if the record's sensorData
+        does not match the data it was signed with
+    """
+    if record.rawSensorData is None:
+        message = signed_message(record.sensorData.model_dump())
+        return (record.sensorkey, record.signedSensorData, message), None
+    try:
+        signed = SensorData.model_validate_json(record.rawSensorData)
+    except ValueError:
+        return None, "unreadable signed sensor data"
+    if signed != record.sensorData:
+        return None, "sensor data differs from signed data"
+    message = record.rawSensorData.encode('utf-8')
+    return (record.sensorkey, record.signedSensorData, message), None
+
+
+def verify_item(item: SignedItem) -> Optional[str]:
+    """
+    Verify one signature.
+
+    Args:
+        item: Sensor key, hex signature and signed message
+
+    Returns:
+        None if the signature is valid, the reason otherwise
+    """
+    sensorkey, signature, message = item
+    try:
+        key = load_public_key(sensorkey)
+    except ValueError as e:
+        return f"invalid sensor key: {e}"
+    try:
+        key.verify(bytes.fromhex(signature), message, PSS_PADDING, hashes.SHA256())
+    except ValueError:
+        return "malformed signature"
+    except InvalidSignature:
+        return "invalid signature"
+    return None
+
+
+def verify_items(items: Sequence[SignedItem]) -> List[Optional[str]]:
+    """Verify signatures in the current process, see verify_item."""
+    return [verify_item(item) for item in items]
+
+
+class SignatureVerifier:
+    """Verifies the signatures of sensor data records in batches."""
+
+    def __init__(self,
+                 mode: str = SENSOR_SIGNATURE_CHECK,
+                 processes: int = SENSOR_SIGNATURE_PROCESSES,
+                 parallel_threshold: int = SENSOR_SIGNATURE_PARALLEL_THRESHOLD):
+        """
+        Initialize the SignatureVerifier.
+
+        Args:
+            mode: What check() does with bad records: "reject", "warn" or "off"
+            processes: Size of the process pool for large batches, 0 for this worker's share of the CPUs
+            parallel_threshold: Minimum batch size verified on the process pool
+        """
+        if mode not in SIGNATURE_CHECK_MODES:
+            raise ValueError(f"Unknown SENSOR_SIGNATURE_CHECK: {mode}")
+        self.mode = mode
+        self.processes = processes or cpu_share()
+        self.parallel_threshold = parallel_threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """The process pool, started on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                # Worker processes run threads and an event loop, which must not be forked
+                self._pool = ProcessPoolExecutor(
+                    self.processes, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def verify(self, records: Sequence[TceSensorData]) -> List[Optional[str]]:
+        """
+        Verify the signatures of a batch of records.
+
+        Args:
+            records: Sensor data records
+
+        Returns:
+            For each record, None if its signature is valid, the reason otherwise
+        """
+        results: List[Optional[str]] = [None] * len(records)
+        items: List[SignedItem] = []
+        positions: List[int] = []
+        for position, record in enumerate(records):
+            item, results[position] = signed_item(record)
+            if item is not None:
+                items.append(item)
+                positions.append(position)
+        for position, result in zip(positions, self._verify_items(items)):
+            results[position] = result
+        return results
+
+    def _verify_items(self, items: List[SignedItem]) -> List[Optional[str]]:
+        if not items or len(items) < self.parallel_threshold or self.processes < 2:
+            return verify_items(items)
+
+        # Group by key, so each process parses as few keys as possible
+        order = sorted(range(len(items)), key=lambda i: items[i][0])
+        chunk_size = math.ceil(len(order) / (self.processes * 4))
+        chunks = [order[start:start + chunk_size] for start in range(0, len(order), chunk_size)]
+        results: List[Optional[str]] = [None] * len(items)
+        for chunk, chunk_results in zip(chunks, self.pool.map(
+                verify_items, [[items[i] for i in chunk] for chunk in chunks])):
+            for i, result in zip(chunk, chunk_results):
+                results[i] = result
+        return results
+
+    def check(self, records: Sequence[TceSensorData]) -> None:
+        """
+        Verify a batch of records and handle bad ones according to the mode.
+
+        Args:
+            records: Sensor data records
+
+        Raises:
+            SensorSignatureError: In reject mode, if any signature does not verify
+        """
+        if self.mode == "off" or not records:
+            return
+        failures = [f"{record.tceId} ({reason})"
+                    for record, reason in zip(records, self.verify(records)) if reason]
+        if not failures:
+            return
+        message = f"{len(failures)} of {len(records)} sensor data records failed verification: " \
+                  f"{', '.join(failures)}"
+        if self.mode == "reject":
+            raise SensorSignatureError(message)
+        logger.warning(message)
+
+    def close(self) -> None:
+        """Shut down the process pool."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
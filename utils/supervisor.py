@@ -0,0 +1,230 @@
+"""
+Supervisor running several worker processes.
+
+Handlers spend most of their CPU time in pydantic validation, so a single
+process is bound to one core by the GIL. The supervisor forks N worker
+processes, each with its own Zeebe channel, Kafka clients and database pool,
+restarts processes that die or stop sending heartbeats, and forwards
+SIGTERM/SIGINT for a coordinated shutdown.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable, List, Optional
+
+from config.settings import (
+    WORKER_HEARTBEAT_INTERVAL,
+    WORKER_HEARTBEAT_TIMEOUT,
+    WORKER_RESTART_BACKOFF,
+    WORKER_SHUTDOWN_GRACE,
+    WORKER_START_METHOD,
+)
+
+logger = logging.getLogger("camunda_service")
+
+# Tells worker processes how many siblings share the host's CPUs
+WORKER_COUNT_ENV = "CAMUNDA_WORKER_COUNT"
+
+
+class WorkerProcess:
+    """A supervised worker process and its heartbeat."""
+
+    def __init__(self, index: int, context, target: Callable[[int, "multiprocessing.Value"], None]):
+        """
+        Initialize the WorkerProcess.
+
+        Args:
+            index: Worker slot number
+            context: Multiprocessing context used to create the process
+            target: Function run in the process with (index, heartbeat)
+        """
+        self.index = index
+        self.context = context
+        self.target = target
+        self.heartbeat = context.Value('d', 0.0, lock=False)
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+
+    def start(self) -> None:
+        """Start (or restart) the process."""
+        self.heartbeat.value = time.time()
+        self.started_at = time.monotonic()
+        self.process = self.context.Process(
+            target=self.target, args=(self.index, self.heartbeat),
+            name=f"camunda-worker-{self.index}", daemon=False)
+        self.process.start()
+        logger.info(f"Started worker {self.index} (pid {self.process.pid})")
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def heartbeat_age(self) -> float:
+        """Seconds since the process last reported a heartbeat."""
+        return time.time() - self.heartbeat.value
+
+
+class WorkerSupervisor:
+    """Forks worker processes and keeps them healthy."""
+
+    def __init__(self,
+                 target: Callable[[int, "multiprocessing.Value"], None],
+                 processes: int,
+                 heartbeat_timeout: float = WORKER_HEARTBEAT_TIMEOUT,
+                 restart_backoff: float = WORKER_RESTART_BACKOFF,
+                 shutdown_grace: float = WORKER_SHUTDOWN_GRACE,
+                 start_method: str = WORKER_START_METHOD,
+                 check_interval: float = 1.0,
+                 on_exit: Optional[Callable[[int], None]] = None):
+        """
+        Initialize the WorkerSupervisor.
+
+        Args:
+            target: Worker entry point, called with (index, heartbeat) in each process
+            processes: Number of worker processes
+            heartbeat_timeout: Seconds without heartbeat after which a worker is restarted
+            restart_backoff: Minimum seconds between two starts of the same worker slot
+            shutdown_grace: Seconds workers get to finish after SIGTERM before being killed
+            start_method: Multiprocessing start method (fork, forkserver, spawn)
+            check_interval: Seconds between health checks
+            on_exit: Optional callback receiving the pid of every exited worker
+        """
+        if processes < 1:
+            raise ValueError("At least one worker process is required")
+        self.context = multiprocessing.get_context(start_method)
+        self.workers: List[WorkerProcess] = [
+            WorkerProcess(index, self.context, target) for index in range(processes)]
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restart_backoff = restart_backoff
+        self.shutdown_grace = shutdown_grace
+        self.check_interval = check_interval
+        self.on_exit = on_exit
+        self._stopping = False
+
+    def run(self) -> int:
+        """
+        Start all workers and supervise them until SIGTERM/SIGINT.
+
+        Returns:
+            Process exit code
+        """
+        previous_handlers = {
+            signum: signal.signal(signum, self._request_stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)}
+        os.environ[WORKER_COUNT_ENV] = str(len(self.workers))
+        try:
+            for worker in self.workers:
+                worker.start()
+            while not self._stopping:
+                self.check_workers()
+                time.sleep(self.check_interval)
+        finally:
+            self.shutdown()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        return 0
+
+    def _request_stop(self, signum, frame) -> None:
+        logger.info(f"Supervisor received signal {signum}, stopping workers")
+        self._stopping = True
+
+    def stop(self) -> None:
+        """Ask the supervision loop to stop."""
+        self._stopping = True
+
+    def check_workers(self) -> None:
+        """Restart workers that exited or whose heartbeat is stale."""
+        for worker in self.workers:
+            if self._stopping:
+                return
+            if not worker.is_alive():
+                exitcode = worker.process.exitcode if worker.process else None
+                logger.warning(
+                    f"Worker {worker.index} exited with code {exitcode}, restarting")
+                self._restart(worker)
+            elif worker.heartbeat_age() > self.heartbeat_timeout:
+                logger.warning(
+                    f"Worker {worker.index} (pid {worker.process.pid}) sent no heartbeat "
+                    f"for {worker.heartbeat_age():.0f}s, restarting")
+                self._terminate(worker)
+                self._restart(worker)
+
+    def _exited(self, worker: WorkerProcess) -> None:
+        """Notify the exit callback about a worker's process."""
+        if self.on_exit is not None and worker.process is not None:
+            self.on_exit(worker.process.pid)
+
+    def _restart(self, worker: WorkerProcess) -> None:
+        """Start a worker again, waiting out the backoff after a quick crash."""
+        self._exited(worker)
+        wait = worker.started_at + self.restart_backoff - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        if self._stopping:
+            return
+        worker.restarts += 1
+        worker.start()
+
+    def _terminate(self, worker: WorkerProcess) -> None:
+        """Send SIGTERM to a worker and kill it if it does not exit within the grace period."""
+        process = worker.process
+        if process is None or not process.is_alive():
+            return
+        process.terminate()
+        process.join(self.shutdown_grace)
+        if process.is_alive():
+            logger.warning(
+                f"Worker {worker.index} did not stop within {self.shutdown_grace}s, killing it")
+            process.kill()
+            process.join()
+
+    def shutdown(self) -> None:
+        """Stop all workers: SIGTERM first, SIGKILL after the grace period."""
+        self._stopping = True
+        alive = [worker for worker in self.workers if worker.is_alive()]
+        for worker in alive:
+            worker.process.terminate()
+        deadline = time.monotonic() + self.shutdown_grace
+        for worker in alive:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} did not stop in time, killing it")
+                worker.process.kill()
+                worker.process.join()
+        for worker in alive:
+            self._exited(worker)
+        logger.info("All worker processes stopped")
+
+
+async def send_heartbeats(heartbeat, interval: float = WORKER_HEARTBEAT_INTERVAL) -> None:
+    """
+    Report liveness of a worker's event loop to the supervisor.
+
+    Runs as an asyncio task; a blocked loop stops the heartbeats, which makes
+    the supervisor restart the process.
+
+    Args:
+        heartbeat: Shared value written with the current time
+        interval: Seconds between heartbeats
+    """
+    while True:
+        heartbeat.value = time.time()
+        await asyncio.sleep(interval)
+
+
+def default_process_count() -> int:
+    """Number of CPUs available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def cpu_share() -> int:
+    """Number of CPUs available to this worker process, split evenly between the supervised workers."""
+    workers = int(os.environ.get(WORKER_COUNT_ENV, "1"))
+    return max(1, default_process_count() // workers)
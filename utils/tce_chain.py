@@ -0,0 +1,242 @@
+"""
+Digest guarding the TCE chain of a product footprint between process steps.
+
+transport_procedure and hub_procedure append their TCE to the raw footprint
+dictionary instead of validating and re-dumping the whole footprint on every
+hop. The ``tce_chain_digest`` process variable travels alongside it:
+
+    {"version": 1, "count": n, "root": r, "previous": d(n-1), "digest": d(n)}
+
+The root hashes the footprint id, shipmentId and mass, and every link hashes
+the previous digest with the canonical JSON of one TCE. A hop only checks the
+root and the last link, which is O(1). collect_hoc_toc_data recomputes the whole
+chain once, when it validates the footprint anyway. With TCE_CHAIN_SECRET set
+the digests are HMAC-SHA256, so a footprint altered outside the service cannot
+be re-signed, and footprints with TCEs but without digest are rejected. Without
+a secret the digests are plain SHA-256, which anyone can recompute: they only
+catch accidental changes and give no tamper resistance.
+
+prevTceIds either lists all ancestors of a TCE ("full") or, with
+TCE_PREV_IDS_MODE=parent, only its direct parent, which keeps footprints linear
+in the number of hops; expand_prev_tce_ids rebuilds the full lists on demand.
+"""
+
+import hashlib
+import hmac
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from config.settings import TCE_CHAIN_SECRET, TCE_PREV_IDS_MODE
+from models.product_footprint import ProductFootprint, TceData
+from utils.error_handling import TceChainError
+
+TCE_CHAIN_DIGEST_VERSION = 1
+PREV_IDS_MODES = ("full", "parent")
+
+
+def _hash(*parts: bytes) -> str:
+    """Hash the parts with HMAC-SHA256 if a secret is configured, plain SHA-256 otherwise."""
+    if TCE_CHAIN_SECRET:
+        digest = hmac.new(TCE_CHAIN_SECRET.encode('utf-8'), digestmod=hashlib.sha256)
+    else:
+        digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def root_digest(footprint_id: str, shipment_id: str, mass: float) -> str:
+    """
+    Hash the footprint fields every appended TCE relies on.
+
+    Args:
+        footprint_id: Product footprint id
+        shipment_id: Shipment id of the footprint extension
+        mass: Shipment mass of the footprint extension
+
+    Returns:
+        Hex digest
+    """
+    return _hash(b"root:", _canonical([footprint_id, shipment_id, float(mass)]))
+
+
+def link_digest(previous: str, tce: TceData) -> str:
+    """
+    Hash one TCE onto the digest of the chain before it.
+
+    Args:
+        previous: Digest of the chain without this TCE
+        tce: Validated TCE
+
+    Returns:
+        Hex digest
+    """
+    return _hash(b"tce:", previous.encode('ascii'), _canonical(tce.model_dump(mode="json")))
+
+
+def chain_digest(product_footprint: ProductFootprint) -> Dict[str, Any]:
+    """
+    Compute the digest of a validated footprint's whole TCE chain.
+
+    Args:
+        product_footprint: Validated ProductFootprint instance
+
+    Returns:
+        tce_chain_digest variable for the footprint
+    """
+    data = product_footprint.extensions[0].data
+    root = root_digest(product_footprint.id, data.shipmentId, data.mass)
+    previous, digest = None, root
+    for tce in data.tces:
+        previous, digest = digest, link_digest(digest, tce)
+    return {
+        "version": TCE_CHAIN_DIGEST_VERSION,
+        "count": len(data.tces),
+        "root": root,
+        "previous": previous,
+        "digest": digest,
+    }
+
+
+def extend_digest(tce_chain_digest: Dict[str, Any], tce: TceData) -> Dict[str, Any]:
+    """
+    Return the digest of the chain with one more TCE appended.
+
+    Args:
+        tce_chain_digest: Digest of the current chain
+        tce: Appended TCE
+
+    Returns:
+        New tce_chain_digest variable
+    """
+    return {
+        "version": TCE_CHAIN_DIGEST_VERSION,
+        "count": tce_chain_digest["count"] + 1,
+        "root": tce_chain_digest["root"],
+        "previous": tce_chain_digest["digest"],
+        "digest": link_digest(tce_chain_digest["digest"], tce),
+    }
+
+
+def check_chain_head(product_footprint: Dict[str, Any],
+                     tce_chain_digest: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check the footprint fields and last TCE against the digest without validating the footprint.
+
+    Args:
+        product_footprint: Raw product footprint dictionary
+        tce_chain_digest: Digest variable, None for footprints created before digests existed
+
+    Returns:
+        True if the TCE can be appended to the raw footprint, False if the
+        footprint needs full validation (no digest or unexpected structure)
+
+    Raises:
+        TceChainError: If the footprint does not match its digest
+    """
+    if not tce_chain_digest or tce_chain_digest.get("version") != TCE_CHAIN_DIGEST_VERSION:
+        return False
+    try:
+        data = product_footprint["extensions"][0]["data"]
+        tces = data["tces"]
+        root = root_digest(product_footprint["id"], data["shipmentId"], data["mass"])
+        last = TceData.model_validate(tces[-1]) if tces else None
+    except (KeyError, IndexError, TypeError, ValueError, ValidationError):
+        return False
+
+    if root != tce_chain_digest["root"]:
+        raise TceChainError("Footprint id, shipmentId or mass changed since the last TCE")
+    if len(tces) != tce_chain_digest["count"]:
+        raise TceChainError(
+            f"Footprint has {len(tces)} TCEs, digest covers {tce_chain_digest['count']}")
+    if last is None:
+        expected = root
+    else:
+        expected = link_digest(tce_chain_digest["previous"] or "", last)
+    if expected != tce_chain_digest["digest"]:
+        raise TceChainError(f"Last TCE {last.tceId if last else ''} does not match the digest")
+    return True
+
+
+def verify_chain(product_footprint: ProductFootprint,
+                 tce_chain_digest: Optional[Dict[str, Any]]) -> None:
+    """
+    Verify a validated footprint's whole TCE chain against its digest.
+
+    Args:
+        product_footprint: Validated ProductFootprint instance
+        tce_chain_digest: Digest variable, None for footprints created before digests existed
+
+    Raises:
+        TceChainError: If any part of the chain does not match the digest, or
+            the footprint has TCEs but no digest while TCE_CHAIN_SECRET is set
+    """
+    if not tce_chain_digest:
+        tces = product_footprint.extensions[0].data.tces
+        # Dropping the digest must not get a tampered chain re-signed
+        if TCE_CHAIN_SECRET and tces:
+            raise TceChainError(f"Footprint has {len(tces)} TCEs but no TCE chain digest")
+        return
+    if tce_chain_digest.get("version") != TCE_CHAIN_DIGEST_VERSION:
+        raise TceChainError(
+            f"Unsupported TCE chain digest version {tce_chain_digest.get('version')}")
+    expected = chain_digest(product_footprint)
+    if not hmac.compare_digest(expected["digest"], str(tce_chain_digest.get("digest"))) \
+            or expected["count"] != tce_chain_digest.get("count"):
+        raise TceChainError("TCE chain does not match its digest")
+
+
+def next_prev_tce_ids(tces: List[Dict[str, Any]], mode: str = TCE_PREV_IDS_MODE) -> List[str]:
+    """
+    Build the prevTceIds of a TCE appended after the given raw TCEs.
+
+    Args:
+        tces: TCE dictionaries of the footprint
+        mode: "full" to list all ancestors, "parent" for the direct parent only
+
+    Returns:
+        List of previous TCE IDs
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode not in PREV_IDS_MODES:
+        raise ValueError(f"Unknown TCE_PREV_IDS_MODE: {mode}")
+    if not tces:
+        return []
+    if mode == "parent":
+        return [tces[-1]["tceId"]]
+    return list(tces[-1].get("prevTceIds") or []) + [tces[-1]["tceId"]]
+
+
+def expand_prev_tce_ids(tces: List[TceData]) -> List[TceData]:
+    """
+    Rebuild the full prevTceIds of TCEs that only store their parent.
+
+    A TCE's ancestors are its first listed id's ancestors followed by its own
+    list, which holds for full, parent-only and mixed chains alike.
+
+    Args:
+        tces: Validated TCEs in chain order
+
+    Returns:
+        TCEs with full prevTceIds; unchanged TCEs are returned as-is
+    """
+    ancestors: Dict[str, List[str]] = {}
+    expanded = []
+    for tce in tces:
+        prev_tce_ids = tce.prevTceIds
+        if prev_tce_ids and prev_tce_ids[0] in ancestors:
+            full = ancestors[prev_tce_ids[0]] + prev_tce_ids
+        else:
+            full = list(prev_tce_ids)
+        ancestors[tce.tceId] = full
+        expanded.append(
+            tce if full == prev_tce_ids else tce.model_copy(update={"prevTceIds": full}))
+    return expanded
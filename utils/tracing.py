@@ -0,0 +1,367 @@
+"""
+Lightweight tracing of jobs and their downstream calls.
+
+Every job runs in a root span named after its task type, whose trace id is
+derived from the Zeebe process_instance_key, so all jobs of one process
+instance share a trace. Calls to the sensor service, Kafka proving round
+trips, the gRPC verifier and SQLite lookups decorated with @traced nest under
+it, also on the executor threads handlers run on (contextvars are copied).
+
+Finished spans are exported as one JSON object each:
+
+    {"trace_id", "span_id", "parent_id", "name", "process_instance_key",
+     "start_time", "duration_ms", "status", "error", "attributes"}
+
+to a JSONL file or in batches to an HTTP collector, from which critical
+paths per process instance can be rebuilt offline. Tracing is off unless
+TRACING_EXPORTER is set; disabled spans cost one global lookup.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from pyzeebe import Job
+
+from config.settings import (
+    REQUEST_TIMEOUT,
+    TRACING_COLLECTOR_URL,
+    TRACING_EXPORTER,
+    TRACING_JSONL_PATH,
+)
+
+logger = logging.getLogger("camunda_service")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None)
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar(
+    "current_job", default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "process_instance_key",
+                 "attributes", "start_time", "_started", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 process_instance_key: Optional[int] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.process_instance_key = process_instance_key
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def finish(self) -> Dict[str, Any]:
+        """Return the finished span as a dictionary."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "process_instance_key": self.process_instance_key,
+            "start_time": self.start_time,
+            "duration_ms": (time.perf_counter() - self._started) * 1000,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(ABC):
+    """Destination of finished spans."""
+
+    @abstractmethod
+    def export(self, span: Dict[str, Any]) -> None:
+        """Write out one finished span; must not block the job that ended it."""
+
+    def close(self) -> None:
+        """Flush pending spans and release resources."""
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends spans to a JSON Lines file, safe to share between worker processes."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the JsonlSpanExporter.
+
+        Args:
+            path: File to append to, its directory is created if missing
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # One O_APPEND write per span keeps lines of concurrent writers intact
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def export(self, span: Dict[str, Any]) -> None:
+        os.write(self._fd, (json.dumps(span, default=str) + "\n").encode('utf-8'))
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class HttpSpanExporter(SpanExporter):
+    """Posts spans as JSON arrays to a collector from a background thread."""
+
+    def __init__(self, url: str, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_queue_size: int = 10000, timeout: float = REQUEST_TIMEOUT):
+        """
+        Initialize the HttpSpanExporter.
+
+        Args:
+            url: Collector endpoint accepting a JSON array of spans
+            batch_size: Maximum spans per request
+            flush_interval: Seconds after which a partial batch is sent
+            max_queue_size: Spans buffered before new ones are dropped
+            timeout: Request timeout in seconds
+        """
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(max_queue_size)
+        self._session = requests.Session()
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Tracing must never slow down or fail a job
+            self.dropped += 1
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._send(batch)
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            response = self._session.post(
+                self.url, data=json.dumps(batch, default=str),
+                headers={"Content-Type": "application/json"}, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Failed to export {len(batch)} spans to {self.url}: {e}")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(self.timeout)
+        self._session.close()
+
+
+EXPORTERS: Dict[str, Callable[[], SpanExporter]] = {
+    "jsonl": lambda: JsonlSpanExporter(TRACING_JSONL_PATH),
+    "http": lambda: HttpSpanExporter(TRACING_COLLECTOR_URL),
+}
+
+_exporter: Optional[SpanExporter] = None
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> Optional[SpanExporter]:
+    """
+    Replace the span exporter.
+
+    Args:
+        exporter: New exporter, None disables tracing
+
+    Returns:
+        The previous exporter
+    """
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def configure_tracing(name: str = TRACING_EXPORTER) -> Optional[SpanExporter]:
+    """
+    Enable tracing with the exporter registered under a name.
+
+    Args:
+        name: Exporter name (jsonl, http); empty or "none" leaves tracing off
+
+    Returns:
+        The configured exporter, None if tracing is off
+
+    Raises:
+        ValueError: If the exporter is unknown
+    """
+    if not name or name == "none":
+        return None
+    if name not in EXPORTERS:
+        raise ValueError(f"Unknown tracing exporter: {name}")
+    exporter = EXPORTERS[name]()
+    set_exporter(exporter)
+    logger.info(f"Exporting trace spans via {name}")
+    return exporter
+
+
+def shutdown_tracing() -> None:
+    """Flush and close the exporter, disabling tracing."""
+    exporter = set_exporter(None)
+    if exporter is not None:
+        exporter.close()
+
+
+def trace_id_for(process_instance_key: Optional[int]) -> str:
+    """Derive the trace id shared by all jobs of a process instance."""
+    if process_instance_key is None:
+        return secrets.token_hex(16)
+    return f"{int(process_instance_key):032x}"
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost active span of this context."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a span nested under the current one.
+
+    Args:
+        name: Span name
+        **attributes: Span attributes
+
+    Yields:
+        The span, or None if tracing is off
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    if parent is not None:
+        new_span = Span(name, parent.trace_id, parent.span_id,
+                        parent.process_instance_key, attributes)
+    else:
+        job = _current_job.get()
+        process_instance_key = job.process_instance_key if job is not None else None
+        new_span = Span(name, trace_id_for(process_instance_key), None,
+                        process_instance_key, attributes)
+
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        try:
+            exporter.export(new_span.finish())
+        except Exception as e:
+            logger.warning(f"Failed to export span {name}: {e}")
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorate a sync or async function to run in a span.
+
+    Args:
+        name: Span name
+
+    Returns:
+        Decorator keeping the function's signature
+    """
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def run_async(*args, **kwargs):
+                if _exporter is None:
+                    return await function(*args, **kwargs)
+                with span(name):
+                    return await function(*args, **kwargs)
+
+            return run_async
+
+        @functools.wraps(function)
+        def run(*args, **kwargs):
+            if _exporter is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return run
+
+    return decorator
+
+
+async def bind_job(job: Job) -> Job:
+    """pyzeebe before-decorator making the job available to trace_job in its asyncio task."""
+    _current_job.set(job)
+    return job
+
+
+def trace_job(task_type: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap an async task handler to run in the job's root span.
+
+    Requires bind_job as before-decorator of the task.
+
+    Args:
+        task_type: Zeebe task type
+        function: Async task handler
+
+    Returns:
+        Wrapped coroutine function with the same signature
+    """
+    @functools.wraps(function)
+    async def run(*args, **kwargs):
+        if _exporter is None:
+            return await function(*args, **kwargs)
+        job = _current_job.get()
+        attributes: Dict[str, Any] = {"task_type": task_type}
+        if job is not None:
+            attributes.update(job_key=job.key, element_id=job.element_id,
+                              bpmn_process_id=job.bpmn_process_id, retries=job.retries)
+        with span(f"job {task_type}", **attributes):
+            return await function(*args, **kwargs)
+
+    return run